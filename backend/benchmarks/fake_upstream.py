@@ -0,0 +1,196 @@
+"""本地模拟的OpenDota/Steam上游服务.
+
+按fixture回放OpenDota的玩家、比赛接口和Steam社区的资料页，可注入延迟、
+429和失败，并统计每个接口被调用的次数。
+
+单独运行::
+
+    python -m benchmarks.fake_upstream --port 8900 --latency-ms 80 --rate-429 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from benchmarks.fixtures import FixtureStore
+
+# Steam 64位ID与32位账号ID的差值
+STEAM_ID_OFFSET = 76561197960265728
+
+
+@dataclass
+class FaultConfig:
+    """故障注入配置."""
+
+    latency_ms: float = 0.0  # 每个请求的固定延迟（毫秒）
+    jitter_ms: float = 0.0  # 在固定延迟上叠加的随机延迟上限（毫秒）
+    rate_429: float = 0.0  # 返回429的概率
+    failure_rate: float = 0.0  # 返回500的概率
+    retry_after: float = 1.0  # 429响应的Retry-After（秒）
+    seed: Optional[int] = None  # 随机种子，便于复现
+
+
+def create_app(fixtures: FixtureStore, faults: FaultConfig) -> FastAPI:
+    """创建模拟上游应用.
+
+    OpenDota接口挂在 ``/api`` 下，Steam资料页挂在 ``/profiles`` 下；
+    ``/_stats`` 返回调用统计，``POST /_reset`` 清空统计。
+
+    :param fixtures: 上游数据来源
+    :param faults: 故障注入配置
+    :return: FastAPI应用
+    """
+    app = FastAPI(title="Fake OpenDota/Steam")
+    calls: Counter = Counter()
+    statuses: Counter = Counter()
+    rng = random.Random(faults.seed)
+
+    async def inject(endpoint: str) -> Optional[Response]:
+        """记录调用并按配置注入延迟和错误."""
+        calls[endpoint] += 1
+        delay = faults.latency_ms + rng.random() * faults.jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = rng.random()
+        if roll < faults.rate_429:
+            statuses["429"] += 1
+            return JSONResponse(
+                {"error": "rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": f"{faults.retry_after:g}"},
+            )
+        if roll < faults.rate_429 + faults.failure_rate:
+            statuses["500"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        statuses["200"] += 1
+        return None
+
+    def conditional(request: Request, data: object) -> Response:
+        """带ETag的JSON响应，If-None-Match匹配时返回304（与OpenDota一致）."""
+        body = json.dumps(data).encode("utf-8")
+        etag = f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if request.headers.get("if-none-match") == etag:
+            statuses["200"] -= 1
+            statuses["304"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/api/players/{account_id}/recentMatches")
+    async def recent_matches(account_id: int, request: Request):
+        return await inject("recentMatches") or conditional(
+            request, fixtures.recent_matches(account_id)
+        )
+
+    @app.get("/api/players/{account_id}/matches")
+    async def player_matches(account_id: int, limit: int = 20, offset: int = 0):
+        return await inject("matches") or fixtures.player_matches(
+            account_id, limit, offset
+        )
+
+    @app.get("/api/players/{account_id}")
+    async def player(account_id: int, request: Request):
+        return await inject("players") or conditional(
+            request, fixtures.player(account_id)
+        )
+
+    @app.get("/api/matches/{match_id}")
+    async def match(match_id: int):
+        injected = await inject("match_details")
+        if injected is not None:
+            return injected
+        data = fixtures.match(match_id)
+        if data is None:
+            return JSONResponse({"error": "Not Found"}, status_code=404)
+        return data
+
+    @app.get("/profiles/{steam_id}")
+    @app.get("/profiles/{steam_id}/")
+    async def steam_profile(steam_id: int, request: Request):
+        injected = await inject("steam")
+        if injected is not None:
+            return injected
+        name = fixtures.steam_name(steam_id - STEAM_ID_OFFSET)
+        if "xml" in request.query_params:
+            body = (
+                f"<profile><steamID><![CDATA[{name}]]></steamID></profile>"
+                if name
+                else "<response><error>not found</error></response>"
+            )
+            return Response(body, media_type="text/xml")
+        body = f'<script>var g_rgProfileData = {{"personaname":"{name}"}};</script>'
+        return Response(body if name else "<html></html>", media_type="text/html")
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "calls": dict(calls),
+            "statuses": dict(statuses),
+            "faults": asdict(faults),
+        }
+
+    @app.post("/_reset")
+    async def reset():
+        calls.clear()
+        statuses.clear()
+        return {"ok": True}
+
+    return app
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加故障注入相关的命令行参数."""
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="上游固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="上游随机延迟上限")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="上游返回429的概率")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="上游返回500的概率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429的Retry-After")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument(
+        "--fixtures",
+        type=Path,
+        default=Path(__file__).parent / "fixtures",
+        help="录制的fixture目录，缺失的数据自动合成",
+    )
+    parser.add_argument(
+        "--detail-size", type=int, default=1, help="合成比赛详情的体积倍数"
+    )
+
+
+def faults_from_args(args: argparse.Namespace) -> FaultConfig:
+    """从命令行参数构造故障注入配置."""
+    return FaultConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        failure_rate=args.failure_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    """命令行入口：启动模拟上游服务."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="模拟OpenDota/Steam上游服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    fixtures = FixtureStore(args.fixtures, detail_size=args.detail_size)
+    app = create_app(fixtures, faults_from_args(args))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
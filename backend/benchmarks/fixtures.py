@@ -0,0 +1,206 @@
+"""基准测试用的上游数据.
+
+优先读取录制的fixture文件（见record.py），目录结构与OpenDota接口路径一致::
+
+    fixtures/
+        players/{account_id}.json
+        players/{account_id}/recentMatches.json
+        players/{account_id}/matches.json
+        matches/{match_id}.json
+
+没有录制文件时按账号ID确定性地生成数据，比赛详情带有与真实接口相近体积的
+出装、时间线等字段，同一个账号ID每次生成的数据完全相同。
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 合成数据中每个玩家最近比赛的数量（与recentMatches接口一致）
+RECENT_MATCHES = 20
+# 合成数据的账号ID从这里开始（基准测试默认查询这个范围内的账号）
+BASE_ACCOUNT_ID = 100_000
+# 合成数据中比赛ID的起点
+_BASE_MATCH_ID = 7_000_000_000
+# 每个账号最多的合成比赛数
+_MAX_MATCHES = 1_000_000
+# 合成数据中队友账号池的大小，越小队友重合越多
+_TEAMMATE_POOL = 40
+
+
+class FixtureStore:
+    """上游数据来源：录制文件优先，缺失时生成合成数据."""
+
+    def __init__(self, path: Optional[Path] = None, detail_size: int = 1):
+        """初始化.
+
+        :param path: 录制文件目录，为空时只使用合成数据
+        :param detail_size: 合成比赛详情的体积倍数（1约为80KB）
+        """
+        self.path = path
+        self.detail_size = max(0, detail_size)
+        self._cache: Dict[str, Any] = {}
+
+    def _load(self, relative: str) -> Optional[Any]:
+        """读取录制文件."""
+        if relative in self._cache:
+            return self._cache[relative]
+        data = None
+        if self.path is not None:
+            file = self.path / relative
+            if file.is_file():
+                data = json.loads(file.read_text(encoding="utf-8"))
+        self._cache[relative] = data
+        return data
+
+    def recent_matches(self, account_id: int) -> List[Dict[str, Any]]:
+        """玩家最近比赛列表."""
+        recorded = self._load(f"players/{account_id}/recentMatches.json")
+        if recorded is not None:
+            return recorded
+        return synthetic_player_matches(account_id, RECENT_MATCHES)
+
+    def player_matches(
+        self, account_id: int, limit: int, offset: int
+    ) -> List[Dict[str, Any]]:
+        """玩家比赛历史（分页）."""
+        recorded = self._load(f"players/{account_id}/matches.json")
+        if recorded is not None:
+            return recorded[offset : offset + limit]
+        return synthetic_player_matches(account_id, limit, offset)
+
+    def match(self, match_id: int) -> Optional[Dict[str, Any]]:
+        """比赛详情，不存在时返回None."""
+        recorded = self._load(f"matches/{match_id}.json")
+        if recorded is not None:
+            return recorded
+        if match_id < _BASE_MATCH_ID:
+            return None
+        return synthetic_match(match_id, self.detail_size)
+
+    def player(self, account_id: int) -> Dict[str, Any]:
+        """玩家信息."""
+        recorded = self._load(f"players/{account_id}.json")
+        if recorded is not None:
+            return recorded
+        return {
+            "profile": {
+                "account_id": account_id,
+                # 部分玩家没有公开昵称，用于覆盖Steam备用查询
+                "personaname": None if account_id % 4 == 0 else f"player{account_id}",
+            }
+        }
+
+    def steam_name(self, account_id: int) -> Optional[str]:
+        """Steam社区昵称."""
+        return None if account_id % 8 == 0 else f"steam{account_id}"
+
+
+def _match_id(account_id: int, index: int) -> int:
+    """合成比赛ID：越新的比赛ID越大，末三位对应账号，详情据此放入该账号."""
+    return (
+        _BASE_MATCH_ID
+        + (_MAX_MATCHES - index) * 1000
+        + (account_id - BASE_ACCOUNT_ID) % 1000
+    )
+
+
+def _match_owner(match_id: int) -> int:
+    """合成比赛所属的账号."""
+    return BASE_ACCOUNT_ID + (match_id - _BASE_MATCH_ID) % 1000
+
+
+def synthetic_player_matches(
+    account_id: int, limit: int, offset: int = 0
+) -> List[Dict[str, Any]]:
+    """生成玩家比赛列表（按时间倒序）."""
+    matches = []
+    for index in range(offset, offset + limit):
+        match_id = _match_id(account_id, index)
+        rng = random.Random(match_id * 31 + account_id)
+        matches.append(
+            {
+                "match_id": match_id,
+                "player_slot": _player_slot(account_id, match_id),
+                "radiant_win": match_id % 3 != 0,
+                "duration": rng.randint(1200, 3600),
+                "game_mode": 22,
+                "lobby_type": 7,
+                "hero_id": rng.randint(1, 130),
+                "start_time": 1_700_000_000 + match_id % 10_000_000,
+                "kills": rng.randint(0, 20),
+                "deaths": rng.randint(0, 15),
+                "assists": rng.randint(0, 30),
+                "xp_per_min": rng.randint(300, 900),
+                "gold_per_min": rng.randint(250, 800),
+                "hero_damage": rng.randint(5_000, 60_000),
+                "tower_damage": rng.randint(0, 10_000),
+                "hero_healing": rng.randint(0, 5_000),
+                "last_hits": rng.randint(20, 400),
+            }
+        )
+    return matches
+
+
+def _player_slot(account_id: int, match_id: int) -> int:
+    """账号在比赛中的位置."""
+    return 0 if (account_id + match_id) % 2 else 128
+
+
+def synthetic_match(match_id: int, detail_size: int = 1) -> Dict[str, Any]:
+    """生成比赛详情."""
+    rng = random.Random(match_id)
+    owner = _match_owner(match_id)
+    owner_position = 0 if _player_slot(owner, match_id) < 128 else 5
+    players = []
+    used = {owner}
+    for position in range(10):
+        slot = position if position < 5 else 128 + position - 5
+        account_id = None
+        if position == owner_position:
+            account_id = owner
+        elif rng.random() > 0.1:
+            account_id = BASE_ACCOUNT_ID + rng.randrange(_TEAMMATE_POOL)
+            if account_id in used:
+                account_id = None
+            else:
+                used.add(account_id)
+        players.append(
+            {
+                "account_id": account_id,
+                "player_slot": slot,
+                "hero_id": rng.randint(1, 130),
+                "personaname": (
+                    f"hero{account_id}" if account_id and rng.random() > 0.3 else None
+                ),
+                "kills": rng.randint(0, 20),
+                "deaths": rng.randint(0, 15),
+                "assists": rng.randint(0, 30),
+                "gold_per_min": rng.randint(250, 800),
+                "purchase_log": [
+                    {"time": t * 30, "key": f"item_{rng.randint(1, 250)}"}
+                    for t in range(60 * detail_size)
+                ],
+                "gold_t": [t * 550 for t in range(45 * detail_size)],
+                "xp_t": [t * 600 for t in range(45 * detail_size)],
+                "lh_t": [t * 6 for t in range(45 * detail_size)],
+                "damage": {
+                    f"npc_dota_hero_{k}": rng.randint(0, 9000)
+                    for k in range(15 * detail_size)
+                },
+            }
+        )
+    return {
+        "match_id": match_id,
+        "radiant_win": match_id % 3 != 0,
+        "duration": rng.randint(1200, 3600),
+        "start_time": 1_700_000_000 + match_id % 10_000_000,
+        "players": players,
+        "chat": [
+            {"time": t * 10, "type": "chat", "key": "gg wp"}
+            for t in range(40 * detail_size)
+        ],
+        "radiant_gold_adv": [rng.randint(-9000, 9000) for _ in range(45 * detail_size)],
+        "radiant_xp_adv": [rng.randint(-9000, 9000) for _ in range(45 * detail_size)],
+    }
@@ -0,0 +1,165 @@
+"""请求中间件开销的微基准测试.
+
+直接以ASGI调用一个只返回固定JSON的最小应用，比较每个请求的耗时：
+
+- 无中间件
+- 原来基于BaseHTTPMiddleware的请求日志中间件（每个请求格式化查询参数、
+  输出一行INFO日志）
+- 现在的纯ASGI中间件RequestMetricsMiddleware
+
+分别测量普通接口和 ``/health`` 探活请求。日志输出到空处理器，只计格式化和
+处理本身的开销。
+
+在backend目录下运行::
+
+    python -m benchmarks.middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.core import metrics
+from src.main import RequestMetricsMiddleware
+
+logger = logging.getLogger("benchmarks.middleware")
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """原来的请求日志中间件（对照组）."""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.perf_counter()
+        logger.debug(
+            "📥 收到请求: %s %s 查询参数: %s",
+            request.method,
+            request.url.path,
+            request.query_params,
+        )
+        response = await call_next(request)
+        process_time = time.perf_counter() - start_time
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            process_time,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(response.status_code),
+        )
+        logger.info(
+            "📤 %s %s -> %s (耗时: %.2f秒)",
+            request.method,
+            request.url.path,
+            response.status_code,
+            process_time,
+        )
+        return response
+
+
+def create_app(middleware: Any = None) -> FastAPI:
+    """创建只有两个接口的最小应用.
+
+    :param middleware: 中间件类，为None时不加中间件
+    """
+    app = FastAPI()
+
+    @app.get("/api/v1/players/{account_id}/ping")
+    async def ping(account_id: int):
+        return {"account_id": account_id}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def call(app: Callable, path: str, query: bytes = b"") -> None:
+    """以ASGI调用应用一次."""
+    scope: Dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app: Callable, path: str, requests: int, query: bytes = b"") -> float:
+    """返回每个请求的平均耗时（微秒）."""
+    for _ in range(min(requests, 500)):
+        await call(app, path, query)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path, query)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(requests: int) -> List[List[Any]]:
+    """依次测量各中间件."""
+    variants = [
+        ("无中间件", None),
+        ("BaseHTTPMiddleware", BaseHTTPLoggingMiddleware),
+        ("纯ASGI", RequestMetricsMiddleware),
+    ]
+    rows = []
+    for name, middleware in variants:
+        app = create_app(middleware)
+        api = await measure(
+            app, "/api/v1/players/123/ping", requests, b"limit=20&days=7"
+        )
+        health = await measure(app, "/health", requests)
+        rows.append([name, api, health])
+    return rows
+
+
+def main() -> None:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="请求中间件开销的微基准测试")
+    parser.add_argument("--requests", type=int, default=10000, help="每项测量的请求数")
+    args = parser.parse_args()
+
+    # 日志照常格式化，但不写到终端
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    rows = asyncio.run(run(args.requests))
+    bare_api, bare_health = rows[0][1], rows[0][2]
+    print(f"{'中间件':<20}{'接口(µs)':>10}{'开销':>10}{'/health(µs)':>14}{'开销':>10}")
+    for name, api, health in rows:
+        print(
+            f"{name:<20}{api:>10.1f}{api - bare_api:>10.1f}"
+            f"{health:>14.1f}{health - bare_health:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
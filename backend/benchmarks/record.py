@@ -0,0 +1,77 @@
+"""从OpenDota录制基准测试fixture.
+
+按模拟上游读取的目录结构保存玩家最近比赛、比赛历史、玩家信息和比赛详情。
+录制只需要做一次，之后的基准测试完全离线运行::
+
+    python -m benchmarks.record 123456789 987654321 --matches 100
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from src.core.config import settings
+
+# 录制时相邻请求的间隔（秒），避免触发OpenDota免费额度的限流
+REQUEST_INTERVAL = 1.1
+
+
+def _write(path: Path, data: Any) -> None:
+    """写入JSON文件."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+async def record(account_ids: list, output: Path, matches: int) -> None:
+    """录制fixture.
+
+    :param account_ids: 需要录制的账号ID
+    :param output: 输出目录
+    :param matches: 每个账号录制的比赛历史条数
+    """
+    base_url = settings.OPENDOTA_API_BASE_URL
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+
+        async def fetch(path: str, **params: Any) -> Any:
+            await asyncio.sleep(REQUEST_INTERVAL)
+            response = await client.get(path, params=params or None)
+            response.raise_for_status()
+            return response.json()
+
+        for account_id in account_ids:
+            player_dir = output / "players"
+            _write(player_dir / f"{account_id}.json", await fetch(f"/players/{account_id}"))
+            recent = await fetch(f"/players/{account_id}/recentMatches")
+            _write(player_dir / str(account_id) / "recentMatches.json", recent)
+            history = await fetch(f"/players/{account_id}/matches", limit=matches)
+            _write(player_dir / str(account_id) / "matches.json", history)
+
+            for match in recent:
+                match_id = match["match_id"]
+                path = output / "matches" / f"{match_id}.json"
+                if not path.exists():
+                    _write(path, await fetch(f"/matches/{match_id}"))
+            print(f"已录制账号 {account_id}（{len(recent)} 场比赛详情）")
+
+
+def main() -> None:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="从OpenDota录制基准测试fixture")
+    parser.add_argument("account_ids", type=int, nargs="+", help="需要录制的账号ID")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).parent / "fixtures",
+        help="输出目录",
+    )
+    parser.add_argument("--matches", type=int, default=100, help="录制的比赛历史条数")
+    args = parser.parse_args()
+    asyncio.run(record(args.account_ids, args.output, args.matches))
+
+
+if __name__ == "__main__":
+    main()
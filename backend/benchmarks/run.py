@@ -0,0 +1,284 @@
+"""玩家分析接口的离线基准测试.
+
+启动本地模拟上游（见fake_upstream.py），把应用的OpenDota/Steam地址指向它，
+以N个并发用户请求分析接口，按轮次输出延迟分位数、吞吐量、上游调用次数和
+进程内存。第一轮缓存为空（冷启动），之后的轮次复用前面轮次写入的缓存。
+
+在backend目录下运行::
+
+    python -m benchmarks.run --users 20 --requests 200 --accounts 50
+    python -m benchmarks.run --latency-ms 150 --rate-429 0.05 --no-analysis-cache
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_upstream import add_fault_arguments
+from benchmarks.fixtures import BASE_ACCOUNT_ID
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - 可选依赖
+    psutil = None
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算分位数.
+
+    :param sorted_values: 升序排列的样本
+    :param pct: 分位（0~100）
+    :return: 分位数，没有样本时返回0
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前进程的常驻内存（MB），无法获取时返回None."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    """进程启动以来的峰值常驻内存（MB）."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def start_upstream(args: argparse.Namespace) -> subprocess.Popen:
+    """在子进程中启动模拟上游并等待就绪."""
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.fake_upstream",
+        "--port",
+        str(args.upstream_port),
+        "--latency-ms",
+        str(args.latency_ms),
+        "--jitter-ms",
+        str(args.jitter_ms),
+        "--rate-429",
+        str(args.rate_429),
+        "--failure-rate",
+        str(args.failure_rate),
+        "--retry-after",
+        str(args.retry_after),
+        "--seed",
+        str(args.seed),
+        "--fixtures",
+        str(args.fixtures),
+        "--detail-size",
+        str(args.detail_size),
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{upstream_url(args)}/_stats", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("模拟上游启动失败")
+
+
+def upstream_url(args: argparse.Namespace) -> str:
+    """模拟上游的地址."""
+    return f"http://127.0.0.1:{args.upstream_port}"
+
+
+def configure_app_env(args: argparse.Namespace, data_dir: str) -> None:
+    """在导入应用前通过环境变量配置应用."""
+    os.environ.update(
+        {
+            "OPENDOTA_API_BASE_URL": f"{upstream_url(args)}/api",
+            "STEAM_COMMUNITY_BASE_URL": upstream_url(args),
+            "OPENDOTA_RATE_LIMIT_PER_MINUTE": str(args.rate_limit),
+            "OPENDOTA_RATE_LIMIT_BURST": str(args.rate_burst),
+            "MATCH_CACHE_PATH": os.path.join(data_dir, "match_cache.sqlite3"),
+            "AGGREGATE_STORE_PATH": os.path.join(data_dir, "player_aggregates.sqlite3"),
+            "PREFETCH_ENABLED": "false",
+        }
+    )
+    if args.no_analysis_cache:
+        os.environ["ANALYSIS_CACHE_TTL"] = "0"
+        os.environ["RECENT_MATCHES_CACHE_TTL"] = "0"
+
+
+async def run_round(
+    client: httpx.AsyncClient, args: argparse.Namespace
+) -> Dict[str, Any]:
+    """执行一轮压测.
+
+    :param client: 指向应用的HTTP客户端
+    :param args: 命令行参数
+    :return: 本轮的延迟统计
+    """
+    path = "analysis/stream" if args.stream else "analysis"
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(args.first_account + i % args.accounts)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def user() -> None:
+        while not queue.empty():
+            account_id = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.get(
+                    f"/api/v1/players/{account_id}/{path}",
+                    params={"limit": args.limit},
+                )
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != "200":
+                errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(args.users)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """启动应用并执行所有轮次.
+
+    :param args: 命令行参数
+    :return: 每轮的结果
+    """
+    from src.main import app
+
+    results = []
+    async with httpx.AsyncClient(base_url=upstream_url(args)) as upstream:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", timeout=None
+            ) as client:
+                for round_index in range(1, args.rounds + 1):
+                    await upstream.post("/_reset")
+                    result = await run_round(client, args)
+                    stats = (await upstream.get("/_stats")).json()
+                    result.update(
+                        round=round_index,
+                        upstream_calls=stats["calls"],
+                        upstream_statuses=stats["statuses"],
+                        rss_mb=_round(current_rss_mb()),
+                        peak_rss_mb=_round(max(peak_rss_mb(), current_rss_mb() or 0)),
+                    )
+                    results.append(result)
+                    print_result(result)
+    return results
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """输出单轮结果."""
+    calls = result["upstream_calls"]
+    print(
+        f"[第{result['round']}轮] {result['requests']} 请求 / {result['elapsed_s']}s "
+        f"({result['throughput_rps']} req/s)  "
+        f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+        f"max={result['max_ms']}ms"
+    )
+    print(
+        f"        上游调用 {sum(calls.values())} 次 {calls}  "
+        f"状态 {result['upstream_statuses']}  错误 {result['errors'] or '无'}"
+    )
+    print(f"        RSS {result['rss_mb']}MB（峰值 {result['peak_rss_mb']}MB）")
+
+
+def main() -> None:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="玩家分析接口离线基准测试")
+    parser.add_argument("--users", type=int, default=10, help="并发用户数")
+    parser.add_argument("--requests", type=int, default=100, help="每轮请求总数")
+    parser.add_argument("--rounds", type=int, default=2, help="轮数（第一轮为冷启动）")
+    parser.add_argument("--accounts", type=int, default=20, help="请求轮流查询的账号数")
+    parser.add_argument(
+        "--first-account", type=int, default=BASE_ACCOUNT_ID, help="第一个账号ID"
+    )
+    parser.add_argument("--limit", type=int, default=20, help="分析窗口（比赛场数）")
+    parser.add_argument("--stream", action="store_true", help="压测NDJSON流式接口")
+    parser.add_argument(
+        "--no-analysis-cache",
+        action="store_true",
+        help="关闭分析结果和最近比赛缓存，每个请求都走完整的数据路径",
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, default=6000, help="应用的OpenDota每分钟请求预算"
+    )
+    parser.add_argument("--rate-burst", type=int, default=200, help="应用的突发请求数")
+    parser.add_argument("--upstream-port", type=int, default=8900, help="模拟上游端口")
+    parser.add_argument("--json", type=Path, help="把结果写入JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="输出应用日志")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # 注入的故障会产生大量错误日志，默认只看压测结果
+        logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory(prefix="bench-") as data_dir:
+        configure_app_env(args, data_dir)
+        upstream = start_upstream(args)
+        try:
+            results = asyncio.run(run_benchmark(args))
+        finally:
+            upstream.terminate()
+            upstream.wait()
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {"args": {k: str(v) for k, v in vars(args).items()}, "rounds": results},
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
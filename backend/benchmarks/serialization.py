@@ -0,0 +1,150 @@
+"""JSON解析和响应渲染的CPU基准测试.
+
+用合成数据（见fixtures.py）重放每个分析请求中与JSON相关的工作，比较两条路径
+每个请求消耗的CPU时间：
+
+- 标准路径：标准库json解析上游响应，逐字段校验构造PlayerAnalysisResponse，
+  再经jsonable_encoder和JSONResponse渲染
+- 快速路径：serialization.loads解析（按JSON_BACKEND使用orjson/msgspec），
+  内部dict直接由FastJSONResponse渲染
+
+比赛详情在安装了ijson时由流式解析处理，这里的"比赛详情解析"一行对应未安装
+ijson时的完整解析。
+
+在backend目录下运行::
+
+    python -m benchmarks.serialization --accounts 20 --limit 100
+"""
+
+import argparse
+import gc
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.fixtures import BASE_ACCOUNT_ID, FixtureStore
+from src.api.v1 import router
+from src.api.v1.schemas import PlayerAnalysisResponse
+from src.core import serialization
+from src.core.config import settings
+from src.core.serialization import FastJSONResponse
+from src.services.analysis import AnalysisService
+
+
+def build_request(
+    fixtures: FixtureStore, account_id: int, limit: int
+) -> Tuple[bytes, List[bytes], Dict[str, Any]]:
+    """准备一个分析请求的上游响应体和分析结果.
+
+    :param fixtures: 上游数据
+    :param account_id: 账号ID
+    :param limit: 分析窗口
+    :return: (比赛列表响应体, 比赛详情响应体列表, 分析结果dict)
+    """
+    matches = fixtures.player_matches(account_id, limit, 0)
+    details = [
+        fixtures.match(m["match_id"]) for m in matches[: settings.TEAMMATE_MATCH_LIMIT]
+    ]
+    best, worst, names = AnalysisService.analyze_teammates(details, account_id)
+    for teammate in best + worst:
+        names.setdefault(teammate["account_id"], f"玩家{teammate['account_id']}")
+    result = router._to_analysis_response(
+        account_id, router._build_summary(account_id, matches), best, worst, names
+    )
+    return (
+        json.dumps(matches).encode("utf-8"),
+        [json.dumps(d).encode("utf-8") for d in details],
+        result,
+    )
+
+
+def cpu_us(func: Callable[[], Any], repeat: int, trials: int = 5) -> float:
+    """每轮执行repeat次，返回各轮中最小的每次平均CPU时间（微秒）.
+
+    计时期间关闭GC，避免大文档解析触发的回收让结果大幅抖动。
+    """
+    best = float("inf")
+    for _ in range(trials):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.process_time()
+            for _ in range(repeat):
+                func()
+            best = min(best, (time.process_time() - started) / repeat)
+        finally:
+            gc.enable()
+    return best * 1e6
+
+
+def main() -> None:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="JSON解析和响应渲染的CPU基准测试")
+    parser.add_argument("--accounts", type=int, default=20, help="参与测试的账号数")
+    parser.add_argument("--limit", type=int, default=20, help="分析窗口（比赛场数）")
+    parser.add_argument("--repeat", type=int, default=20, help="每个账号重复的次数")
+    parser.add_argument(
+        "--detail-size", type=int, default=1, help="合成比赛详情的体积倍数（1约为80KB）"
+    )
+    args = parser.parse_args()
+
+    fixtures = FixtureStore(detail_size=args.detail_size)
+    requests = [
+        build_request(fixtures, BASE_ACCOUNT_ID + i, args.limit)
+        for i in range(args.accounts)
+    ]
+    # 标准路径渲染的是已构造好的模型
+    models = {id(r): PlayerAnalysisResponse(**r[2]) for r in requests}
+    repeat = args.repeat
+
+    def run(func: Callable[[Any], Any], pick: Callable[[Tuple], Any]) -> float:
+        return sum(cpu_us(lambda: func(pick(r)), repeat) for r in requests) / len(
+            requests
+        )
+
+    def decode_details(loads: Callable[[bytes], Any]) -> Callable[[List[bytes]], Any]:
+        return lambda bodies: [loads(body) for body in bodies]
+
+    rows = [
+        (
+            "比赛列表解析",
+            run(json.loads, lambda r: r[0]),
+            run(serialization.loads, lambda r: r[0]),
+        ),
+        (
+            "比赛详情解析",
+            run(decode_details(json.loads), lambda r: r[1]),
+            run(decode_details(serialization.loads), lambda r: r[1]),
+        ),
+        (
+            "构造响应",
+            run(lambda d: PlayerAnalysisResponse(**d), lambda r: r[2]),
+            0.0,
+        ),
+        (
+            "渲染响应",
+            run(lambda m: JSONResponse(jsonable_encoder(m)), lambda r: models[id(r)]),
+            run(FastJSONResponse, lambda r: r[2]),
+        ),
+    ]
+
+    print(
+        f"JSON实现: {serialization.JSON_BACKEND}，窗口 {args.limit} 场，"
+        f"{settings.TEAMMATE_MATCH_LIMIT} 场比赛详情，{args.accounts} 个账号"
+    )
+    print(f"{'阶段':<10}{'标准路径(µs)':>14}{'快速路径(µs)':>14}{'节省':>10}")
+    total_before = total_after = 0.0
+    for name, before, after in rows:
+        total_before += before
+        total_after += after
+        saved = (1 - after / before) * 100 if before else 0.0
+        print(f"{name:<10}{before:>14.1f}{after:>14.1f}{saved:>9.1f}%")
+    saved = (1 - total_after / total_before) * 100 if total_before else 0.0
+    print(f"{'每个请求':<10}{total_before:>14.1f}{total_after:>14.1f}{saved:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
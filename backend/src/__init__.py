@@ -1,2 +1,6 @@
 """Dota2玩家战绩数据分析后端API."""
 
+import time
+
+# 第一次导入src的时间点，src.main据此计算应用模块的导入耗时
+IMPORT_STARTED = time.perf_counter()
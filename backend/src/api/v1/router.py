@@ -2,31 +2,229 @@
 
 import asyncio
 import logging
+import os
 from contextlib import asynccontextmanager
-from typing import Dict, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-from fastapi import APIRouter, HTTPException, status
+import httpx
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
-from src.api.v1.schemas import ErrorResponse, PlayerAnalysisResponse
-from src.services.analysis import AnalysisService
+from src.api.v1.schemas import (
+    BatchAnalysisRequest,
+    BatchAnalysisResponse,
+    ErrorResponse,
+    HeadToHeadResponse,
+    HeroMatchupsResponse,
+    HeroMatchupSummary,
+    PlayerAnalysisResponse,
+    PlayerHeroMatchupsResponse,
+    TeammateIndexResponse,
+    TeammateRecord,
+)
+from src.core import metrics
+from src.core.config import settings
+from src.core.serialization import FastJSONResponse, dumps
+from src.services.aggregates import PlayerAggregate, PlayerAggregateStore
+from src.services.analysis import AnalysisService, MatchAggregator, as_match_table
+from src.services.breaker import CircuitOpenError
+from src.services.cache import SingleFlight
+from src.services.heroes import (
+    HeroTable,
+    load_snapshot,
+    save_snapshot,
+    snapshot_is_fresh,
+)
+from src.services.matchups import HeroMatchups
+from src.services.names import NameResolver
 from src.services.opendota import OpenDotaClient
+from src.services.prefetch import PrefetchWorker
+from src.services.shared import (
+    SharedCache,
+    SharedStateBackend,
+    create_state_backend,
+)
+from src.services.snapshot import CacheSnapshot
+from src.services.teammates import TeammateIndex
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/v1", tags=["Players"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+T = TypeVar("T")
+
+# recentMatches接口一次最多返回的比赛数
+RECENT_MATCHES_LIMIT = 20
+
+
+class AnalysisWindow(NamedTuple):
+    """分析窗口：最近limit场比赛，可选只统计最近days天内的比赛."""
+
+    limit: int = settings.ANALYSIS_DEFAULT_WINDOW
+    days: Optional[int] = None
+
+    @property
+    def uses_recent_matches(self) -> bool:
+        """窗口能否直接用recentMatches接口一次取回."""
+        return self.days is None and self.limit <= RECENT_MATCHES_LIMIT
+
+
+class WindowLoad(NamedTuple):
+    """已加载的分析窗口."""
+
+    summary: Dict[str, Any]  # 分析摘要（AnalysisSummary结构）
+    match_ids: List[int]  # 需要获取详情用于分析队友的比赛ID
+    aggregate: Optional[PlayerAggregate] = None  # 增量聚合状态（如果使用）
+
+
+# 查询参数：分析窗口
+WINDOW_LIMIT_QUERY = Query(
+    settings.ANALYSIS_DEFAULT_WINDOW,
+    ge=1,
+    le=settings.ANALYSIS_MAX_WINDOW,
+    description="分析最近多少场比赛（如20、100、500）",
+)
+WINDOW_DAYS_QUERY = Query(None, ge=1, description="只分析最近多少天内的比赛")
+
 # 全局OpenDota客户端（在应用启动时初始化）
 opendota_client: Optional[OpenDotaClient] = None
+name_resolver: Optional[NameResolver] = None
+aggregate_store: Optional[PlayerAggregateStore] = None
+prefetch_worker: Optional[PrefetchWorker] = None
+shared_state: Optional[SharedStateBackend] = None
+teammate_index: Optional[TeammateIndex] = None
+# 英雄表（启动时从快照或OpenDota加载，刷新时整体替换）
+hero_table: HeroTable = HeroTable({})
+# 英雄对位和配合矩阵（由 python -m src.matchups 离线生成，启动时载入）
+hero_matchups: Optional[HeroMatchups] = None
+
+
+
+def _initialized(service: Optional[T]) -> T:
+    """返回启动时创建的全局服务.
+
+    :param service: 全局服务
+    :return: 服务本身
+    :raises HTTPException: 当服务未初始化（应用未启动或启动失败）时
+    """
+    if service is None:
+        logger.error("❌ 服务未初始化！")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="服务未初始化",
+        )
+    return service
+
+
+# 分析结果在内部是与PlayerAnalysisResponse结构相同的dict：数据都由服务端生成，
+# 不再逐字段构造和校验pydantic模型，缓存和响应都直接序列化
+
+# 分析结果缓存：刷新页面或分享链接时直接复用，不再请求OpenDota
+# （配置了共享后端时在应用启动时绑定，多个worker共享命中）
+analysis_cache: SharedCache[Tuple[int, AnalysisWindow], Dict[str, Any]] = SharedCache(
+    "analysis",
+    ttl=settings.ANALYSIS_CACHE_TTL,
+    max_items=settings.ANALYSIS_CACHE_MAX_ITEMS,
+)
+# 同一玩家的并发分析请求共享一次计算
+_analysis_inflight: SingleFlight[
+    Tuple[int, AnalysisWindow], Dict[str, Any]
+] = SingleFlight()
 
 
 @asynccontextmanager
 async def lifespan(app):
     """应用生命周期管理."""
-    global opendota_client
-    opendota_client = OpenDotaClient()
+    global opendota_client, name_resolver, aggregate_store, prefetch_worker
+    global shared_state, teammate_index, hero_table, hero_matchups
+    shared_state = create_state_backend()
+    if shared_state is None and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning(
+            "⚠️ 多个worker使用local共享状态后端，各worker的缓存和请求预算互相独立"
+        )
+    analysis_cache.bind(shared_state)
+    if settings.TEAMMATE_INDEX_ENABLED:
+        teammate_index = TeammateIndex()
+    opendota_client = OpenDotaClient(
+        shared_state=shared_state, teammate_index=teammate_index
+    )
+    # 预热连接和预载比赛缓存都在后台进行，不推迟开始接收请求
+    warm_up = asyncio.create_task(opendota_client.warm_up())
+    preload = asyncio.create_task(opendota_client.match_store.preload())
+    backfill = None
+    if teammate_index is not None:
+        # 把之前缓存的比赛补进索引，不阻塞启动
+        backfill = asyncio.create_task(
+            teammate_index.backfill(opendota_client.match_store.scan)
+        )
+    # 有新鲜的快照时不请求OpenDota；否则先用旧快照（或只有英雄ID），后台获取
+    refresh_heroes = None
+    snapshot = load_snapshot(settings.HERO_CONSTANTS_PATH)
+    if snapshot is not None:
+        hero_table = snapshot[0]
+    if snapshot is None or not snapshot_is_fresh(
+        snapshot[1], settings.HERO_CONSTANTS_MAX_AGE
+    ):
+        refresh_heroes = asyncio.create_task(_refresh_hero_table())
+    hero_matchups = await asyncio.to_thread(
+        HeroMatchups.load, settings.HERO_MATCHUPS_PATH
+    )
+    if hero_matchups is not None:
+        logger.info("🧮 载入英雄对位矩阵（%s 场比赛）", hero_matchups.match_count)
+    name_resolver = NameResolver(opendota_client, shared_state=shared_state)
+    # 重启前的缓存在开始接收请求前载回，之后定期保存
+    cache_snapshot = CacheSnapshot(
+        [analysis_cache, name_resolver.cache, opendota_client.recent_cache]
+    )
+    await cache_snapshot.load()
+    save_snapshots = asyncio.create_task(cache_snapshot.run())
+    if settings.AGGREGATE_STORE_ENABLED:
+        aggregate_store = PlayerAggregateStore()
+    if settings.PREFETCH_ENABLED:
+        prefetch_worker = PrefetchWorker(opendota_client)
+        prefetch_worker.start()
     yield
+    for task in (warm_up, preload, backfill, refresh_heroes, save_snapshots):
+        if task is not None and not task.done():
+            task.cancel()
+    if prefetch_worker:
+        await prefetch_worker.stop()
+    await cache_snapshot.save()
     if opendota_client:
         await opendota_client.close()
+    if aggregate_store:
+        aggregate_store.close()
+    if teammate_index:
+        teammate_index.close()
+    if shared_state:
+        await shared_state.close()
+
+
+async def _refresh_hero_table() -> None:
+    """从OpenDota获取英雄常量，替换英雄表并写入磁盘快照."""
+    global hero_table
+    try:
+        client = _initialized(opendota_client)
+        table = HeroTable.from_constants(await client.get_hero_constants())
+    except (httpx.HTTPError, HTTPException, ValueError, AttributeError) as e:
+        logger.warning("⚠️ 获取英雄常量失败（当前英雄表 %s 个英雄）: %s", len(hero_table), e)
+        return
+    if not len(table):
+        return
+    hero_table = table
+    await asyncio.to_thread(save_snapshot, settings.HERO_CONSTANTS_PATH, table)
+    logger.info("🦸 已加载 %s 个英雄", len(table))
 
 
 @router.get(
@@ -37,210 +235,986 @@ async def lifespan(app):
         500: {"model": ErrorResponse, "description": "服务器错误"},
     },
 )
-async def get_player_analysis(account_id: int) -> PlayerAnalysisResponse:
+async def get_player_analysis(
+    account_id: int,
+    limit: int = WINDOW_LIMIT_QUERY,
+    days: Optional[int] = WINDOW_DAYS_QUERY,
+) -> FastJSONResponse:
     """获取玩家战绩分析.
 
     :param account_id: Steam账号ID
+    :param limit: 分析最近多少场比赛
+    :param days: 只分析最近多少天内的比赛
     :return: 玩家分析数据
     :raises HTTPException: 当玩家不存在或API调用失败时
     """
-    print(f"🎯 ========== 开始处理玩家 {account_id} 的分析请求 ==========")
-    logger.info(f"🎯 ========== 开始处理玩家 {account_id} 的分析请求 ==========")
-    
-    if not opendota_client:
+    if not opendota_client or not name_resolver:
         logger.error("❌ OpenDota客户端未初始化！")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="服务未初始化",
         )
 
+    if prefetch_worker:
+        prefetch_worker.track(account_id)
+
+    window = AnalysisWindow(limit, days)
+    result = await analysis_cache.get((account_id, window))
+    metrics.record_cache("analysis", result is not None)
+    if result is not None:
+        logger.debug("⚡ 玩家 %s 命中分析缓存", account_id)
+    else:
+        result = await _analysis_inflight.run(
+            (account_id, window), lambda: _compute_player_analysis(account_id, window)
+        )
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse(result)
+
+
+async def _compute_player_analysis(
+    account_id: int, window: AnalysisWindow
+) -> Dict[str, Any]:
+    """计算玩家分析并写入缓存.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :return: 玩家分析数据
+    """
+    with metrics.track_stages():
+        result = await _build_player_analysis(account_id, window)
+    if settings.ANALYSIS_CACHE_TTL > 0:
+        await analysis_cache.set((account_id, window), result)
+    return result
+
+
+async def _build_player_analysis(
+    account_id: int, window: AnalysisWindow
+) -> Dict[str, Any]:
+    """从OpenDota拉取数据并生成玩家分析.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :return: 玩家分析数据
+    :raises HTTPException: 当玩家不存在或API调用失败时
+    """
+    logger.info("🎯 开始处理玩家 %s 的分析请求", account_id)
+
     try:
-        logger.info(f"📊 开始获取玩家 {account_id} 的最近比赛...")
-        # 获取最近20场比赛
-        matches = await opendota_client.get_player_recent_matches(account_id, limit=20)
-
-        if not matches:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"未找到账号 {account_id} 的比赛数据",
-            )
+        loaded = await _load_match_window(account_id, window)
+        summary = loaded.summary
+        match_details_list = await _fetch_match_details(loaded.match_ids)
 
-        # 获取比赛详情（用于分析队友）- 使用并发请求提高速度
-        logger.info(f"📥 开始并发获取 {len(matches[:20])} 场比赛详情...")
-        
-        async def fetch_match_detail(match: Dict) -> Optional[Dict]:
-            """获取单场比赛详情，带重试机制."""
-            match_id = match.get("match_id")
-            if not match_id:
-                return None
-            
-            max_retries = 2
-            for attempt in range(max_retries):
-                try:
-                    match_details = await opendota_client.get_match_details(match_id)
-                    if attempt > 0:
-                        logger.info(f"✅ 比赛 {match_id} 详情获取成功（重试 {attempt} 次后）")
-                    return match_details
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 0.5  # 递增等待时间：0.5s, 1s
-                        logger.warning(f"⚠️ 获取比赛 {match_id} 详情失败（尝试 {attempt + 1}/{max_retries}），{wait_time}秒后重试: {e}")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.warning(f"❌ 获取比赛 {match_id} 详情最终失败: {e}")
-                        return None
-            return None
-        
-        # 并发获取所有比赛详情（限制并发数为5，避免触发API速率限制）
-        semaphore = asyncio.Semaphore(5)  # 最多5个并发请求
-        
-        async def fetch_with_semaphore(match: Dict):
-            async with semaphore:
-                # 添加小延迟，避免触发API速率限制
-                await asyncio.sleep(0.1)
-                return await fetch_match_detail(match)
-        
-        match_details_list = await asyncio.gather(
-            *[fetch_with_semaphore(match) for match in matches[:20]]
-        )
-        
-        # 过滤掉None值（失败的请求）
-        match_details_list = [md for md in match_details_list if md is not None]
-        logger.info(f"✅ 成功获取 {len(match_details_list)}/{len(matches[:20])} 场比赛详情")
-        
-        # 输出第一场比赛的players数据示例
-        if match_details_list and "players" in match_details_list[0]:
-            first_player = match_details_list[0]["players"][0] if match_details_list[0]["players"] else {}
-            logger.info(f"比赛 {match_details_list[0].get('match_id')} 第一个玩家数据示例: {first_player}")
-            logger.info(f"比赛 {match_details_list[0].get('match_id')} players数组长度: {len(match_details_list[0].get('players', []))}")
-
-        # 生成分析数据
-        logger.info(f"开始生成分析数据，比赛数量: {len(matches)}")
-        logger.debug(f"最近比赛数据示例（第一场）: {matches[0] if matches else '无数据'}")
-        
-        comment = AnalysisService.generate_comment(matches)
-        logger.info(f"生成的点评: {comment}")
-        
-        win_rate_curve = AnalysisService.calculate_win_rate_curve(matches)
-        statistics = AnalysisService.calculate_statistics(matches)
-
-        # 分析最佳战友和最爱损友（同时获取昵称）
-        try:
-            best_teammates_raw, worst_teammates_raw, teammate_names_from_matches = (
-                AnalysisService.analyze_teammates(match_details_list, account_id)
+        best_teammates_raw, worst_teammates_raw, teammate_names_from_matches = (
+            await _analyze_teammates(account_id, loaded, match_details_list)
+        )
+        teammate_names = await _resolve_teammate_names(
+            best_teammates_raw + worst_teammates_raw, teammate_names_from_matches
+        )
+
+        return _to_analysis_response(
+            account_id,
+            summary,
+            best_teammates_raw,
+            worst_teammates_raw,
+            teammate_names,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("获取玩家分析失败: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取玩家分析失败: {str(e)}",
+        )
+
+
+@router.post(
+    "/players/analysis/batch",
+    response_model=BatchAnalysisResponse,
+    responses={
+        500: {"model": ErrorResponse, "description": "服务器错误"},
+    },
+)
+async def get_batch_analysis(request: BatchAnalysisRequest) -> FastJSONResponse:
+    """批量获取多个玩家（如一个车队或比赛名单）的战绩分析.
+
+    所有玩家需要的比赛详情去重后只获取一次，再分别为每个玩家做队友分析，
+    队友昵称也合并解析。单个玩家失败不影响其他玩家，记录在errors中。
+
+    :param request: 批量分析请求
+    :return: 各玩家的分析数据
+    :raises HTTPException: 当服务未初始化时
+    """
+    if not opendota_client or not name_resolver:
+        logger.error("❌ OpenDota客户端未初始化！")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="服务未初始化",
+        )
+
+    account_ids = list(dict.fromkeys(request.account_ids))
+    if prefetch_worker:
+        for account_id in account_ids:
+            prefetch_worker.track(account_id)
+
+    window = AnalysisWindow(request.limit, request.days)
+    with metrics.track_stages():
+        result = await _build_batch_analysis(account_ids, window)
+
+    with metrics.stage("serialization"):
+        return FastJSONResponse(result)
+
+
+async def _build_batch_analysis(
+    account_ids: List[int], window: AnalysisWindow
+) -> Dict[str, Any]:
+    """生成多个玩家的分析，共享比赛详情的获取.
+
+    :param account_ids: 去重后的账号ID列表
+    :param window: 分析窗口
+    :return: 批量分析响应（BatchAnalysisResponse结构）
+    """
+    logger.info("🎯 开始处理 %s 个玩家的批量分析请求", len(account_ids))
+    results: Dict[int, Dict[str, Any]] = {}
+    errors: List[Dict[str, Any]] = []
+
+    cached = await analysis_cache.get_many(
+        (account_id, window) for account_id in account_ids
+    )
+    pending = []
+    for account_id in account_ids:
+        result = cached.get((account_id, window))
+        metrics.record_cache("analysis", result is not None)
+        if result is not None:
+            results[account_id] = result
+        else:
+            pending.append(account_id)
+
+    loads = await asyncio.gather(
+        *[_load_match_window(account_id, window) for account_id in pending],
+        return_exceptions=True,
+    )
+    loaded: Dict[int, WindowLoad] = {}
+    for account_id, load in zip(pending, loads):
+        if isinstance(load, HTTPException):
+            errors.append(
+                {
+                    "account_id": account_id,
+                    "status_code": load.status_code,
+                    "detail": load.detail,
+                }
             )
-        except Exception as e:
-            logger.error(f"分析队友数据失败: {e}", exc_info=True)
-            best_teammates_raw, worst_teammates_raw, teammate_names_from_matches = [], [], {}
-
-        # 对于没有从比赛详情中获取到昵称的队友，尝试通过API获取
-        teammate_ids = set()
-        for t in best_teammates_raw + worst_teammates_raw:
-            teammate_ids.add(t["account_id"])
-
-        teammate_names: Dict[int, str] = teammate_names_from_matches.copy()
-
-        # 批量获取缺失昵称的队友信息（多源获取）
-        for teammate_id in teammate_ids:
-            if teammate_id not in teammate_names:
-                name = None
-                
-                # 方法1：从OpenDota API获取
-                try:
-                    logger.info(f"🔍 尝试从OpenDota API获取队友 {teammate_id} 昵称...")
-                    player_info = await opendota_client.get_player_info(teammate_id)
-                    if player_info:
-                        logger.info(f"✅ OpenDota API返回了队友 {teammate_id} 的数据")
-                        # OpenDota API返回的数据结构可能是：
-                        # - profile.personaname (最常见)
-                        # - profile.name
-                        # - 或者直接在根级别
-                        if "profile" in player_info:
-                            profile = player_info["profile"]
-                            logger.info(f"队友 {teammate_id} profile数据: {profile}")
-                            name = profile.get("personaname") or profile.get("name")
-                            logger.info(f"从profile中提取的昵称: {name}")
-                        
-                        # 如果profile中没有，尝试根级别
-                        if not name:
-                            name = player_info.get("personaname") or player_info.get("name")
-                            logger.info(f"从根级别提取的昵称: {name}")
-                        
-                        if name:
-                            logger.info(f"✅ 从OpenDota获取到队友 {teammate_id} 昵称: {name}")
-                        else:
-                            logger.warning(f"❌ OpenDota API返回的数据中没有找到昵称字段")
-                    else:
-                        logger.warning(f"❌ OpenDota API返回None（玩家 {teammate_id} 可能不存在）")
-                except Exception as e:
-                    logger.error(f"❌ 从OpenDota获取队友 {teammate_id} 信息失败: {e}", exc_info=True)
-                
-                # 方法2：如果OpenDota没有，尝试从Steam获取
-                if not name:
-                    try:
-                        name = await opendota_client.get_player_name_from_steam(teammate_id)
-                        if name:
-                            logger.debug(f"从Steam获取到队友 {teammate_id} 昵称: {name}")
-                    except Exception as e:
-                        logger.debug(f"从Steam获取队友 {teammate_id} 昵称失败: {e}")
-                
-                # 如果所有方法都失败，使用默认值
-                if not name:
-                    teammate_names[teammate_id] = f"玩家{teammate_id}"
-                    logger.warning(f"无法获取队友 {teammate_id} 的昵称，使用默认值")
-                else:
-                    teammate_names[teammate_id] = name
-
-        # 转换为响应格式
-        from src.api.v1.schemas import TeammateInfo
-
-        # 确保所有队友都有昵称
-        for t in best_teammates_raw + worst_teammates_raw:
-            if t["account_id"] not in teammate_names:
-                teammate_names[t["account_id"]] = f"玩家{t['account_id']}"
-
-        best_teammates = [
-            TeammateInfo(
-                account_id=t["account_id"],
-                name=teammate_names[t["account_id"]],
-                team_count=t["team_count"],
-                win_count=t["win_count"],
-                loss_count=t["loss_count"],
-                win_rate=t["win_rate"],
+        elif isinstance(load, Exception):
+            logger.error("获取玩家 %s 分析失败: %s", account_id, load, exc_info=load)
+            errors.append(
+                {
+                    "account_id": account_id,
+                    "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "detail": f"获取玩家分析失败: {str(load)}",
+                }
             )
-            for t in best_teammates_raw
+        elif isinstance(load, BaseException):
+            raise load
+        else:
+            loaded[account_id] = load
+
+    # 同一车队的比赛大多是共享的，去重后每场比赛只获取一次详情
+    match_count = sum(len(load.match_ids) for load in loaded.values())
+    unique_match_ids = list(
+        dict.fromkeys(
+            match_id for load in loaded.values() for match_id in load.match_ids
+        )
+    )
+    # 上游偶尔返回缺少match_id的不完整详情，跳过这些比赛而不是让整批请求失败
+    details_by_id = {
+        match_id: details
+        for details in await _fetch_match_details(unique_match_ids)
+        if (match_id := details.get("match_id")) is not None
+    }
+    logger.debug(
+        "批量分析需要 %s 场比赛详情，去重后 %s 场", match_count, len(unique_match_ids)
+    )
+
+    teammates: Dict[int, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    teammate_names_from_matches: Dict[int, str] = {}
+    for account_id, load in loaded.items():
+        player_details = [
+            details_by_id[match_id]
+            for match_id in load.match_ids
+            if match_id in details_by_id
         ]
+        best, worst, names = await _analyze_teammates(account_id, load, player_details)
+        teammates[account_id] = (best, worst)
+        teammate_names_from_matches.update(names)
+
+    teammate_names = await _resolve_teammate_names(
+        [t for best, worst in teammates.values() for t in best + worst],
+        teammate_names_from_matches,
+    )
+    for account_id, load in loaded.items():
+        best, worst = teammates[account_id]
+        results[account_id] = _to_analysis_response(
+            account_id, load.summary, best, worst, teammate_names
+        )
+    if settings.ANALYSIS_CACHE_TTL > 0:
+        await analysis_cache.set_many(
+            {(account_id, window): results[account_id] for account_id in loaded}
+        )
+
+    return {
+        "results": [results[a] for a in account_ids if a in results],
+        "errors": errors,
+        "match_count": match_count,
+        "unique_match_count": len(unique_match_ids),
+    }
+
+
+@router.get(
+    "/players/{account_id}/teammates",
+    response_model=TeammateIndexResponse,
+    responses={
+        503: {"model": ErrorResponse, "description": "队友索引未启用"},
+    },
+)
+async def get_player_teammates(
+    account_id: int,
+    limit: int = Query(10, ge=1, le=100, description="每个列表返回的队友数"),
+    min_games: int = Query(2, ge=1, description="最少同队场次"),
+) -> TeammateIndexResponse:
+    """基于所有已缓存比赛查询玩家的队友统计（不请求OpenDota比赛数据）.
 
-        worst_teammates = [
-            TeammateInfo(
-                account_id=t["account_id"],
-                name=teammate_names[t["account_id"]],
-                team_count=t["team_count"],
-                win_count=t["win_count"],
-                loss_count=t["loss_count"],
-                win_rate=t["win_rate"],
+    :param account_id: Steam账号ID
+    :param limit: 每个列表返回的队友数
+    :param min_games: 最少同队场次
+    :return: 最常一起排的队友、最佳战友和最爱损友
+    :raises HTTPException: 当队友索引未启用时
+    """
+    index = _require_teammate_index()
+    teammates = await index.teammates(account_id, min_games)
+    most_played = teammates[:limit]
+    best = sorted(teammates, key=lambda t: t["wins"], reverse=True)[:limit]
+    worst = sorted(teammates, key=lambda t: t["losses"], reverse=True)[:limit]
+    names = await _resolve_teammate_names(most_played + best + worst, {})
+
+    def to_records(rows: List[Dict[str, Any]]) -> List[TeammateRecord]:
+        return [
+            TeammateRecord(
+                name=names.get(t["account_id"], f"玩家{t['account_id']}"), **t
             )
-            for t in worst_teammates_raw
+            for t in rows
         ]
 
-        return PlayerAnalysisResponse(
-            account_id=account_id,
-            comment=comment,
-            win_rate_curve=win_rate_curve,
-            best_teammates=best_teammates,
-            worst_teammates=worst_teammates,
-            statistics=statistics,
+    return TeammateIndexResponse(
+        account_id=account_id,
+        match_count=await index.match_count(account_id),
+        most_played=to_records(most_played),
+        best_teammates=to_records(best),
+        worst_teammates=to_records(worst),
+    )
+
+
+@router.get(
+    "/players/{account_id}/head-to-head/{other_account_id}",
+    response_model=HeadToHeadResponse,
+    responses={
+        503: {"model": ErrorResponse, "description": "队友索引未启用"},
+    },
+)
+async def get_head_to_head(
+    account_id: int, other_account_id: int
+) -> HeadToHeadResponse:
+    """基于所有已缓存比赛查询两名玩家同队和对阵的战绩.
+
+    :param account_id: Steam账号ID
+    :param other_account_id: 另一名玩家的Steam账号ID
+    :return: 从account_id角度的同队和对阵战绩
+    :raises HTTPException: 当队友索引未启用时
+    """
+    index = _require_teammate_index()
+    records = await index.head_to_head(account_id, other_account_id)
+    return HeadToHeadResponse(
+        account_id=account_id, other_account_id=other_account_id, **records
+    )
+
+
+def _require_teammate_index() -> TeammateIndex:
+    """获取队友索引.
+
+    :raises HTTPException: 当队友索引未启用时
+    """
+    if teammate_index is None or name_resolver is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="队友索引未启用",
+        )
+    return teammate_index
+
+
+@router.get(
+    "/heroes/{hero_id}/matchups",
+    response_model=HeroMatchupsResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "英雄没有对位数据"},
+        503: {"model": ErrorResponse, "description": "英雄对位矩阵未生成"},
+    },
+)
+async def get_hero_matchups(
+    hero_id: int,
+    limit: int = Query(
+        5, ge=1, le=settings.HERO_MATCHUPS_TOP, description="每个列表返回的英雄数"
+    ),
+) -> HeroMatchupsResponse:
+    """查询英雄最好和最差的对位及配合（来自预先计算的矩阵）.
+
+    :param hero_id: 英雄ID
+    :param limit: 每个列表返回的英雄数
+    :return: 英雄总战绩和对位、配合列表
+    :raises HTTPException: 当矩阵未生成或英雄没有数据时
+    """
+    matchups = _require_hero_matchups()
+    if hero_id not in matchups:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"英雄 {hero_id} 没有对位数据",
+        )
+    return HeroMatchupsResponse(
+        match_count=matchups.match_count,
+        **matchups.matchups(hero_id, limit, hero_table),
+    )
+
+
+@router.get(
+    "/players/{account_id}/hero-matchups",
+    response_model=PlayerHeroMatchupsResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "玩家不存在"},
+        503: {"model": ErrorResponse, "description": "英雄对位矩阵未生成"},
+    },
+)
+async def get_player_hero_matchups(
+    account_id: int,
+    heroes: int = Query(3, ge=1, le=10, description="返回最近最常用的几个英雄"),
+    limit: int = Query(
+        5, ge=1, le=settings.HERO_MATCHUPS_TOP, description="每个列表返回的英雄数"
+    ),
+) -> PlayerHeroMatchupsResponse:
+    """查询玩家最近常用英雄的最好和最差对位及配合.
+
+    :param account_id: Steam账号ID
+    :param heroes: 返回的英雄数
+    :param limit: 每个列表返回的英雄数
+    :return: 各英雄的对位和配合
+    :raises HTTPException: 当矩阵未生成或玩家没有比赛数据时
+    """
+    matchups = _require_hero_matchups()
+    matches = await _fetch_recent_matches(account_id)
+    played: Dict[int, int] = {}
+    for match in matches:
+        hero_id = match.get("hero_id")
+        if isinstance(hero_id, int) and hero_id in matchups:
+            played[hero_id] = played.get(hero_id, 0) + 1
+    top_heroes = sorted(played, key=lambda h: (-played[h], h))[:heroes]
+    return PlayerHeroMatchupsResponse(
+        account_id=account_id,
+        match_count=matchups.match_count,
+        heroes=[
+            HeroMatchupSummary(**matchups.matchups(h, limit, hero_table))
+            for h in top_heroes
+        ],
+    )
+
+
+def _require_hero_matchups() -> HeroMatchups:
+    """获取英雄对位矩阵.
+
+    :raises HTTPException: 当矩阵未生成或未载入时
+    """
+    if hero_matchups is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="英雄对位矩阵未生成（运行 python -m src.matchups）",
+        )
+    return hero_matchups
+
+
+@router.get(
+    "/players/{account_id}/analysis/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "按行输出的分段分析结果",
+        },
+        404: {"model": ErrorResponse, "description": "玩家不存在"},
+        500: {"model": ErrorResponse, "description": "服务器错误"},
+    },
+)
+async def stream_player_analysis(
+    account_id: int,
+    limit: int = WINDOW_LIMIT_QUERY,
+    days: Optional[int] = WINDOW_DAYS_QUERY,
+) -> StreamingResponse:
+    """分段流式返回玩家战绩分析（NDJSON）.
+
+    每行一个 ``{"section": ..., "data": ...}`` 对象，依次为：
+
+    - ``summary``：点评、胜率曲线和统计数据（只依赖比赛列表）
+    - ``teammates``：最佳战友和最爱损友，未解析的昵称暂用默认值
+    - ``names``：补全后的队友昵称
+    - ``done``：结束；中途出错时输出 ``error`` 后结束
+
+    :param account_id: Steam账号ID
+    :param limit: 分析最近多少场比赛
+    :param days: 只分析最近多少天内的比赛
+    :return: NDJSON流式响应
+    :raises HTTPException: 当玩家不存在或API调用失败时
+    """
+    if not opendota_client or not name_resolver:
+        logger.error("❌ OpenDota客户端未初始化！")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="服务未初始化",
         )
 
+    if prefetch_worker:
+        prefetch_worker.track(account_id)
+
+    window = AnalysisWindow(limit, days)
+    cached = await analysis_cache.get((account_id, window))
+    metrics.record_cache("analysis", cached is not None)
+    if cached is not None:
+        logger.debug("⚡ 玩家 %s 命中分析缓存", account_id)
+        return StreamingResponse(
+            _stream_cached_analysis(cached), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    # 在开始输出前获取比赛列表，这样玩家不存在时仍能返回正常的404
+    timings = metrics.begin_stages()
+    try:
+        loaded = await _load_match_window(account_id, window)
     except HTTPException:
+        timings.observe()
         raise
     except Exception as e:
-        logger.error(f"获取玩家分析失败: {e}", exc_info=True)
+        logger.error("获取玩家最近比赛失败: %s", e, exc_info=True)
+        timings.observe()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取玩家分析失败: {str(e)}",
         )
 
+    return StreamingResponse(
+        _stream_analysis(account_id, window, loaded, timings),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+async def _stream_analysis(
+    account_id: int,
+    window: AnalysisWindow,
+    loaded: WindowLoad,
+    timings: metrics.StageTimings,
+) -> AsyncIterator[bytes]:
+    """按阶段生成分析结果，每个阶段完成后立即输出.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :param loaded: 已加载的窗口数据
+    :param timings: 本次请求的阶段耗时记录，输出结束时写入指标
+    :return: NDJSON行的异步迭代器
+    """
+    try:
+        async for line in _stream_analysis_sections(account_id, window, loaded):
+            yield line
+    finally:
+        timings.observe()
+
+
+async def _stream_analysis_sections(
+    account_id: int,
+    window: AnalysisWindow,
+    loaded: WindowLoad,
+) -> AsyncIterator[bytes]:
+    """依次生成各阶段的NDJSON行.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :param loaded: 已加载的窗口数据
+    :return: NDJSON行的异步迭代器
+    """
+    summary = loaded.summary
+    yield _ndjson_line("summary", summary)
+
+    try:
+        match_details_list = await _fetch_match_details(loaded.match_ids)
+        best_teammates_raw, worst_teammates_raw, teammate_names_from_matches = (
+            await _analyze_teammates(account_id, loaded, match_details_list)
+        )
+        yield _ndjson_line(
+            "teammates",
+            {
+                "best_teammates": _to_teammate_infos(
+                    best_teammates_raw, teammate_names_from_matches
+                ),
+                "worst_teammates": _to_teammate_infos(
+                    worst_teammates_raw, teammate_names_from_matches
+                ),
+            },
+        )
+
+        teammate_names = await _resolve_teammate_names(
+            best_teammates_raw + worst_teammates_raw, teammate_names_from_matches
+        )
+        yield _ndjson_line(
+            "names",
+            {
+                "names": {
+                    str(teammate_id): name
+                    for teammate_id, name in teammate_names.items()
+                    if teammate_id not in teammate_names_from_matches
+                }
+            },
+        )
+
+        if settings.ANALYSIS_CACHE_TTL > 0:
+            await analysis_cache.set(
+                (account_id, window),
+                _to_analysis_response(
+                    account_id,
+                    summary,
+                    best_teammates_raw,
+                    worst_teammates_raw,
+                    teammate_names,
+                ),
+            )
+    except Exception as e:
+        logger.error("流式分析玩家 %s 失败: %s", account_id, e, exc_info=True)
+        yield _ndjson_line("error", {"detail": f"获取玩家分析失败: {str(e)}"})
+        return
+
+    yield _ndjson_line("done", {})
+
+
+async def _stream_cached_analysis(
+    data: Dict[str, Any],
+) -> AsyncIterator[bytes]:
+    """把缓存的完整分析按流式格式一次性输出.
+
+    :param data: 缓存的分析结果
+    :return: NDJSON行的异步迭代器
+    """
+    yield _ndjson_line(
+        "summary",
+        {
+            "account_id": data["account_id"],
+            "comment": data["comment"],
+            "win_rate_curve": data["win_rate_curve"],
+            "statistics": data["statistics"],
+            "heroes": data["heroes"],
+        },
+    )
+    yield _ndjson_line(
+        "teammates",
+        {
+            "best_teammates": data["best_teammates"],
+            "worst_teammates": data["worst_teammates"],
+        },
+    )
+    yield _ndjson_line("names", {"names": {}})
+    yield _ndjson_line("done", {})
+
+
+@metrics.timed_stage("serialization")
+def _ndjson_line(section: str, data: Dict[str, Any]) -> bytes:
+    """序列化一行NDJSON."""
+    return dumps({"section": section, "data": data}) + b"\n"
+
+
+async def _load_match_window(
+    account_id: int, window: AnalysisWindow
+) -> WindowLoad:
+    """获取分析窗口内的比赛并生成分析摘要.
+
+    有持久化的聚合状态时只获取比上次更新的比赛并折叠进去；否则小窗口直接使用
+    recentMatches，大窗口或按日期筛选时并发分页获取比赛历史，每页到达后立即
+    折叠进聚合器，不保留原始比赛列表。
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :return: 已加载的窗口数据
+    :raises HTTPException: 当玩家没有比赛数据时
+    """
+    # 按日期筛选的窗口会随时间滑动，不做增量聚合
+    if aggregate_store is not None and window.days is None:
+        return await _load_incremental_window(account_id, window)
+
+    if window.uses_recent_matches:
+        matches = await _fetch_recent_matches(account_id, window.limit)
+        match_ids = [
+            m["match_id"]
+            for m in matches[: settings.TEAMMATE_MATCH_LIMIT]
+            if m.get("match_id")
+        ]
+        return WindowLoad(_build_summary(account_id, matches), match_ids)
+
+    aggregator = await _aggregate_match_pages(account_id, window)
+    return WindowLoad(
+        _summary_from_aggregator(account_id, aggregator),
+        aggregator.match_ids(settings.TEAMMATE_MATCH_LIMIT),
+    )
+
+
+async def _load_incremental_window(
+    account_id: int, window: AnalysisWindow
+) -> WindowLoad:
+    """基于持久化的聚合状态加载窗口，只处理新比赛.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :return: 已加载的窗口数据（包含更新后的聚合状态）
+    :raises HTTPException: 当玩家没有比赛数据时
+    """
+    with metrics.stage("match_list"):
+        aggregate = await _initialized(aggregate_store).load(account_id, window.limit)
+    if aggregate is None:
+        if window.uses_recent_matches:
+            aggregator = MatchAggregator()
+            aggregator.add(await _fetch_recent_matches(account_id, window.limit))
+        else:
+            aggregator = await _aggregate_match_pages(account_id, window)
+        aggregate = PlayerAggregate(account_id, window.limit, aggregator)
+    else:
+        new_matches = await _fetch_new_matches(
+            account_id, window, aggregate.last_match_id
+        )
+        logger.debug("♻️ 玩家 %s 复用聚合状态，新增 %s 场比赛", account_id, len(new_matches))
+        aggregate.fold_matches(new_matches)
+
+    return WindowLoad(
+        _summary_from_aggregator(account_id, aggregate.matches),
+        aggregate.missing_details(settings.TEAMMATE_MATCH_LIMIT),
+        aggregate,
+    )
+
+
+@metrics.timed_stage("match_list")
+async def _fetch_new_matches(
+    account_id: int, window: AnalysisWindow, last_match_id: Optional[int]
+) -> List[Dict[str, Any]]:
+    """获取比last_match_id更新的比赛（最多一个窗口）.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :param last_match_id: 已处理的最新比赛ID
+    :return: 新比赛列表（按时间倒序）
+    """
+    last_match_id = last_match_id or 0
+    if window.uses_recent_matches:
+        matches = await _fetch_recent_matches(account_id, window.limit)
+        return [m for m in matches if (m.get("match_id") or 0) > last_match_id]
+
+    # 逐页向前翻，遇到已处理的比赛即停止；通常第一页就能结束
+    client = _initialized(opendota_client)
+    new_matches: List[Dict[str, Any]] = []
+    page_size = min(settings.MATCH_PAGE_SIZE, window.limit)
+    while len(new_matches) < window.limit:
+        requested = min(page_size, window.limit - len(new_matches))
+        page = await client.get_player_matches(
+            account_id, limit=requested, offset=len(new_matches)
+        )
+        fresh = [m for m in page if (m.get("match_id") or 0) > last_match_id]
+        new_matches.extend(fresh)
+        if len(fresh) < len(page) or len(page) < requested:
+            break
+    return new_matches
+
+
+@metrics.timed_stage("match_list")
+async def _aggregate_match_pages(
+    account_id: int, window: AnalysisWindow
+) -> MatchAggregator:
+    """并发分页获取窗口内的比赛历史并逐页折叠.
+
+    :param account_id: Steam账号ID
+    :param window: 分析窗口
+    :return: 比赛聚合器
+    :raises HTTPException: 当玩家没有比赛数据时
+    """
+    logger.debug("📊 开始分页获取玩家 %s 的比赛历史（%s）...", account_id, window)
+    aggregator = MatchAggregator()
+    client = _initialized(opendota_client)
+    async for offset, page in client.iter_player_match_pages(
+        account_id, limit=window.limit, days=window.days
+    ):
+        aggregator.add(page, offset)
+    logger.debug("✅ 玩家 %s 窗口内共 %s 场比赛", account_id, aggregator.count)
+
+    if not aggregator.count:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"未找到账号 {account_id} 的比赛数据",
+        )
+    return aggregator
+
+
+@metrics.timed_stage("analysis")
+def _summary_from_aggregator(
+    account_id: int, aggregator: MatchAggregator
+) -> Dict[str, Any]:
+    """根据比赛聚合器生成分析摘要.
+
+    :param account_id: Steam账号ID
+    :param aggregator: 比赛聚合器
+    :return: 分析摘要
+    """
+    comment = aggregator.generate_comment()
+    logger.debug("生成的点评: %s", comment)
+    return {
+        "account_id": account_id,
+        "comment": comment,
+        "win_rate_curve": aggregator.calculate_win_rate_curve(hero_table),
+        "statistics": aggregator.calculate_statistics(),
+        "heroes": aggregator.calculate_hero_stats(hero_table),
+    }
+
+
+@metrics.timed_stage("match_list")
+async def _fetch_recent_matches(
+    account_id: int, limit: int = RECENT_MATCHES_LIMIT
+) -> List[Dict[str, Any]]:
+    """获取玩家最近比赛.
+
+    :param account_id: Steam账号ID
+    :param limit: 比赛数量
+    :return: 最近比赛列表
+    :raises HTTPException: 当玩家没有比赛数据时
+    """
+    logger.debug("📊 开始获取玩家 %s 的最近比赛...", account_id)
+    # recentMatches接口固定返回最近20场，统一按20场请求（与后台预取共用缓存）再按窗口截断
+    matches = await _initialized(opendota_client).get_player_recent_matches(
+        account_id, limit=RECENT_MATCHES_LIMIT
+    )
+    matches = matches[:limit]
+
+    if not matches:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"未找到账号 {account_id} 的比赛数据",
+        )
+    return matches
+
+
+@metrics.timed_stage("match_details")
+async def _fetch_match_details(match_ids: List[int]) -> List[Dict[str, Any]]:
+    """并发获取比赛详情（用于分析队友）.
+
+    :param match_ids: 比赛ID列表
+    :return: 获取成功的比赛详情列表
+    """
+    logger.debug("📥 开始并发获取 %s 场比赛详情...", len(match_ids))
+
+    client = _initialized(opendota_client)
+
+    async def fetch_match_detail(match_id: int) -> Optional[Dict[str, Any]]:
+        """获取单场比赛详情，带重试机制（熔断时不重试）."""
+        max_retries = 2
+        for attempt in range(max_retries):
+            try:
+                match_details = await client.get_match_details(match_id)
+                if attempt > 0:
+                    logger.info("✅ 比赛 %s 详情获取成功（重试 %s 次后）", match_id, attempt)
+                return match_details
+            except CircuitOpenError as e:
+                logger.debug("跳过比赛 %s 详情: %s", match_id, e)
+                return None
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    wait_time = (attempt + 1) * 0.5  # 递增等待时间：0.5s, 1s
+                    logger.warning(
+                        "⚠️ 获取比赛 %s 详情失败（尝试 %s/%s），%s秒后重试: %s",
+                        match_id,
+                        attempt + 1,
+                        max_retries,
+                        wait_time,
+                        e,
+                    )
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.warning("❌ 获取比赛 %s 详情最终失败: %s", match_id, e)
+                    return None
+        return None
+
+    # 并发获取所有比赛详情（速率和并发由OpenDotaClient的全局调度器控制）
+    tasks = [asyncio.ensure_future(fetch_match_detail(match_id)) for match_id in match_ids]
+    if not tasks:
+        return []
+    # 超过总时限时用已获取的详情继续分析；未完成的请求在后台继续并写入比赛缓存，
+    # 缺少的详情在下次分析时补上
+    deadline = settings.MATCH_DETAILS_DEADLINE or None
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        metrics.MATCH_DETAILS_DEADLINE_EXCEEDED.inc()
+        logger.warning(
+            "⏱️ 获取比赛详情超过 %s 秒，%s/%s 场未完成，使用已获取的详情",
+            deadline,
+            len(pending),
+            len(tasks),
+        )
+
+    # 过滤掉未完成和失败的请求
+    match_details_list = [
+        result
+        for task in tasks
+        if task in done and (result := task.result()) is not None
+    ]
+    logger.debug("✅ 成功获取 %s/%s 场比赛详情", len(match_details_list), len(match_ids))
+
+    # 输出第一场比赛的players数据示例
+    if match_details_list and logger.isEnabledFor(logging.DEBUG):
+        first_match = match_details_list[0]
+        players = first_match.get("players") or []
+        logger.debug(
+            "比赛 %s 第一个玩家数据示例: %s（players数组长度: %s）",
+            first_match.get("match_id"),
+            players[0] if players else {},
+            len(players),
+        )
+    return match_details_list
+
+
+@metrics.timed_stage("analysis")
+def _build_summary(account_id: int, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """根据最近比赛列表生成点评、胜率曲线和统计数据.
+
+    :param account_id: Steam账号ID
+    :param matches: 最近比赛列表
+    :return: 分析摘要
+    """
+    logger.debug("开始生成分析数据，比赛数量: %s", len(matches))
+    logger.debug("最近比赛数据示例（第一场）: %s", matches[0] if matches else '无数据')
+
+    # 列式表每次请求只构建一次，所有聚合都在它上面完成
+    table = as_match_table(matches) if settings.ANALYSIS_COLUMNAR else matches
+
+    comment = AnalysisService.generate_comment(table)
+    logger.debug("生成的点评: %s", comment)
+    statistics, heroes = AnalysisService.summarize_statistics(table, hero_table)
+
+    return {
+        "account_id": account_id,
+        "comment": comment,
+        "win_rate_curve": AnalysisService.calculate_win_rate_curve(table, hero_table),
+        "statistics": statistics,
+        "heroes": heroes,
+    }
+
+
+@metrics.timed_stage("analysis")
+async def _analyze_teammates(
+    account_id: int, loaded: WindowLoad, match_details_list: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, str]]:
+    """分析最佳战友和最爱损友（同时获取昵称），出错时返回空结果.
+
+    使用增量聚合状态时只把新获取的比赛详情计入队友统计，并保存更新后的状态。
+
+    :param account_id: Steam账号ID
+    :param loaded: 已加载的窗口数据
+    :param match_details_list: 新获取的比赛详情列表
+    :return: (最佳战友列表, 最爱损友列表, 队友昵称字典)
+    """
+    try:
+        if loaded.aggregate is None:
+            return AnalysisService.analyze_teammates(match_details_list, account_id)
+        loaded.aggregate.add_details(match_details_list)
+        await _initialized(aggregate_store).save(loaded.aggregate)
+        return loaded.aggregate.teammates.results()
+    except Exception as e:
+        logger.error("分析队友数据失败: %s", e, exc_info=True)
+        return [], [], {}
+
+
+@metrics.timed_stage("names")
+async def _resolve_teammate_names(
+    teammates: List[Dict[str, Any]], teammate_names_from_matches: Dict[int, str]
+) -> Dict[int, str]:
+    """补全队友昵称.
+
+    比赛详情中带出的昵称写入缓存，其余队友并发解析（命中缓存的不再请求），
+    仍然查不到的使用默认昵称。
+
+    :param teammates: 队友统计列表
+    :param teammate_names_from_matches: 从比赛详情中获取的昵称
+    :return: 每个队友的昵称
+    """
+    resolver = _initialized(name_resolver)
+    await resolver.remember(teammate_names_from_matches)
+    teammate_names: Dict[int, str] = teammate_names_from_matches.copy()
+    missing_ids = {
+        t["account_id"] for t in teammates if t["account_id"] not in teammate_names
+    }
+    if missing_ids:
+        logger.debug("🔍 并发解析 %s 个队友昵称...", len(missing_ids))
+        teammate_names.update(await resolver.resolve(missing_ids))
+
+    # 确保所有队友都有昵称
+    for teammate_id in missing_ids:
+        if teammate_id not in teammate_names:
+            teammate_names[teammate_id] = f"玩家{teammate_id}"
+    return teammate_names
+
+
+def _to_analysis_response(
+    account_id: int,
+    summary: Dict[str, Any],
+    best_teammates: List[Dict[str, Any]],
+    worst_teammates: List[Dict[str, Any]],
+    teammate_names: Dict[int, str],
+) -> Dict[str, Any]:
+    """组装玩家分析响应.
+
+    :param account_id: Steam账号ID
+    :param summary: 分析摘要
+    :param best_teammates: 最佳战友统计
+    :param worst_teammates: 最爱损友统计
+    :param teammate_names: 队友昵称
+    :return: 玩家分析数据（PlayerAnalysisResponse结构）
+    """
+    return {
+        "account_id": account_id,
+        "comment": summary["comment"],
+        "win_rate_curve": summary["win_rate_curve"],
+        "best_teammates": _to_teammate_infos(best_teammates, teammate_names),
+        "worst_teammates": _to_teammate_infos(worst_teammates, teammate_names),
+        "statistics": summary["statistics"],
+        "heroes": summary["heroes"],
+    }
+
+
+def _to_teammate_infos(
+    teammates: List[Dict[str, Any]], teammate_names: Dict[int, str]
+) -> List[Dict[str, Any]]:
+    """转换为响应格式.
+
+    :param teammates: 队友统计列表
+    :param teammate_names: 队友昵称，缺失时使用默认昵称
+    :return: 队友信息列表（TeammateInfo结构）
+    """
+    return [
+        {
+            "account_id": t["account_id"],
+            "name": teammate_names.get(t["account_id"], f"玩家{t['account_id']}"),
+            "team_count": t["team_count"],
+            "win_count": t["win_count"],
+            "loss_count": t["loss_count"],
+            "win_rate": t["win_rate"],
+        }
+        for t in teammates
+    ]
+
 
 api_router = router
 
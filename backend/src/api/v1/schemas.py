@@ -4,6 +4,8 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
+from src.core.config import settings
+
 
 class WinRatePoint(BaseModel):
     """胜率曲线数据点."""
@@ -16,6 +18,7 @@ class WinRatePoint(BaseModel):
     deaths: int = Field(0, description="死亡数")
     assists: int = Field(0, description="助攻数")
     hero_id: Optional[int] = Field(None, description="英雄ID")
+    hero_name: Optional[str] = Field(None, description="英雄名称")
     duration: int = Field(0, description="游戏时长（秒）")
 
 
@@ -45,6 +48,32 @@ class Statistics(BaseModel):
     avg_hero_damage: float = Field(..., description="平均英雄伤害")
 
 
+class HeroStats(BaseModel):
+    """单个英雄的统计."""
+
+    hero_id: int = Field(..., description="英雄ID")
+    hero_name: Optional[str] = Field(None, description="英雄名称")
+    games: int = Field(..., description="使用场次")
+    wins: int = Field(..., description="胜利次数")
+    losses: int = Field(..., description="失败次数")
+    win_rate: float = Field(..., description="胜率")
+    avg_kills: float = Field(..., description="平均击杀数")
+    avg_deaths: float = Field(..., description="平均死亡数")
+    avg_assists: float = Field(..., description="平均助攻数")
+    kda: float = Field(..., description="KDA")
+    avg_gpm: float = Field(..., description="平均每分钟金钱")
+
+
+class AnalysisSummary(BaseModel):
+    """分析摘要（只依赖最近比赛列表即可生成的部分）."""
+
+    account_id: int = Field(..., description="账号ID")
+    comment: str = Field(..., description="一句话点评")
+    win_rate_curve: List[WinRatePoint] = Field(..., description="胜率曲线数据")
+    statistics: Statistics = Field(..., description="统计数据")
+    heroes: List[HeroStats] = Field(default_factory=list, description="按英雄的统计")
+
+
 class PlayerAnalysisResponse(BaseModel):
     """玩家分析响应."""
 
@@ -54,6 +83,124 @@ class PlayerAnalysisResponse(BaseModel):
     best_teammates: List[TeammateInfo] = Field(default_factory=list, description="最佳战友")
     worst_teammates: List[TeammateInfo] = Field(default_factory=list, description="最爱损友")
     statistics: Statistics = Field(..., description="统计数据")
+    heroes: List[HeroStats] = Field(default_factory=list, description="按英雄的统计")
+
+
+class BatchAnalysisRequest(BaseModel):
+    """批量分析请求."""
+
+    account_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.ANALYSIS_BATCH_MAX_PLAYERS,
+        description="需要分析的账号ID列表（如一个车队或比赛名单）",
+    )
+    limit: int = Field(
+        settings.ANALYSIS_DEFAULT_WINDOW,
+        ge=1,
+        le=settings.ANALYSIS_MAX_WINDOW,
+        description="分析最近多少场比赛",
+    )
+    days: Optional[int] = Field(None, ge=1, description="只分析最近多少天内的比赛")
+
+
+class BatchAnalysisError(BaseModel):
+    """批量分析中单个玩家的错误."""
+
+    account_id: int = Field(..., description="账号ID")
+    status_code: int = Field(..., description="HTTP状态码")
+    detail: str = Field(..., description="错误信息")
+
+
+class BatchAnalysisResponse(BaseModel):
+    """批量分析响应."""
+
+    results: List[PlayerAnalysisResponse] = Field(
+        ..., description="分析成功的玩家（按请求顺序）"
+    )
+    errors: List[BatchAnalysisError] = Field(
+        default_factory=list, description="分析失败的玩家"
+    )
+    match_count: int = Field(0, description="各玩家需要的比赛详情总数")
+    unique_match_count: int = Field(0, description="去重后实际获取的比赛详情数")
+
+
+class TeammateRecord(BaseModel):
+    """队友索引中的同队战绩."""
+
+    account_id: int = Field(..., description="队友账号ID")
+    name: str = Field(..., description="队友Steam昵称")
+    games: int = Field(..., description="同队场次")
+    wins: int = Field(..., description="胜利次数")
+    losses: int = Field(..., description="失败次数")
+    win_rate: float = Field(..., description="同队胜率")
+
+
+class TeammateIndexResponse(BaseModel):
+    """基于所有已缓存比赛的队友统计."""
+
+    account_id: int = Field(..., description="账号ID")
+    match_count: int = Field(..., description="已索引的比赛数")
+    most_played: List[TeammateRecord] = Field(..., description="最常一起排的队友")
+    best_teammates: List[TeammateRecord] = Field(..., description="最佳战友（按胜场）")
+    worst_teammates: List[TeammateRecord] = Field(..., description="最爱损友（按败场）")
+
+
+class MatchupRecord(BaseModel):
+    """两名玩家之间的战绩."""
+
+    games: int = Field(..., description="场次")
+    wins: int = Field(..., description="胜利次数")
+    losses: int = Field(..., description="失败次数")
+    win_rate: float = Field(..., description="胜率")
+
+
+class HeadToHeadResponse(BaseModel):
+    """两名玩家的交手记录（从account_id的角度）."""
+
+    account_id: int = Field(..., description="账号ID")
+    other_account_id: int = Field(..., description="另一名玩家账号ID")
+    together: MatchupRecord = Field(..., description="同队时的战绩")
+    against: MatchupRecord = Field(..., description="对阵时的战绩")
+
+
+class HeroMatchupRecord(BaseModel):
+    """与另一个英雄对阵或同队的战绩."""
+
+    hero_id: int = Field(..., description="英雄ID")
+    hero_name: Optional[str] = Field(None, description="英雄名称")
+    games: int = Field(..., description="场次")
+    wins: int = Field(..., description="胜利次数")
+    losses: int = Field(..., description="失败次数")
+    win_rate: float = Field(..., description="胜率")
+
+
+class HeroMatchupSummary(BaseModel):
+    """英雄最好和最差的对位及配合."""
+
+    hero_id: int = Field(..., description="英雄ID")
+    hero_name: Optional[str] = Field(None, description="英雄名称")
+    games: int = Field(..., description="场次")
+    wins: int = Field(..., description="胜利次数")
+    win_rate: float = Field(..., description="胜率")
+    best_against: List[HeroMatchupRecord] = Field(..., description="胜率最高的对位")
+    worst_against: List[HeroMatchupRecord] = Field(..., description="胜率最低的对位")
+    best_with: List[HeroMatchupRecord] = Field(..., description="胜率最高的队友英雄")
+    worst_with: List[HeroMatchupRecord] = Field(..., description="胜率最低的队友英雄")
+
+
+class HeroMatchupsResponse(HeroMatchupSummary):
+    """英雄对位查询响应."""
+
+    match_count: int = Field(..., description="矩阵统计的比赛数")
+
+
+class PlayerHeroMatchupsResponse(BaseModel):
+    """玩家常用英雄的对位查询响应."""
+
+    account_id: int = Field(..., description="账号ID")
+    match_count: int = Field(..., description="矩阵统计的比赛数")
+    heroes: List[HeroMatchupSummary] = Field(..., description="按最近使用场次排列的英雄")
 
 
 class ErrorResponse(BaseModel):
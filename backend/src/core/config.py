@@ -1,5 +1,7 @@
 """应用配置模块."""
 
+from typing import Dict
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,6 +14,133 @@ class Settings(BaseSettings):
     # OpenDota API配置
     OPENDOTA_API_BASE_URL: str = "https://api.opendota.com/api"
 
+    # Steam社区配置（OpenDota查不到昵称时的备用来源）
+    STEAM_COMMUNITY_BASE_URL: str = "https://steamcommunity.com"
+
+    # OpenDota限流配置（进程内所有请求共享）
+    OPENDOTA_RATE_LIMIT_PER_MINUTE: int = 60  # 每分钟请求预算
+    OPENDOTA_RATE_LIMIT_BURST: int = 20  # 允许的突发请求数
+    OPENDOTA_MAX_CONCURRENCY: int = 10  # 同时进行的请求上限
+    OPENDOTA_429_MAX_RETRIES: int = 2  # 收到429后的最大重试次数
+
+    # OpenDota连接配置（独立连接池，HTTP/2需要安装h2）
+    OPENDOTA_HTTP2: bool = True  # 一个连接上多路复用并发请求
+    OPENDOTA_MAX_CONNECTIONS: int = 10  # 连接池最大连接数
+    OPENDOTA_MAX_KEEPALIVE_CONNECTIONS: int = 5  # 保持空闲的连接数
+    OPENDOTA_KEEPALIVE_EXPIRY: float = 60.0  # 空闲连接保留时间（秒）
+    OPENDOTA_CONNECT_TIMEOUT: float = 5.0  # 建立连接超时（秒）
+    OPENDOTA_READ_TIMEOUT: float = 30.0  # 默认读取超时（秒）
+    OPENDOTA_WARM_CONNECTIONS: int = 1  # 启动时预先建立的连接数，0表示不预热
+    # 按接口覆盖读取超时（秒），环境变量使用JSON，如 {"players": 10}
+    OPENDOTA_READ_TIMEOUTS: Dict[str, float] = {
+        "recentMatches": 15.0,
+        "players": 10.0,
+        "match_details": 10.0,  # 卡住的详情请求不长期占用并发名额
+    }
+    UPSTREAM_COMPRESSION: bool = True  # 请求gzip压缩的响应，关闭时要求不压缩
+
+    # OpenDota熔断配置（按接口统计最近请求的错误率，网络错误和5xx计为失败）
+    OPENDOTA_BREAKER_ENABLED: bool = True
+    OPENDOTA_BREAKER_WINDOW: int = 20  # 统计错误率的最近请求数
+    OPENDOTA_BREAKER_MIN_REQUESTS: int = 10  # 开始判断前至少需要的样本数
+    OPENDOTA_BREAKER_FAILURE_RATIO: float = 0.5  # 打开熔断的错误率
+    OPENDOTA_BREAKER_OPEN_SECONDS: float = 30.0  # 熔断持续时间（秒）
+
+    # 比赛详情尾延迟控制
+    MATCH_DETAILS_HEDGE: bool = False  # 超过近期分位延迟仍未返回时再发一个相同请求
+    MATCH_DETAILS_HEDGE_PERCENTILE: float = 95.0  # 触发对冲请求的延迟分位
+    MATCH_DETAILS_HEDGE_MIN_DELAY: float = 0.25  # 对冲请求的最短等待时间（秒）
+    MATCH_DETAILS_DEADLINE: float = 10.0  # 单次分析获取详情的总时限（秒），0表示不限
+
+    # Steam社区连接配置（与OpenDota使用不同的连接池）
+    STEAM_HTTP2: bool = False
+    STEAM_MAX_CONNECTIONS: int = 5
+    STEAM_KEEPALIVE_EXPIRY: float = 30.0
+    STEAM_CONNECT_TIMEOUT: float = 3.0
+    STEAM_READ_TIMEOUT: float = 5.0
+
+    # 跨进程共享状态配置（多worker或多台机器共享缓存和上游请求预算）
+    SHARED_STATE_BACKEND: str = "local"  # local（不共享）、sqlite（同一台机器）或 redis
+    SHARED_STATE_PATH: str = "data/shared_state.sqlite3"  # sqlite后端的文件路径
+    SHARED_STATE_REDIS_URL: str = "redis://localhost:6379/0"  # redis后端的地址
+    SHARED_STATE_PREFIX: str = "dota2-analysis"  # redis键前缀
+
+    # 比赛详情缓存配置（比赛结束后详情不再变化，按match_id永久缓存）
+    MATCH_CACHE_PATH: str = "data/match_cache.sqlite3"  # 留空则只使用内存缓存
+    MATCH_CACHE_MEMORY_ITEMS: int = 4096  # 内存LRU最多保留的比赛数（精简记录约1KB）
+    MATCH_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 磁盘缓存容量上限（压缩后字节数）
+    MATCH_CACHE_PRELOAD_ITEMS: int = 512  # 启动时载入内存的最近访问比赛数，0表示不预载
+
+    # 队友倒排索引配置（由所有缓存过的比赛详情构建，支持队友和交手记录查询）
+    TEAMMATE_INDEX_ENABLED: bool = True
+    TEAMMATE_INDEX_PATH: str = "data/teammate_index.sqlite3"  # 留空则只保存在内存中
+
+    # 英雄常量配置（启动时加载，磁盘快照用于离线启动）
+    HERO_CONSTANTS_PATH: str = "data/heroes.json"  # 快照文件路径，留空则不保存快照
+    HERO_CONSTANTS_MAX_AGE: int = 7 * 24 * 3600  # 快照超过该时间（秒）后启动时重新获取
+
+    # 英雄对位和配合矩阵（由 python -m src.matchups 离线计算，启动时载入，需要numpy）
+    HERO_MATCHUPS_PATH: str = "data/hero_matchups.npz"
+    HERO_MATCHUPS_MIN_GAMES: int = 20  # 参与排名的最少对位/同队场次
+    HERO_MATCHUPS_TOP: int = 10  # 每个英雄预先排好的最好/最差对位数
+
+    # 分析结果缓存配置（按account_id缓存完整的分析响应）
+    ANALYSIS_CACHE_TTL: int = 300  # 缓存有效期（秒），0表示不缓存
+    ANALYSIS_CACHE_MAX_ITEMS: int = 1024  # 最多缓存的玩家数
+    RECENT_MATCHES_CACHE_TTL: int = 60  # 最近比赛列表缓存有效期（秒），0表示不缓存
+
+    # 条件请求配置（最近比赛和玩家信息带ETag/Last-Modified重新请求，304时复用解析结果）
+    CONDITIONAL_CACHE_TTL: int = 3600  # 校验值和解析结果的保留时间（秒）
+    CONDITIONAL_CACHE_MAX_ITEMS: int = 2048  # 最多保留的URL数
+
+    # 分析窗口配置
+    ANALYSIS_DEFAULT_WINDOW: int = 20  # 默认分析最近多少场比赛
+    ANALYSIS_MAX_WINDOW: int = 500  # 单次分析的比赛数上限
+    TEAMMATE_MATCH_LIMIT: int = 20  # 用于分析队友的比赛详情数（最近N场）
+    MATCH_PAGE_SIZE: int = 100  # 分页获取比赛历史时的每页大小
+    MATCH_PAGE_CONCURRENCY: int = 3  # 同时获取的页数
+    ANALYSIS_BATCH_MAX_PLAYERS: int = 50  # 批量分析单次最多的玩家数
+
+    # 玩家聚合状态配置（再次分析时只处理新比赛）
+    AGGREGATE_STORE_ENABLED: bool = True
+    AGGREGATE_STORE_PATH: str = "data/player_aggregates.sqlite3"  # 留空则只保存在内存中
+    AGGREGATE_MEMORY_ITEMS: int = 1024  # 内存中最多保留的玩家聚合状态数
+
+    # 后台预取配置（在空闲额度内为常查询的玩家预热最近比赛和比赛详情）
+    PREFETCH_ENABLED: bool = True
+    PREFETCH_INTERVAL: float = 120.0  # 每轮预取的间隔（秒）
+    PREFETCH_CONCURRENCY: int = 2  # 同时预取的玩家数
+    PREFETCH_QUOTA_SHARE: float = 0.25  # 预取最多使用的请求预算比例
+    PREFETCH_MAX_ACCOUNTS: int = 20  # 每轮最多预取的玩家数
+    PREFETCH_TRACKED_ACCOUNTS: int = 1000  # 最多跟踪的玩家数
+    PREFETCH_HALF_LIFE: float = 3600.0  # 查询热度的半衰期（秒）
+
+    # 分析计算配置
+    # 安装了numpy时使用列式比赛表做向量化聚合；表的构建本身需要遍历一次比赛，
+    # 比赛数较少时收益不明显，适合大窗口或同一张表要做多种聚合的场景
+    ANALYSIS_COLUMNAR: bool = False
+
+    # 队友昵称解析配置
+    NAME_CACHE_TTL: int = 24 * 3600  # 昵称缓存有效期（秒）
+    NAME_NEGATIVE_CACHE_TTL: int = 3600  # 查不到昵称时的缓存有效期（秒）
+    NAME_CACHE_MAX_ITEMS: int = 10000  # 最多缓存的昵称数
+    NAME_RESOLVE_CONCURRENCY: int = 5  # 单次请求并发查询昵称数
+    NAME_RESOLVE_TIMEOUT: float = 5.0  # 单次请求解析昵称的总时限（秒）
+
+    # 缓存快照配置（分析结果、昵称和最近比赛列表缓存在重启后恢复）
+    CACHE_SNAPSHOT_PATH: str = "data/cache_snapshot.bin"  # 留空则不保存快照
+    CACHE_SNAPSHOT_INTERVAL: float = 300.0  # 定期保存间隔（秒），0表示只在关闭时保存
+
+    # JSON编解码配置（上游响应解析、缓存和API响应渲染）
+    JSON_BACKEND: str = "auto"  # auto（orjson > msgspec > json）、orjson、msgspec 或 json
+
+    # 日志配置
+    LOG_LEVEL: str = "INFO"  # DEBUG=true时强制为DEBUG
+    LOG_FORMAT: str = "text"  # text 或 json（每行一个JSON对象）
+    LOG_ASYNC: bool = True  # 经队列由后台线程格式化和写入，不阻塞请求
+    LOG_QUEUE_SIZE: int = 10000  # 异步日志队列容量，满时丢弃新日志
+    LOG_SAMPLE_RATE: float = 1.0  # WARNING以下日志的采样比例
+
     # 服务器配置
     HOST: str = "0.0.0.0"
     PORT: int = 8000
@@ -1,47 +1,130 @@
-"""日志配置模块."""
+"""日志配置模块.
 
+所有日志只经过一个输出handler（文本或JSON格式）。异步模式下（默认）请求
+路径上只把日志记录放进内存队列，由后台线程的QueueListener完成格式化和写入
+stdout，格式化和阻塞的stdout写入都不计入请求延迟；队列满时丢弃新日志，
+不阻塞请求。WARNING以下的日志可按比例采样。
+"""
+
+import atexit
+import json
 import logging
-import logging.config
+import logging.handlers
+import queue
+import random
 import sys
+import time
+from typing import Optional
 
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "standard": {
-            "format": "%(levelname)s [%(asctime)s] %(name)s: %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-        "simple": {
-            "format": "%(message)s",
-        },
-    },
-    "handlers": {
-        "default": {
-            "formatter": "standard",
-            "class": "logging.StreamHandler",
-            "stream": sys.stdout,
-        },
-        "console": {
-            "formatter": "simple",
-            "class": "logging.StreamHandler",
-            "stream": sys.stdout,
-        },
-    },
-    "loggers": {
-        "uvicorn": {"handlers": ["default"], "level": "INFO", "propagate": False},
-        "uvicorn.access": {
-            "handlers": ["default"],
-            "level": "INFO",
-            "propagate": False,
-        },
-        "src": {"handlers": ["default", "console"], "level": "DEBUG", "propagate": False},
-        "__main__": {"handlers": ["default"], "level": "INFO", "propagate": False},
-    },
-    "root": {"handlers": ["default"], "level": "INFO"},
-}
-
-logging.config.dictConfig(LOGGING_CONFIG)
+from src.core.config import settings
 
-logger = logging.getLogger("src")
+TEXT_FORMAT = "%(levelname)s [%(asctime)s] %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 需要统一输出的logger（uvicorn自带的handler会被替换）
+_MANAGED_LOGGERS = ("src", "uvicorn", "uvicorn.access", "uvicorn.error", "__main__")
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime(DATE_FORMAT, time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样WARNING以下的日志，WARNING及以上全部保留."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """把日志记录原样放入队列的QueueHandler.
+
+    标准QueueHandler会在调用方线程中格式化消息（prepare），这里推迟到
+    QueueListener的线程中完成；队列满时直接丢弃。
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _build_output_handler() -> logging.Handler:
+    """创建唯一的输出handler."""
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    return handler
+
+
+def setup_logging() -> None:
+    """按配置初始化日志（可重复调用）."""
+    global _listener
+    stop_logging()
+
+    output = _build_output_handler()
+    handler: logging.Handler
+    if settings.LOG_ASYNC:
+        queue_handler = DroppingQueueHandler(
+            queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        )
+        _listener = logging.handlers.QueueListener(queue_handler.queue, output)
+        _listener.start()
+        handler = queue_handler
+    else:
+        handler = output
+    if settings.LOG_SAMPLE_RATE < 1:
+        # 在入队前采样，被丢弃的日志不占用队列
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+    level = "DEBUG" if settings.DEBUG else settings.LOG_LEVEL.upper()
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    for name in _MANAGED_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+    logging.getLogger("src").setLevel(level)
+    # httpx每个请求一条INFO，交给指标统计
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def stop_logging() -> None:
+    """停止后台日志线程并输出队列中剩余的日志."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+setup_logging()
+atexit.register(stop_logging)
+
+logger = logging.getLogger("src")
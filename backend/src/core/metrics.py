@@ -0,0 +1,455 @@
+"""进程内指标（Prometheus文本格式）.
+
+只依赖标准库：计数器、直方图和回调式仪表盘，通过 ``/metrics`` 以
+Prometheus文本格式输出。指标只在事件循环线程中更新，不加锁。
+"""
+
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+# 默认延迟直方图分桶（秒）
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+LabelValues = Tuple[str, ...]
+F = TypeVar("F", bound=Callable[..., Any])
+M = TypeVar("M", bound="_Metric")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """格式化标签."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    """转义标签值."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """指标基类."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """按标签名顺序取出标签值."""
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        """输出样本行."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """输出HELP、TYPE和样本行."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数器."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加计数.
+
+        :param amount: 增量
+        :param labels: 标签值
+        """
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """读取当前计数."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> (各分桶计数（非累积，最后一个为+Inf）, 总和)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """记录一个观测值.
+
+        :param value: 观测值（延迟以秒为单位）
+        :param labels: 标签值
+        """
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = ([0] * (len(self.buckets) + 1), [0.0])
+            self._values[key] = state
+        counts, total = state
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """记录代码块的耗时."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        """读取观测次数."""
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(bucket_names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """在输出时调用函数取值的仪表盘."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """设置取值函数."""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is None:
+            return []
+        return [f"{self.name} {_format_value(float(self._function()))}"]
+
+
+class MetricsRegistry:
+    """指标注册表."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标 {metric.name} 已注册")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """注册计数器."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """注册直方图."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str) -> CallbackGauge:
+        """注册回调式仪表盘."""
+        return self._register(CallbackGauge(name, documentation))
+
+    def render(self) -> str:
+        """以Prometheus文本格式输出所有指标."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP请求
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时（到响应头发出为止）",
+    ("method", "route", "status"),
+)
+
+# 分析请求各阶段
+ANALYSIS_STAGE_SECONDS = REGISTRY.histogram(
+    "analysis_stage_duration_seconds",
+    "玩家分析请求各阶段耗时",
+    ("stage",),
+)
+
+# 上游请求
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "upstream_requests_total",
+    "上游请求次数（每次重试单独计数）",
+    ("endpoint", "status"),
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total",
+    "上游请求因429重试的次数",
+    ("endpoint",),
+)
+UPSTREAM_RATE_LIMITED = REGISTRY.counter(
+    "upstream_rate_limited_total",
+    "上游返回429的次数",
+    ("endpoint",),
+)
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "upstream_request_duration_seconds",
+    "上游请求耗时（不含排队）",
+    ("endpoint",),
+)
+UPSTREAM_QUEUE_SECONDS = REGISTRY.histogram(
+    "upstream_queue_duration_seconds",
+    "上游请求在限流调度器中的排队时间",
+    ("priority",),
+)
+UPSTREAM_CIRCUIT_REJECTED = REGISTRY.counter(
+    "upstream_circuit_rejected_total",
+    "熔断器打开时被直接拒绝的上游请求数",
+    ("endpoint",),
+)
+UPSTREAM_CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "upstream_circuit_transitions_total",
+    "熔断器状态切换次数",
+    ("endpoint", "state"),
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "upstream_hedged_requests_total",
+    "对冲请求次数（launched为发出，won为对冲请求先返回）",
+    ("endpoint", "outcome"),
+)
+MATCH_DETAILS_DEADLINE_EXCEEDED = REGISTRY.counter(
+    "match_details_deadline_exceeded_total",
+    "获取比赛详情超过总时限、只返回部分详情的分析次数",
+)
+UPSTREAM_NOT_MODIFIED = REGISTRY.counter(
+    "upstream_not_modified_total",
+    "条件请求返回304、复用已解析响应的次数",
+    ("endpoint",),
+)
+UPSTREAM_SAVED_BYTES = REGISTRY.counter(
+    "upstream_saved_bytes_total",
+    "条件请求返回304时节省下载的响应字节数",
+    ("endpoint",),
+)
+UPSTREAM_SAVED_PARSE_SECONDS = REGISTRY.counter(
+    "upstream_saved_parse_seconds_total",
+    "条件请求返回304时节省的JSON解析时间",
+    ("endpoint",),
+)
+UPSTREAM_TOKENS = REGISTRY.gauge(
+    "upstream_scheduler_tokens", "限流调度器当前可用令牌数"
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "upstream_scheduler_in_flight", "正在进行的上游请求数"
+)
+
+# 启动
+APP_IMPORT_SECONDS = REGISTRY.gauge(
+    "app_import_seconds", "导入应用模块（FastAPI、路由和服务）的耗时"
+)
+APP_STARTUP_SECONDS = REGISTRY.gauge(
+    "app_startup_seconds", "应用生命周期初始化（创建客户端、加载快照）的耗时"
+)
+APP_BOOT_SECONDS = REGISTRY.gauge(
+    "app_boot_seconds", "从进程启动到可以接收请求的总耗时（仅Linux）"
+)
+
+# 缓存
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total",
+    "缓存查询次数",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    """记录缓存命中或未命中.
+
+    :param cache: 缓存名称
+    :param hit: 是否命中
+    :param count: 次数
+    """
+    if count:
+        CACHE_REQUESTS.inc(count, cache=cache, result="hit" if hit else "miss")
+
+
+class StageTimings:
+    """单个请求各阶段的耗时，结束时一次性写入直方图."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.active: Set[str] = set()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """累加某个阶段的耗时."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def observe(self) -> None:
+        """写入阶段耗时直方图."""
+        for stage, seconds in self.stages.items():
+            ANALYSIS_STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def begin_stages() -> StageTimings:
+    """开始记录当前上下文（请求或流式响应任务）的阶段耗时.
+
+    :return: 阶段耗时记录，请求结束时调用其observe()
+    """
+    timings = StageTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def track_stages() -> Iterator[StageTimings]:
+    """在代码块内记录阶段耗时，结束时写入直方图."""
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+        timings.observe()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """记录代码块属于哪个阶段.
+
+    在track_stages/begin_stages范围内时累加到当前请求，否则直接写入直方图。
+    同名阶段嵌套时只计外层一次。
+
+    :param name: 阶段名称
+    """
+    timings = _current_timings.get()
+    if timings is not None and name in timings.active:
+        yield
+        return
+    started = time.perf_counter()
+    if timings is not None:
+        timings.active.add(name)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is None:
+            ANALYSIS_STAGE_SECONDS.observe(elapsed, stage=name)
+        else:
+            timings.active.discard(name)
+            timings.add(name, elapsed)
+
+
+def timed_stage(name: str) -> Callable[[F], F]:
+    """把整个函数（同步或异步）计入某个阶段的装饰器.
+
+    :param name: 阶段名称
+    """
+
+    def decorator(function: F) -> F:
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with stage(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,79 @@
+"""JSON编解码.
+
+按JSON_BACKEND选择实现：安装了orjson或msgspec时使用它们（auto优先orjson），
+否则使用标准库json。所有实现的输出都是紧凑、不转义非ASCII字符的UTF-8字节，
+可以互相解析。
+"""
+
+import json
+import logging
+from typing import Any, Callable, Tuple, Union
+
+from fastapi.responses import JSONResponse
+
+from src.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+JSONInput = Union[bytes, bytearray, str]
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    """序列化为紧凑的UTF-8 JSON."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    """序列化为紧凑的UTF-8 JSON（与标准库一致，非字符串键转换为字符串）."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgspec_loads(data: JSONInput) -> Any:
+    """解析JSON（与其他实现一致，出错时抛出ValueError）."""
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+def _select(
+    backend: str,
+) -> Tuple[str, Callable[[JSONInput], Any], Callable[[Any], bytes]]:
+    """按配置选择JSON实现，指定的库未安装时回退到标准库.
+
+    :param backend: auto、orjson、msgspec或json
+    :return: (实际使用的实现名称, loads, dumps)
+    """
+    backend = backend.lower()
+    if backend in ("auto", "orjson") and orjson is not None:
+        return "orjson", orjson.loads, _orjson_dumps
+    if backend in ("auto", "msgspec") and msgspec is not None:
+        return "msgspec", _msgspec_loads, msgspec.json.encode
+    if backend not in ("auto", "json"):
+        logger.warning("未安装%s，JSON编解码使用标准库", backend)
+    return "json", json.loads, _stdlib_dumps
+
+
+# loads(bytes|str) -> 对象；dumps(对象) -> UTF-8字节
+JSON_BACKEND, loads, dumps = _select(settings.JSON_BACKEND)
+
+
+class FastJSONResponse(JSONResponse):
+    """用当前JSON实现渲染的响应.
+
+    内容直接序列化，不经过jsonable_encoder；用于已经是JSON兼容结构
+    （dict/list/str/int/float/bool/None）的内部数据。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,50 +1,131 @@
 """FastAPI应用入口文件."""
 
 import logging
+import os
 import time
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # 必须先导入日志配置，这样日志系统才会初始化
 import src.core.logging  # noqa: F401
 
+from src import IMPORT_STARTED
+from src.core import metrics
 from src.core.config import settings
+from src.core.serialization import FastJSONResponse
 from src.api.v1.router import api_router, lifespan
 
 # 在日志配置加载后获取logger
 logger = logging.getLogger("src")
 
-# 请求日志中间件
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        # 使用print和logger双重输出，确保能看到
-        print(f"📥 收到请求: {request.method} {request.url.path}")
-        logger.info(f"📥 收到请求: {request.method} {request.url.path}")
-        logger.info(f"   查询参数: {dict(request.query_params)}")
-        logger.info(f"   完整URL: {request.url}")
-        
+
+def _process_age() -> Optional[float]:
+    """当前进程已运行的时间（秒），无法读取/proc时返回None."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # 进程名可能含空格，从最后一个右括号之后开始按空格分割
+            fields = f.read().rsplit(b")", 1)[1].split()
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        # starttime是第22个字段（分割后的第20个），单位为时钟节拍
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@asynccontextmanager
+async def app_lifespan(app: FastAPI):
+    """应用生命周期：在路由的生命周期外记录启动耗时."""
+    started = time.perf_counter()
+    async with lifespan(app):
+        startup_seconds = time.perf_counter() - started
+        boot_seconds = _process_age()
+        metrics.APP_STARTUP_SECONDS.set_function(lambda: startup_seconds)
+        if boot_seconds is not None:
+            metrics.APP_BOOT_SECONDS.set_function(lambda: boot_seconds)
+        logger.info(
+            "🚀 启动完成：导入 %.3f秒，初始化 %.3f秒，进程启动至就绪 %s",
+            IMPORT_SECONDS,
+            startup_seconds,
+            "未知" if boot_seconds is None else f"{boot_seconds:.3f}秒",
+        )
+        yield
+
+
+class RequestMetricsMiddleware:
+    """请求耗时中间件（纯ASGI）.
+
+    响应头发出时按路由模板把耗时写入 ``http_request_duration_seconds``，
+    不为每个请求创建额外的任务和响应流，也不逐请求输出日志（DEBUG级别除外）。
+    探活请求（SKIP_PATHS）直接放行，不计时。
+    """
+
+    SKIP_PATHS = frozenset({"/", "/health"})
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        responded = False
+
+        def observe(status_code: int) -> float:
+            elapsed = time.perf_counter() - started
+            # 按路由模板统计，避免account_id等路径参数导致标签数量无限增长
+            route = scope.get("route")
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                elapsed,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            )
+            return elapsed
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start" and not responded:
+                responded = True
+                elapsed = observe(message["status"])
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "📤 %s %s -> %s (耗时: %.3f秒)",
+                        scope["method"],
+                        scope["path"],
+                        message["status"],
+                        elapsed,
+                    )
+            await send(message)
+
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            print(f"📤 响应: {response.status_code} (耗时: {process_time:.2f}秒)")
-            logger.info(f"📤 响应: {response.status_code} (耗时: {process_time:.2f}秒)")
-            return response
+            await self.app(scope, receive, send_with_timing)
         except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(f"❌ 请求处理出错: {e} (耗时: {process_time:.2f}秒)", exc_info=True)
+            if not responded:
+                elapsed = observe(500)
+            else:
+                elapsed = time.perf_counter() - started
+            logger.error("❌ 请求处理出错: %s (耗时: %.2f秒)", e, elapsed, exc_info=True)
             raise
 
+
 app = FastAPI(
     title="Dota2战绩分析API",
     description="提供Dota2玩家战绩数据分析服务",
     version="0.1.0",
-    lifespan=lifespan,
+    lifespan=app_lifespan,
+    default_response_class=FastJSONResponse,
 )
 
-# 添加请求日志中间件（最先添加，这样能记录所有请求）
-app.add_middleware(LoggingMiddleware)
+# 添加请求耗时中间件（最先添加，这样能记录所有请求）
+app.add_middleware(RequestMetricsMiddleware)
 
 # 配置CORS，允许前端跨域访问
 cors_origins = settings.CORS_ORIGINS.split(",") if settings.CORS_ORIGINS != "*" else ["*"]
@@ -59,12 +140,9 @@ app.add_middleware(
 # 注册API路由
 app.include_router(api_router, prefix="/api")
 
-# 确保日志配置已加载
-import src.core.logging  # noqa: F401
-
-# 重新获取logger（确保使用正确的配置）
-logger = logging.getLogger("src")
-logger.info("🚀 FastAPI应用启动完成，日志系统已初始化")
+# 应用模块的导入耗时（解释器自身的启动耗时计入进程启动至就绪的总耗时）
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+metrics.APP_IMPORT_SECONDS.set_function(lambda: IMPORT_SECONDS)
 
 
 @app.get("/")
@@ -73,10 +151,17 @@ async def root():
     return {"message": "Dota2战绩分析API", "version": "0.1.0"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus格式的指标."""
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/health")
 async def health():
     """健康检查."""
-    print("💚 健康检查被调用 - print输出")
-    logger.info("💚 健康检查被调用 - logger输出")
+    logger.debug("💚 健康检查被调用")
     return {"status": "ok"}
 
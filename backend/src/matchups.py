@@ -0,0 +1,147 @@
+"""英雄对位和配合矩阵的离线批处理任务.
+
+扫描比赛缓存（MATCH_CACHE_PATH）中的所有比赛详情，按批分给进程池统计，
+合并后写入HERO_MATCHUPS_PATH，API重启后载入。在backend目录下运行::
+
+    python -m src.matchups --workers 4
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import src.core.logging  # noqa: F401
+from src.core.config import settings
+from src.services.matchups import COUNT_FIELDS, count_matchups, save_matchups
+from src.services.opendota import MatchStore
+
+logger = logging.getLogger(__name__)
+
+# 工作进程中的比赛缓存（每个进程打开一次）
+_worker_store: Optional[MatchStore] = None
+
+
+def _init_worker(path: str) -> None:
+    """工作进程初始化：打开比赛缓存."""
+    global _worker_store
+    _worker_store = MatchStore(path, memory_items=0)
+
+
+def _count_batch(
+    after_match_id: int, batch_size: int
+) -> Tuple[Dict[str, np.ndarray], int]:
+    """在工作进程中统计一批比赛.
+
+    :param after_match_id: 批次起点（不含）
+    :param batch_size: 批次大小
+    :return: (计数数组, 本批的比赛数)
+    :raises RuntimeError: 当工作进程没有经过_init_worker初始化时
+    """
+    if _worker_store is None:
+        raise RuntimeError("工作进程未打开比赛缓存")
+    batch = _worker_store.scan(after_match_id, batch_size)
+    return count_matchups(match for _, match in batch), len(batch)
+
+
+def build(
+    cache_path: str,
+    output: str,
+    workers: int,
+    batch_size: int,
+    min_games: int,
+    top: int,
+) -> int:
+    """统计比赛缓存中的所有比赛并写入矩阵文件.
+
+    :param cache_path: 比赛缓存路径
+    :param output: 输出文件路径
+    :param workers: 工作进程数
+    :param batch_size: 每批的比赛数
+    :param min_games: 参与排名的最少场次
+    :param top: 每个英雄保留的对位数
+    :return: 扫描的比赛数
+    :raises ValueError: 当比赛缓存路径为空（MATCH_CACHE_PATH未配置）时
+    """
+    if not cache_path:
+        raise ValueError("未配置比赛缓存路径（MATCH_CACHE_PATH），没有可统计的比赛")
+    store = MatchStore(cache_path, memory_items=0)
+    try:
+        starts = store.partition(batch_size)
+    finally:
+        store.close()
+
+    totals: Dict[str, np.ndarray] = {}
+    scanned = 0
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(cache_path,)
+    ) as pool:
+        batches = pool.map(_count_batch, starts, [batch_size] * len(starts))
+        for counts, count in batches:
+            scanned += count
+            for field in COUNT_FIELDS:
+                if field in totals:
+                    totals[field] += counts[field]
+                else:
+                    totals[field] = counts[field]
+    if not totals:
+        totals = count_matchups([])
+    save_matchups(output, totals, scanned, min_games, top)
+    return scanned
+
+
+def main() -> None:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="从比赛缓存计算英雄对位和配合矩阵")
+    parser.add_argument(
+        "--cache", default=settings.MATCH_CACHE_PATH, help="比赛缓存（SQLite）路径"
+    )
+    parser.add_argument(
+        "--output", default=settings.HERO_MATCHUPS_PATH, help="输出文件路径（.npz）"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="工作进程数"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="每批的比赛数")
+    parser.add_argument(
+        "--min-games",
+        type=int,
+        default=settings.HERO_MATCHUPS_MIN_GAMES,
+        help="参与排名的最少对位/同队场次",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=settings.HERO_MATCHUPS_TOP,
+        help="每个英雄保留的最好/最差对位数",
+    )
+    args = parser.parse_args()
+    if not args.cache or not os.path.exists(args.cache):
+        parser.error(f"比赛缓存 {args.cache or '(未配置)'} 不存在")
+    if not args.output:
+        parser.error("未配置输出文件路径")
+
+    started = time.perf_counter()
+    scanned = build(
+        args.cache,
+        args.output,
+        max(1, args.workers),
+        max(1, args.batch_size),
+        args.min_games,
+        args.top,
+    )
+    logger.info(
+        "🧮 英雄对位矩阵已写入 %s：%s 场比赛，%s 字节，耗时 %.2f秒",
+        args.output,
+        scanned,
+        os.path.getsize(args.output),
+        time.perf_counter() - started,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""玩家聚合状态存储."""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core import metrics, serialization
+from src.core.config import settings
+from src.services.analysis import MatchAggregator, TeammateTally
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerAggregate:
+    """单个玩家在某个分析窗口上的聚合状态.
+
+    包含窗口内比赛的累计值和精简记录、最近若干场比赛的队友计数以及最新比赛ID。
+    再次分析时只需折叠比最新比赛更新的比赛，处理量与新比赛数成正比。
+    """
+
+    def __init__(
+        self,
+        account_id: int,
+        limit: int,
+        matches: Optional[MatchAggregator] = None,
+        teammates: Optional[TeammateTally] = None,
+    ):
+        """初始化聚合状态.
+
+        :param account_id: 玩家账号ID
+        :param limit: 分析窗口大小（比赛场数）
+        :param matches: 窗口内比赛的聚合器
+        :param teammates: 队友统计
+        """
+        self.account_id = account_id
+        self.limit = limit
+        self.matches = matches or MatchAggregator()
+        self.teammates = teammates or TeammateTally(account_id)
+
+    @property
+    def last_match_id(self) -> Optional[int]:
+        """窗口内最新一场比赛的ID."""
+        return self.matches.last_match_id
+
+    def fold_matches(self, new_matches: List[Dict[str, Any]]) -> None:
+        """折叠新比赛并移出超出窗口的旧比赛.
+
+        不比last_match_id新的比赛已经计入，会被忽略，重复折叠同一批比赛不会重复计数。
+
+        :param new_matches: 新比赛（按时间倒序）
+        """
+        last_match_id = self.last_match_id or 0
+        new_matches = [
+            m for m in new_matches if (m.get("match_id") or 0) > last_match_id
+        ]
+        if new_matches:
+            self.matches.fold_new(new_matches, self.limit)
+
+    def missing_details(self, teammate_limit: int) -> List[int]:
+        """同步队友统计的比赛范围，返回还需要获取详情的比赛ID.
+
+        移出不在最近teammate_limit场内的比赛；之前获取详情失败的比赛会再次返回。
+
+        :param teammate_limit: 用于分析队友的最近比赛数
+        :return: 需要获取详情的比赛ID（最新的在前）
+        """
+        window_ids = self.matches.match_ids(teammate_limit)
+        keep = set(window_ids)
+        for match_id in list(self.teammates.matches):
+            if match_id not in keep:
+                self.teammates.remove_match(match_id)
+        return [
+            match_id for match_id in window_ids if match_id not in self.teammates.matches
+        ]
+
+    def add_details(self, match_details_list: List[Dict[str, Any]]) -> None:
+        """把新获取的比赛详情计入队友统计.
+
+        :param match_details_list: 比赛详情列表
+        """
+        for match in match_details_list:
+            self.teammates.add_match(match)
+
+    def to_state(self) -> Dict[str, Any]:
+        """导出可JSON序列化的状态."""
+        return {
+            "account_id": self.account_id,
+            "limit": self.limit,
+            "matches": self.matches.to_state(),
+            "teammates": self.teammates.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "PlayerAggregate":
+        """从to_state导出的状态恢复.
+
+        :param state: 状态字典
+        :return: 聚合状态
+        """
+        return cls(
+            account_id=state["account_id"],
+            limit=state["limit"],
+            matches=MatchAggregator.from_state(state["matches"]),
+            teammates=TeammateTally.from_state(state["teammates"]),
+        )
+
+
+class PlayerAggregateStore:
+    """玩家聚合状态存储：内存LRU + SQLite.
+
+    按 (account_id, 窗口大小) 保存zlib压缩的JSON状态。每次读取都返回新的对象，
+    并发请求各自修改互不影响，后保存的覆盖先保存的。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = settings.AGGREGATE_STORE_PATH,
+        memory_items: int = settings.AGGREGATE_MEMORY_ITEMS,
+    ):
+        """初始化存储.
+
+        :param path: SQLite文件路径，为空时只保存在内存中
+        :param memory_items: 内存中最多保留的状态数
+        """
+        self.path = path or None
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[Tuple[int, int], bytes]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """打开（必要时创建）SQLite数据库."""
+        if self.path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS player_aggregates ("
+                " account_id INTEGER NOT NULL,"
+                " window_limit INTEGER NOT NULL,"
+                " state BLOB NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (account_id, window_limit))"
+            )
+            self._db = db
+        return self._db
+
+    def _remember(self, key: Tuple[int, int], payload: bytes) -> None:
+        """写入内存LRU并淘汰最久未使用的条目."""
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read(self, key: Tuple[int, int]) -> Optional[bytes]:
+        """从磁盘读取状态（在线程池中执行）."""
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT state FROM player_aggregates"
+                " WHERE account_id = ? AND window_limit = ?",
+                key,
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, key: Tuple[int, int], payload: bytes) -> None:
+        """写入磁盘（在线程池中执行）."""
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO player_aggregates"
+                " (account_id, window_limit, state, updated_at) VALUES (?, ?, ?, ?)",
+                (*key, payload, time.time()),
+            )
+            db.commit()
+
+    async def load(self, account_id: int, limit: int) -> Optional[PlayerAggregate]:
+        """读取聚合状态.
+
+        :param account_id: 玩家账号ID
+        :param limit: 分析窗口大小
+        :return: 聚合状态，不存在或无法解析时返回None
+        """
+        key = (account_id, limit)
+        payload = self._memory.get(key)
+        if payload is not None:
+            self._memory.move_to_end(key)
+        elif self.path is not None:
+            try:
+                payload = await asyncio.to_thread(self._read, key)
+            except sqlite3.Error as e:
+                logger.warning("读取玩家 %s 聚合状态失败: %s", account_id, e)
+                return None
+            if payload is not None:
+                self._remember(key, payload)
+        metrics.record_cache("aggregates", payload is not None)
+        if payload is None:
+            return None
+        try:
+            return PlayerAggregate.from_state(
+                serialization.loads(zlib.decompress(payload))
+            )
+        except (zlib.error, ValueError, KeyError, TypeError) as e:
+            logger.warning("玩家 %s 聚合状态损坏，将重新计算: %s", account_id, e)
+            return None
+
+    async def save(self, aggregate: PlayerAggregate) -> None:
+        """保存聚合状态.
+
+        :param aggregate: 聚合状态
+        """
+        key = (aggregate.account_id, aggregate.limit)
+        payload = zlib.compress(serialization.dumps(aggregate.to_state()))
+        self._remember(key, payload)
+        if self.path is None:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, payload)
+        except sqlite3.Error as e:
+            logger.warning("保存玩家 %s 聚合状态失败: %s", aggregate.account_id, e)
+
+    def close(self) -> None:
+        """关闭磁盘数据库."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
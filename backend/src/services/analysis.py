@@ -1,24 +1,169 @@
 """数据分析服务."""
 
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.services.heroes import HeroTable
+
+# numpy是可选依赖，缺失时使用字典列表逐条计算；第一次构建列式表时才导入
+# （见_load_numpy），不使用列式分析时启动不需要付出导入开销
+np: Any = None
+_numpy_missing = False
 
 logger = logging.getLogger(__name__)
 
 
+def _load_numpy() -> bool:
+    """按需导入numpy.
+
+    :return: numpy是否可用
+    """
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+            return False
+        np = numpy
+    return np is not None
+
+
+class MatchTable:
+    """列式比赛表.
+
+    每个字段一个NumPy数组，每次请求只构建一次，聚合计算都在数组上一次完成。
+    缺失的 ``match_id`` / ``hero_id`` 以0存储。
+    """
+
+    INT_COLUMNS = (
+        "match_id",
+        "hero_id",
+        "kills",
+        "deaths",
+        "assists",
+        "last_hits",
+        "hero_damage",
+        "duration",
+        "player_slot",
+        "gold_per_min",
+    )
+
+    def __init__(self, columns: Dict[str, Any]):
+        """初始化表.
+
+        :param columns: 字段名到NumPy数组的映射，需包含INT_COLUMNS和radiant_win
+        """
+        self.columns = columns
+        self.size = len(columns["kills"])
+        # 玩家在radiant且radiant赢，或玩家在dire且dire赢
+        self.wins = (columns["player_slot"] < 128) == columns["radiant_win"]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    @classmethod
+    def from_matches(cls, matches: Sequence[Dict[str, Any]]) -> "MatchTable":
+        """从OpenDota比赛列表构建列式表.
+
+        :param matches: 比赛列表
+        :return: 列式比赛表
+        :raises RuntimeError: 当numpy未安装时
+        """
+        if not _load_numpy():
+            raise RuntimeError("列式比赛表需要安装numpy")
+        count = len(matches)
+        columns = {
+            name: np.fromiter(
+                (m.get(name) or 0 for m in matches), dtype=np.int64, count=count
+            )
+            for name in cls.INT_COLUMNS
+        }
+        columns["radiant_win"] = np.fromiter(
+            (bool(m.get("radiant_win", False)) for m in matches),
+            dtype=np.bool_,
+            count=count,
+        )
+        return cls(columns)
+
+
+# calculate_statistics统计的字段
+STAT_FIELDS = ("kills", "deaths", "assists", "last_hits", "hero_damage")
+
+# 按英雄累计的字段；每个英雄的累计值依次为 [场数, 胜场, *HERO_FIELDS]
+HERO_FIELDS = ("kills", "deaths", "assists", "gold_per_min")
+
+# 胜率曲线数据点中直接取自比赛的字段
+_CURVE_COLUMNS = ("match_id", "kills", "deaths", "assists", "hero_id", "duration")
+
+MatchesLike = Union[List[Dict[str, Any]], MatchTable]
+
+
+def as_match_table(matches: List[Dict[str, Any]]) -> MatchesLike:
+    """numpy可用时把比赛列表转换为列式表，否则原样返回.
+
+    :param matches: 比赛列表
+    :return: 列式比赛表或原比赛列表
+    """
+    if not _load_numpy():
+        return matches
+    return MatchTable.from_matches(matches)
+
+
+def match_player_name(player: Dict[str, Any]) -> Optional[str]:
+    """从比赛详情的player数据中提取Dota2昵称.
+
+    :param player: 比赛详情players数组中的一项
+    :return: 有效的昵称，没有时返回None
+    """
+    # Dota2比赛详情中的players数组包含personaname字段（这是Dota2游戏内昵称）
+    name = (
+        player.get("personaname")  # Dota2游戏内昵称（最常见）
+        or player.get("name")  # 备用字段
+        or player.get("player_name")  # 另一个可能的字段
+    )
+    if not name:
+        return None
+    # 确保name是字符串且不为空
+    name_str = str(name).strip()
+    if not name_str or name_str in ("null", "None") or name_str.isdigit():
+        return None
+    return name_str
+
+
+def _column_total(table: MatchTable, name: str) -> int:
+    """列求和并转换为Python整数."""
+    return int(table[name].sum())
+
+
 class AnalysisService:
-    """数据分析服务."""
+    """数据分析服务.
+
+    聚合方法既接受比赛字典列表，也接受 :class:`MatchTable`；两种输入的结果相同。
+    """
 
     @staticmethod
-    def generate_comment(matches: List[Dict[str, Any]]) -> str:
+    def generate_comment(matches: MatchesLike) -> str:
         """生成一句话点评.
 
-        :param matches: 比赛列表
+        :param matches: 比赛列表或列式比赛表
         :return: 点评文字
         """
-        if not matches:
+        if not len(matches):
             return "暂无战绩数据"
 
+        if isinstance(matches, MatchTable):
+            return AnalysisService.comment_from_totals(
+                total_matches=matches.size,
+                wins=int(matches.wins.sum()),
+                total_kills=_column_total(matches, "kills"),
+                total_deaths=_column_total(matches, "deaths"),
+                total_assists=_column_total(matches, "assists"),
+            )
+
         total_matches = len(matches)
         # 计算胜场数：判断玩家在哪一方，以及该方是否获胜
         wins = 0
@@ -29,25 +174,66 @@ class AnalysisService:
             # 玩家在radiant且radiant赢，或玩家在dire且dire赢（即radiant输）
             if (is_radiant and radiant_win) or (not is_radiant and not radiant_win):
                 wins += 1
-        win_rate = (wins / total_matches * 100) if total_matches > 0 else 0
+
+        return AnalysisService.comment_from_totals(
+            total_matches=total_matches,
+            wins=wins,
+            total_kills=sum(m.get("kills", 0) for m in matches),
+            total_deaths=sum(m.get("deaths", 0) for m in matches),
+            total_assists=sum(m.get("assists", 0) for m in matches),
+        )
+
+    @staticmethod
+    def comment_from_totals(
+        total_matches: int,
+        wins: int,
+        total_kills: int,
+        total_deaths: int,
+        total_assists: int,
+    ) -> str:
+        """根据累计值生成一句话点评.
+
+        :param total_matches: 比赛场数
+        :param wins: 胜场数
+        :param total_kills: 总击杀数
+        :param total_deaths: 总死亡数
+        :param total_assists: 总助攻数
+        :return: 点评文字
+        """
+        if total_matches <= 0:
+            return "暂无战绩数据"
+
+        win_rate = wins / total_matches * 100
 
         # 计算平均KDA
-        total_kills = sum(m.get("kills", 0) for m in matches)
-        total_deaths = sum(m.get("deaths", 0) for m in matches)
-        total_assists = sum(m.get("assists", 0) for m in matches)
-        avg_kills = total_kills / total_matches if total_matches > 0 else 0
-        avg_deaths = total_deaths / total_matches if total_matches > 0 else 0
-        avg_assists = total_assists / total_matches if total_matches > 0 else 0
+        avg_kills = total_kills / total_matches
+        avg_deaths = total_deaths / total_matches
+        avg_assists = total_assists / total_matches
 
         kda = (
             (avg_kills + avg_assists) / avg_deaths
             if avg_deaths > 0
             else avg_kills + avg_assists
         )
-        
+
         # 添加调试日志
-        logger.info(f"生成点评 - 总场次: {total_matches}, 胜场: {wins}, 胜率: {win_rate:.2f}%, KDA: {kda:.2f}")
+        logger.debug(
+            "生成点评 - 总场次: %s, 胜场: %s, 胜率: %.2f%%, KDA: %.2f",
+            total_matches,
+            wins,
+            win_rate,
+            kda,
+        )
+        return AnalysisService._comment_text(win_rate, kda)
+
+    @staticmethod
+    def _comment_text(win_rate: float, kda: float) -> str:
+        """根据胜率和KDA生成点评文字.
 
+        :param win_rate: 胜率（百分比）
+        :param kda: 平均KDA
+        :return: 点评文字
+        """
         # 生成超犀利毒舌点评
         if win_rate >= 70:
             if kda >= 4.0:
@@ -81,15 +267,21 @@ class AnalysisService:
                 return f"胜率{win_rate:.0f}%真的菜，KDA {kda:.2f}也救不了你，建议多看看教学视频"
 
     @staticmethod
-    def calculate_win_rate_curve(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def calculate_win_rate_curve(
+        matches: MatchesLike, heroes: Optional[HeroTable] = None
+    ) -> List[Dict[str, Any]]:
         """计算胜率曲线数据.
 
-        :param matches: 比赛列表（按时间倒序，最新的在前）
+        :param matches: 比赛列表或列式比赛表（按时间倒序，最新的在前）
+        :param heroes: 英雄表，用于补充英雄名称
         :return: 胜率曲线数据点列表
         """
-        if not matches:
+        if not len(matches):
             return []
 
+        if isinstance(matches, MatchTable):
+            return AnalysisService._win_rate_curve_from_table(matches, heroes)
+
         # 反转列表，使最早的比赛在前
         matches_reversed = list(reversed(matches))
         curve_data = []
@@ -115,12 +307,49 @@ class AnalysisService:
                     "deaths": match.get("deaths", 0),
                     "assists": match.get("assists", 0),
                     "hero_id": match.get("hero_id"),
+                    "hero_name": heroes.name(match.get("hero_id")) if heroes else None,
                     "duration": match.get("duration", 0),
                 }
             )
 
         return curve_data
 
+    @staticmethod
+    def _win_rate_curve_from_table(
+        table: MatchTable, heroes: Optional[HeroTable]
+    ) -> List[Dict[str, Any]]:
+        """在列式表上计算胜率曲线（最早的比赛在前）."""
+        is_win = table.wins[::-1]
+        rows = zip(
+            (np.cumsum(is_win) / np.arange(1, table.size + 1) * 100).tolist(),
+            is_win.tolist(),
+            *(table[name][::-1].tolist() for name in _CURVE_COLUMNS),
+        )
+        return [
+            {
+                "match_num": i,
+                "win_rate": round(win_rate, 2),
+                "is_win": win,
+                "match_id": match_id or None,
+                "kills": kills,
+                "deaths": deaths,
+                "assists": assists,
+                "hero_id": hero_id or None,
+                "hero_name": heroes.name(hero_id) if heroes else None,
+                "duration": duration,
+            }
+            for i, (
+                win_rate,
+                win,
+                match_id,
+                kills,
+                deaths,
+                assists,
+                hero_id,
+                duration,
+            ) in enumerate(rows, start=1)
+        ]
+
     @staticmethod
     def analyze_teammates(
         match_details_list: List[Dict[str, Any]], player_account_id: int
@@ -185,25 +414,18 @@ class AnalysisService:
                     # 从比赛详情中获取玩家Dota2昵称（优先使用personaname）
                     if teammate_id not in teammate_names:
                         # 输出玩家数据的所有字段，用于调试
-                        logger.info(f"队友 {teammate_id} 的player数据字段: {list(player.keys())}")
-                        logger.debug(f"队友 {teammate_id} 的完整player数据: {player}")
+                        logger.debug("队友 %s 的player数据: %s", teammate_id, player)
                         
-                        # Dota2比赛详情中的players数组包含personaname字段（这是Dota2游戏内昵称）
-                        name = (
-                            player.get("personaname")  # Dota2游戏内昵称（最常见）
-                            or player.get("name")  # 备用字段
-                            or player.get("player_name")  # 另一个可能的字段
-                        )
-                        # 确保name是字符串且不为空
-                        if name:
-                            name_str = str(name).strip()
-                            if name_str and name_str != "null" and name_str != "None" and not name_str.isdigit():
-                                teammate_names[teammate_id] = name_str
-                                logger.info(f"✅ 从比赛详情获取到队友 {teammate_id} Dota2昵称: {name_str}")
-                            else:
-                                logger.debug(f"队友 {teammate_id} 的name字段无效: {name_str}")
+                        name_str = match_player_name(player)
+                        if name_str:
+                            teammate_names[teammate_id] = name_str
+                            logger.debug(
+                                "✅ 从比赛详情获取到队友 %s Dota2昵称: %s",
+                                teammate_id,
+                                name_str,
+                            )
                         else:
-                            logger.warning(f"❌ 队友 {teammate_id} 的player数据中没有找到昵称字段")
+                            logger.debug("队友 %s 的player数据中没有有效的昵称字段", teammate_id)
 
         # 过滤出组队次数>1的队友
         filtered_teammates = [
@@ -232,44 +454,502 @@ class AnalysisService:
         return best_teammates, worst_teammates, teammate_names
 
     @staticmethod
-    def calculate_statistics(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def calculate_statistics(matches: MatchesLike) -> Dict[str, Any]:
         """计算统计数据.
 
-        :param matches: 比赛列表
+        :param matches: 比赛列表或列式比赛表
         :return: 统计数据字典
         """
-        if not matches:
-            return {
-                "total_kills": 0,
-                "avg_kills": 0,
-                "total_deaths": 0,
-                "avg_deaths": 0,
-                "total_assists": 0,
-                "avg_assists": 0,
-                "total_last_hits": 0,
-                "avg_last_hits": 0,
-                "total_hero_damage": 0,
-                "avg_hero_damage": 0,
-            }
+        return AnalysisService.summarize_statistics(matches)[0]
 
-        total_matches = len(matches)
+    @staticmethod
+    def summarize_statistics(
+        matches: MatchesLike, heroes: Optional[HeroTable] = None
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """计算统计数据和按英雄的统计.
+
+        两者在同一次遍历中累计（列式表上为同一组向量化运算）。
+
+        :param matches: 比赛列表或列式比赛表
+        :param heroes: 英雄表，用于补充英雄名称
+        :return: (统计数据字典, 英雄统计列表)
+        """
+        if not len(matches):
+            return AnalysisService.statistics_from_totals({}, 0), []
+
+        hero_totals: Dict[int, List[int]]
+        if isinstance(matches, MatchTable):
+            totals = {field: _column_total(matches, field) for field in STAT_FIELDS}
+            hero_totals = AnalysisService._hero_totals_from_table(matches)
+        else:
+            totals = dict.fromkeys(STAT_FIELDS, 0)
+            hero_totals = {}
+            for m in matches:
+                for field in STAT_FIELDS:
+                    totals[field] += m.get(field, 0)
+                hero_id = m.get("hero_id")
+                if not hero_id:
+                    continue
+                is_radiant = m.get("player_slot", 0) < 128
+                hero = hero_totals.setdefault(hero_id, [0] * (len(HERO_FIELDS) + 2))
+                hero[0] += 1
+                hero[1] += is_radiant == bool(m.get("radiant_win", False))
+                for index, field in enumerate(HERO_FIELDS, start=2):
+                    hero[index] += m.get(field) or 0
+        return (
+            AnalysisService.statistics_from_totals(totals, len(matches)),
+            AnalysisService.hero_stats_from_totals(hero_totals, heroes),
+        )
+
+    @staticmethod
+    def _hero_totals_from_table(table: MatchTable) -> Dict[int, List[int]]:
+        """在列式表上按英雄分组累计."""
+        hero_ids, groups = np.unique(table["hero_id"], return_inverse=True)
+        columns = (table.wins, *(table[field] for field in HERO_FIELDS))
+        totals = np.stack(
+            [np.bincount(groups, minlength=len(hero_ids))]
+            + [np.bincount(groups, column, len(hero_ids)) for column in columns]
+        ).astype(np.int64)
+        return {
+            hero_id: hero
+            for hero_id, hero in zip(hero_ids.tolist(), totals.T.tolist())
+            if hero_id
+        }
+
+    @staticmethod
+    def hero_stats_from_totals(
+        hero_totals: Dict[int, List[int]], heroes: Optional[HeroTable] = None
+    ) -> List[Dict[str, Any]]:
+        """根据每个英雄的累计值生成英雄统计.
+
+        :param hero_totals: hero_id -> [场数, 胜场, *HERO_FIELDS的累计值]
+        :param heroes: 英雄表，用于补充英雄名称
+        :return: 英雄统计列表（按场数降序，同场数时胜场多的在前）
+        """
+        hero_stats: List[Dict[str, Any]] = []
+        for hero_id, (games, wins, kills, deaths, assists, gpm) in hero_totals.items():
+            if games <= 0:
+                continue
+            hero_stats.append(
+                {
+                    "hero_id": hero_id,
+                    "hero_name": heroes.name(hero_id) if heroes else None,
+                    "games": games,
+                    "wins": wins,
+                    "losses": games - wins,
+                    "win_rate": round(wins / games * 100, 2),
+                    "avg_kills": round(kills / games, 2),
+                    "avg_deaths": round(deaths / games, 2),
+                    "avg_assists": round(assists / games, 2),
+                    # 与点评相同：(平均击杀+平均助攻)/平均死亡，没有死亡时为平均击杀+助攻
+                    "kda": round((kills + assists) / (deaths or games), 2),
+                    "avg_gpm": round(gpm / games, 2),
+                }
+            )
+        hero_stats.sort(key=lambda h: (-h["games"], -h["wins"], h["hero_id"]))
+        return hero_stats
+
+    @staticmethod
+    def statistics_from_totals(
+        totals: Dict[str, int], total_matches: int
+    ) -> Dict[str, Any]:
+        """根据各字段累计值生成统计数据.
+
+        :param totals: STAT_FIELDS中每个字段的累计值
+        :param total_matches: 比赛场数
+        :return: 统计数据字典
+        """
+        statistics: Dict[str, Any] = {}
+        for field in STAT_FIELDS:
+            total = totals.get(field, 0) if total_matches else 0
+            statistics[f"total_{field}"] = total
+            statistics[f"avg_{field}"] = (
+                round(total / total_matches, 2) if total_matches else 0
+            )
+        return statistics
+
+
+class MatchAggregator:
+    """增量比赛聚合器.
+
+    分页获取的比赛按页折叠进累计值（包括按英雄的累计值），只保留每场比赛的
+    精简记录，原始比赛字典随页释放，大窗口的内存占用与页大小无关。已有结果还可以继续折叠新比赛并
+    移出窗口外的旧比赛。结果与 :class:`AnalysisService` 在完整比赛列表上的
+    计算结果相同。
+    """
+
+    # 精简记录中各字段的位置
+    ROW_FIELDS = (
+        "is_win",
+        "match_id",
+        "kills",
+        "deaths",
+        "assists",
+        "last_hits",
+        "hero_damage",
+        "hero_id",
+        "duration",
+        "gold_per_min",
+    )
+    # HERO_FIELDS在精简记录中的位置
+    _HERO_ROW_INDEXES = (2, 3, 4, 9)
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.wins = 0
+        self.totals: Dict[str, int] = dict.fromkeys(STAT_FIELDS, 0)
+        # hero_id -> [场数, 胜场, *HERO_FIELDS的累计值]
+        self.heroes: Dict[int, List[int]] = {}
+        # 页偏移量 -> 该页每场比赛的精简记录（字段见ROW_FIELDS）
+        self._pages: Dict[int, List[Tuple[Any, ...]]] = {}
+
+    @staticmethod
+    def _to_row(match: Dict[str, Any]) -> Tuple[Any, ...]:
+        """把一场比赛转换为精简记录."""
+        is_radiant = (match.get("player_slot") or 0) < 128
+        return (
+            is_radiant == bool(match.get("radiant_win")),
+            match.get("match_id"),
+            match.get("kills") or 0,
+            match.get("deaths") or 0,
+            match.get("assists") or 0,
+            match.get("last_hits") or 0,
+            match.get("hero_damage") or 0,
+            match.get("hero_id"),
+            match.get("duration") or 0,
+            match.get("gold_per_min") or 0,
+        )
+
+    def _apply(self, row: Tuple[Any, ...], sign: int) -> None:
+        """把一条记录计入（sign=1）或移出（sign=-1）累计值."""
+        self.count += sign
+        self.wins += sign * row[0]
+        for index, field in enumerate(STAT_FIELDS, start=2):
+            self.totals[field] += sign * row[index]
+        self._apply_hero(row, sign)
+
+    def _apply_hero(self, row: Tuple[Any, ...], sign: int) -> None:
+        """把一条记录计入或移出所用英雄的累计值."""
+        hero_id = row[7]
+        if not hero_id:
+            return
+        hero = self.heroes.setdefault(hero_id, [0] * (len(HERO_FIELDS) + 2))
+        hero[0] += sign
+        hero[1] += sign * row[0]
+        for index, row_index in enumerate(self._HERO_ROW_INDEXES, start=2):
+            hero[index] += sign * row[row_index]
+        if not hero[0]:
+            del self.heroes[hero_id]
+
+    def add(self, matches: List[Dict[str, Any]], offset: int = 0) -> None:
+        """折叠一页比赛.
+
+        :param matches: 一页比赛（按时间倒序）
+        :param offset: 该页在窗口中的偏移量，用于页乱序到达时恢复顺序
+        """
+        rows = [self._to_row(m) for m in matches]
+        for row in rows:
+            self._apply(row, 1)
+        self._pages[offset] = rows
+
+    @property
+    def rows(self) -> List[Tuple[Any, ...]]:
+        """按时间倒序返回所有精简记录."""
+        if len(self._pages) != 1:
+            rows = [row for offset in sorted(self._pages) for row in self._pages[offset]]
+            self._pages = {0: rows}
+        return next(iter(self._pages.values()), [])
+
+    @property
+    def last_match_id(self) -> Optional[int]:
+        """窗口内最新一场比赛的ID."""
+        rows = self.rows
+        return rows[0][1] if rows else None
+
+    def fold_new(self, matches: List[Dict[str, Any]], limit: int) -> List[int]:
+        """折叠比窗口内更新的比赛，并移出超出窗口的旧比赛.
+
+        :param matches: 新比赛（按时间倒序）
+        :param limit: 窗口大小
+        :return: 被移出窗口的比赛ID
+        """
+        new_rows = [self._to_row(m) for m in matches]
+        for row in new_rows:
+            self._apply(row, 1)
+        rows = new_rows + self.rows
+        removed = rows[limit:]
+        for row in removed:
+            self._apply(row, -1)
+        self._pages = {0: rows[:limit]}
+        return [row[1] for row in removed]
+
+    def match_ids(self, limit: int) -> List[int]:
+        """最近limit场比赛的ID（最新的在前）.
+
+        :param limit: 数量上限
+        :return: 比赛ID列表
+        """
+        ids: List[int] = []
+        for row in self.rows:
+            if len(ids) >= limit:
+                break
+            if row[1]:
+                ids.append(row[1])
+        return ids
+
+    def generate_comment(self) -> str:
+        """生成一句话点评."""
+        return AnalysisService.comment_from_totals(
+            total_matches=self.count,
+            wins=self.wins,
+            total_kills=self.totals["kills"],
+            total_deaths=self.totals["deaths"],
+            total_assists=self.totals["assists"],
+        )
+
+    def calculate_statistics(self) -> Dict[str, Any]:
+        """计算统计数据."""
+        return AnalysisService.statistics_from_totals(self.totals, self.count)
+
+    def calculate_hero_stats(
+        self, heroes: Optional[HeroTable] = None
+    ) -> List[Dict[str, Any]]:
+        """计算按英雄的统计.
+
+        :param heroes: 英雄表，用于补充英雄名称
+        """
+        return AnalysisService.hero_stats_from_totals(self.heroes, heroes)
+
+    def calculate_win_rate_curve(
+        self, heroes: Optional[HeroTable] = None
+    ) -> List[Dict[str, Any]]:
+        """计算胜率曲线数据（最早的比赛在前）.
+
+        :param heroes: 英雄表，用于补充英雄名称
+        """
+        curve_data = []
+        wins = 0
+        for i, row in enumerate(reversed(self.rows)):
+            is_win, match_id, kills, deaths, assists, _, _, hero_id, duration, _ = row
+            wins += is_win
+            curve_data.append(
+                {
+                    "match_num": i + 1,
+                    "win_rate": round((wins / (i + 1)) * 100, 2),
+                    "is_win": is_win,
+                    "match_id": match_id,
+                    "kills": kills,
+                    "deaths": deaths,
+                    "assists": assists,
+                    "hero_id": hero_id,
+                    "hero_name": heroes.name(hero_id) if heroes else None,
+                    "duration": duration,
+                }
+            )
+        return curve_data
+
+    def to_state(self) -> Dict[str, Any]:
+        """导出可JSON序列化的状态."""
+        return {
+            "count": self.count,
+            "wins": self.wins,
+            "totals": self.totals,
+            "rows": [list(row) for row in self.rows],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "MatchAggregator":
+        """从to_state导出的状态恢复.
+
+        :param state: 状态字典
+        :return: 聚合器
+        :raises ValueError: 当精简记录的字段与ROW_FIELDS不一致（旧版本状态）时
+        """
+        rows = [tuple(row) for row in state["rows"]]
+        if any(len(row) != len(cls.ROW_FIELDS) for row in rows):
+            raise ValueError("聚合状态的记录格式已过期")
+        aggregator = cls()
+        aggregator.count = state["count"]
+        aggregator.wins = state["wins"]
+        aggregator.totals = dict(state["totals"])
+        aggregator._pages = {0: rows}
+        # 英雄累计值由精简记录重建，不单独保存
+        for row in rows:
+            aggregator._apply_hero(row, 1)
+        return aggregator
+
+
+class TeammateTally:
+    """可增量更新的队友统计.
+
+    每场比赛只保留玩家同队队友的ID和胜负，计数随比赛加入/移出增量更新，
+    结果与 :meth:`AnalysisService.analyze_teammates` 相同（同分时按最近一次
+    同队的比赛排序，比赛ID越大越新）。
+    """
+
+    def __init__(self, account_id: int):
+        """初始化统计.
+
+        :param account_id: 玩家账号ID
+        """
+        self.account_id = account_id
+        # match_id -> (是否胜利, 同队队友ID列表)；玩家不在比赛中时队友列表为空
+        self.matches: Dict[int, Tuple[bool, List[int]]] = {}
+        # 队友ID -> (昵称, 昵称来源比赛ID)
+        self.names: Dict[int, Tuple[str, int]] = {}
+        # 队友ID -> [组队次数, 胜利次数]
+        self._counts: Dict[int, List[int]] = {}
+        # 队友ID -> (最近一次同队的比赛ID, 在该场players中的位置)
+        self._last_seen: Dict[int, Tuple[int, int]] = {}
+
+    def add_match(self, match: Dict[str, Any]) -> None:
+        """加入一场比赛详情.
+
+        :param match: 比赛详情
+        """
+        match_id = match.get("match_id")
+        if not match_id or match_id in self.matches:
+            return
+        players = match.get("players", [])
+
+        player_team = None
+        for player in players:
+            if player.get("account_id") == self.account_id:
+                player_team = player.get("player_slot", 0) < 128
+                break
+        if player_team is None:
+            self.matches[match_id] = (False, [])
+            return
+
+        radiant_win = bool(match.get("radiant_win", False))
+        is_win = player_team == radiant_win
+        teammates = []
+        positions = []
+        for position, player in enumerate(players):
+            teammate_id = player.get("account_id")
+            if not teammate_id or teammate_id == self.account_id:
+                continue
+            if (player.get("player_slot", 0) < 128) != player_team:
+                continue
+            teammates.append(teammate_id)
+            positions.append(position)
+            name = match_player_name(player)
+            if name and match_id > self.names.get(teammate_id, ("", 0))[1]:
+                self.names[teammate_id] = (name, match_id)
+        self._record(match_id, is_win, teammates, positions)
+
+    def _record(
+        self,
+        match_id: int,
+        is_win: bool,
+        teammates: List[int],
+        positions: Optional[List[int]] = None,
+    ) -> None:
+        """记录一场比赛的队友并更新计数.
+
+        :param match_id: 比赛ID
+        :param is_win: 玩家是否胜利
+        :param teammates: 同队队友ID
+        :param positions: 队友在players中的位置，恢复状态时为None
+        """
+        self.matches[match_id] = (is_win, teammates)
+        for index, teammate_id in enumerate(teammates):
+            counts = self._counts.setdefault(teammate_id, [0, 0])
+            counts[0] += 1
+            counts[1] += is_win
+            if positions is None:
+                continue
+            last_seen = self._last_seen.get(teammate_id)
+            if last_seen is None or match_id > last_seen[0]:
+                self._last_seen[teammate_id] = (match_id, positions[index])
+
+    def remove_match(self, match_id: int) -> None:
+        """移出一场比赛.
+
+        :param match_id: 比赛ID
+        """
+        entry = self.matches.pop(match_id, None)
+        if entry is None:
+            return
+        is_win, teammates = entry
+        for teammate_id in teammates:
+            counts = self._counts[teammate_id]
+            counts[0] -= 1
+            counts[1] -= is_win
+            if counts[0] <= 0:
+                del self._counts[teammate_id]
+                self._last_seen.pop(teammate_id, None)
+                self.names.pop(teammate_id, None)
+
+    def results(
+        self,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, str]]:
+        """生成队友分析结果.
 
-        total_kills = sum(m.get("kills", 0) for m in matches)
-        total_deaths = sum(m.get("deaths", 0) for m in matches)
-        total_assists = sum(m.get("assists", 0) for m in matches)
-        total_last_hits = sum(m.get("last_hits", 0) for m in matches)
-        total_hero_damage = sum(m.get("hero_damage", 0) for m in matches)
+        :return: (最佳战友列表, 最爱损友列表, 队友昵称字典)
+        """
+        # 与逐场统计时的插入顺序一致：最近一次同队的比赛越新越靠前
+        ordered = sorted(
+            self._counts,
+            key=lambda t: (-self._last_seen[t][0], self._last_seen[t][1]),
+        )
+        filtered_teammates = []
+        for teammate_id in ordered:
+            team_count, win_count = self._counts[teammate_id]
+            if team_count <= 1:
+                continue
+            filtered_teammates.append(
+                {
+                    "account_id": teammate_id,
+                    "team_count": team_count,
+                    "win_count": win_count,
+                    "loss_count": team_count - win_count,
+                    "win_rate": round((win_count / team_count) * 100, 2),
+                }
+            )
+        best_teammates = sorted(
+            filtered_teammates, key=lambda x: x["win_count"], reverse=True
+        )
+        worst_teammates = sorted(
+            filtered_teammates, key=lambda x: x["loss_count"], reverse=True
+        )
+        names = {teammate_id: name for teammate_id, (name, _) in self.names.items()}
+        return best_teammates, worst_teammates, names
 
+    def to_state(self) -> Dict[str, Any]:
+        """导出可JSON序列化的状态."""
         return {
-            "total_kills": total_kills,
-            "avg_kills": round(total_kills / total_matches, 2),
-            "total_deaths": total_deaths,
-            "avg_deaths": round(total_deaths / total_matches, 2),
-            "total_assists": total_assists,
-            "avg_assists": round(total_assists / total_matches, 2),
-            "total_last_hits": total_last_hits,
-            "avg_last_hits": round(total_last_hits / total_matches, 2),
-            "total_hero_damage": total_hero_damage,
-            "avg_hero_damage": round(total_hero_damage / total_matches, 2),
+            "account_id": self.account_id,
+            "matches": [
+                [match_id, is_win, teammates]
+                for match_id, (is_win, teammates) in self.matches.items()
+            ],
+            "names": [
+                [teammate_id, name, match_id]
+                for teammate_id, (name, match_id) in self.names.items()
+            ],
+            "last_seen": [
+                [teammate_id, match_id, position]
+                for teammate_id, (match_id, position) in self._last_seen.items()
+            ],
         }
 
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TeammateTally":
+        """从to_state导出的状态恢复（计数由比赛记录重建）.
+
+        :param state: 状态字典
+        :return: 队友统计
+        """
+        tally = cls(state["account_id"])
+        for match_id, is_win, teammates in state["matches"]:
+            tally._record(match_id, is_win, teammates)
+        tally.names = {
+            teammate_id: (name, match_id)
+            for teammate_id, name, match_id in state["names"]
+        }
+        tally._last_seen = {
+            teammate_id: (match_id, position)
+            for teammate_id, match_id, position in state["last_seen"]
+        }
+        return tally
@@ -0,0 +1,130 @@
+"""上游熔断器."""
+
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional
+
+import httpx
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    """熔断器状态."""
+
+    CLOSED = "closed"  # 正常放行
+    OPEN = "open"  # 直接拒绝，等待冷却
+    HALF_OPEN = "half_open"  # 冷却结束，放行一个探测请求
+
+
+class CircuitOpenError(httpx.RequestError):
+    """熔断器打开时拒绝请求.
+
+    继承httpx.RequestError，调用方按网络错误处理即可。
+    """
+
+
+class CircuitBreaker:
+    """按最近请求错误率熔断的熔断器.
+
+    记录最近window个请求的成败，样本不少于min_requests且错误率达到
+    failure_ratio时打开，open_seconds内的请求直接失败，不再占用限流额度和
+    连接；冷却结束后放行一个探测请求，成功则恢复，失败则继续熔断。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_requests: int = 10,
+        failure_ratio: float = 0.5,
+        open_seconds: float = 30.0,
+    ):
+        """初始化熔断器.
+
+        :param name: 名称（用于日志和指标）
+        :param window: 统计错误率的最近请求数
+        :param min_requests: 开始判断前至少需要的样本数
+        :param failure_ratio: 打开熔断的错误率（0~1）
+        :param open_seconds: 熔断持续时间（秒）
+        """
+        self.name = name
+        self.min_requests = max(1, min_requests)
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.state = CircuitState.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=max(window, self.min_requests))
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_request(self) -> None:
+        """请求前检查熔断状态.
+
+        :raises CircuitOpenError: 当熔断器打开（或半开且已有探测请求）时
+        """
+        if self.state is CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self._reject()
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probing:
+                self._reject()
+            self._probing = True
+
+    def record(self, success: bool) -> None:
+        """记录一次请求结果.
+
+        :param success: 请求是否成功（网络错误和5xx视为失败）
+        """
+        if self.state is CircuitState.HALF_OPEN:
+            self._probing = False
+            if success:
+                self._outcomes.clear()
+                self._transition(CircuitState.CLOSED)
+            else:
+                self._open()
+            return
+
+        self._outcomes.append(success)
+        if len(self._outcomes) < self.min_requests:
+            return
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def release(self) -> None:
+        """探测请求没有结果（如被取消）时释放探测名额."""
+        self._probing = False
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(CircuitState.OPEN)
+
+    def _reject(self) -> None:
+        metrics.UPSTREAM_CIRCUIT_REJECTED.inc(endpoint=self.name)
+        raise CircuitOpenError(f"{self.name} 熔断中，请求被拒绝")
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is self.state:
+            return
+        self.state = state
+        metrics.UPSTREAM_CIRCUIT_TRANSITIONS.inc(endpoint=self.name, state=state.value)
+        if state is CircuitState.OPEN:
+            logger.warning("🔌 %s 错误率过高，熔断 %s 秒", self.name, self.open_seconds)
+        else:
+            logger.info("🔌 %s 熔断器状态: %s", self.name, state.value)
+
+
+def is_failure(response: Optional[httpx.Response]) -> bool:
+    """请求结果是否计为熔断器的失败（网络错误或5xx）.
+
+    429由限流调度器处理，4xx是正常的业务结果，都不计为失败。
+
+    :param response: 响应，网络错误时为None
+    """
+    return response is None or response.status_code >= 500
@@ -0,0 +1,116 @@
+"""内存缓存工具."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """带过期时间和容量上限的LRU缓存."""
+
+    def __init__(self, ttl: float, max_items: int = 1024):
+        """初始化缓存.
+
+        :param ttl: 默认过期时间（秒）
+        :param max_items: 最多保留的条目数，超出时淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.max_items = max_items
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """读取未过期的缓存值.
+
+        :param key: 缓存键
+        :param default: 未命中时的返回值
+        :return: 缓存值
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """写入缓存.
+
+        :param key: 缓存键
+        :param value: 缓存值
+        :param ttl: 本条目的过期时间（秒），默认使用缓存的ttl
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def items(self) -> List[Tuple[K, V, float]]:
+        """未过期的条目（最久未使用的在前，按顺序写回可恢复LRU顺序）.
+
+        :return: (键, 值, 剩余有效期秒数)列表
+        """
+        now = time.monotonic()
+        return [
+            (key, value, expires_at - now)
+            for key, (expires_at, value) in self._data.items()
+            if expires_at > now
+        ]
+
+    def pop(self, key: K) -> None:
+        """删除缓存条目."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存."""
+        self._data.clear()
+
+    def __contains__(self, key: object) -> bool:
+        item = self._data.get(key)  # type: ignore[arg-type]
+        return item is not None and item[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight(Generic[K, V]):
+    """合并相同key的并发请求，只执行一次并把结果共享给所有调用方."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[K, "asyncio.Task[V]"] = {}
+
+    async def run(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """执行或加入key对应的请求.
+
+        :param key: 请求键
+        :param factory: 没有进行中的请求时用于创建请求的函数
+        :return: 请求结果
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # shield：某个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._tasks
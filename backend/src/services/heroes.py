@@ -0,0 +1,121 @@
+"""英雄常量表."""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HeroTable:
+    """按hero_id直接下标访问的只读英雄表.
+
+    由OpenDota的 ``/constants/heroes`` 构建，英雄ID连续且很小（目前不到150），
+    名称保存在以hero_id为下标的元组中，查找就是一次下标访问。表构建后不再修改，
+    刷新时整体替换，请求之间无需加锁。
+    """
+
+    __slots__ = ("_names", "_keys", "_count")
+
+    def __init__(self, heroes: Dict[int, Tuple[str, str]]):
+        """初始化英雄表.
+
+        :param heroes: hero_id -> (内部名称如npc_dota_hero_antimage, 本地化名称)
+        """
+        size = max(heroes, default=-1) + 1
+        names: List[Optional[str]] = [None] * size
+        keys: List[Optional[str]] = [None] * size
+        for hero_id, (key, name) in heroes.items():
+            keys[hero_id] = key
+            names[hero_id] = name
+        self._keys: Tuple[Optional[str], ...] = tuple(keys)
+        self._names: Tuple[Optional[str], ...] = tuple(names)
+        # 分析逐行用 ``if heroes`` 判断，英雄数在构建时算好
+        self._count = len(heroes)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def name(self, hero_id: Optional[int]) -> Optional[str]:
+        """英雄本地化名称.
+
+        :param hero_id: 英雄ID
+        :return: 名称，未知英雄返回None
+        """
+        if hero_id is None or not 0 < hero_id < len(self._names):
+            return None
+        return self._names[hero_id]
+
+    @classmethod
+    def from_constants(cls, data: Dict[str, Any]) -> "HeroTable":
+        """从OpenDota英雄常量构建.
+
+        :param data: ``/constants/heroes`` 的响应（以hero_id字符串为键）
+        :return: 英雄表
+        """
+        heroes = {}
+        for hero in data.values():
+            hero_id = hero.get("id")
+            if isinstance(hero_id, int) and hero_id > 0:
+                key = hero.get("name") or ""
+                heroes[hero_id] = (key, hero.get("localized_name") or key)
+        return cls(heroes)
+
+    def to_constants(self) -> Dict[str, Any]:
+        """导出为与 ``/constants/heroes`` 相同结构的精简字典（用于磁盘快照）."""
+        return {
+            str(hero_id): {"id": hero_id, "name": key, "localized_name": name}
+            for hero_id, (key, name) in enumerate(zip(self._keys, self._names))
+            if name is not None
+        }
+
+
+def load_snapshot(path: str) -> Optional[Tuple[HeroTable, float]]:
+    """读取英雄表磁盘快照.
+
+    :param path: 快照文件路径
+    :return: (英雄表, 快照写入时间戳)，没有快照或无法解析时返回None
+    """
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            table = HeroTable.from_constants(json.load(f))
+        return table, os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning("英雄表快照 %s 无法读取: %s", path, e)
+        return None
+
+
+def save_snapshot(path: str, table: HeroTable) -> None:
+    """原子写入英雄表磁盘快照（先写临时文件再替换）.
+
+    :param path: 快照文件路径
+    :param table: 英雄表
+    """
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 多个worker可能同时刷新，各自写临时文件再替换
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(table.to_constants(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("写入英雄表快照 %s 失败: %s", path, e)
+
+
+def snapshot_is_fresh(saved_at: float, max_age: float) -> bool:
+    """快照是否还在有效期内.
+
+    :param saved_at: 快照写入时间戳
+    :param max_age: 有效期（秒）
+    """
+    return time.time() - saved_at < max_age
@@ -0,0 +1,292 @@
+"""英雄对位和配合矩阵.
+
+由离线批处理任务（``python -m src.matchups``）从所有缓存的比赛详情计算，
+结果保存为一个压缩的 ``.npz`` 文件，API启动时载入后按hero_id直接下标查询。
+numpy只在计算和载入矩阵时导入。
+"""
+
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.heroes import HeroTable
+
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 计算时矩阵的边长（hero_id目前不到150），保存时截断到实际出现的最大hero_id
+MATRIX_SIZE = 256
+# 每队英雄数
+TEAM_SIZE = 5
+# 计数矩阵：against_*[h, o] 为h对阵o的场次和h的胜场，with_*[h, o] 为h与o同队
+COUNT_FIELDS = (
+    "hero_games",
+    "hero_wins",
+    "against_games",
+    "against_wins",
+    "with_games",
+    "with_wins",
+)
+# 预先排好序的对位/配合：每行是按胜率排列的hero_id，不足时用-1填充
+RANK_FIELDS = ("best_against", "worst_against", "best_with", "worst_with")
+
+
+def _lineup(match: Dict[str, Any]) -> Optional[List[int]]:
+    """提取一场比赛的阵容.
+
+    :param match: 比赛详情（完整或精简记录）
+    :return: 天辉5个英雄加夜魇5个英雄，阵容不完整或胜负未知时返回None
+    """
+    if not isinstance(match.get("radiant_win"), bool):
+        return None
+    radiant: List[int] = []
+    dire: List[int] = []
+    for player in match.get("players") or []:
+        hero_id = player.get("hero_id")
+        if not isinstance(hero_id, int) or not 0 < hero_id < MATRIX_SIZE:
+            return None
+        (radiant if player.get("player_slot", 0) < 128 else dire).append(hero_id)
+    if len(radiant) != TEAM_SIZE or len(dire) != TEAM_SIZE:
+        return None
+    return radiant + dire
+
+
+def count_matchups(matches: Iterable[Dict[str, Any]]) -> Dict[str, "np.ndarray"]:
+    """统计一批比赛的英雄场次、对位和同队矩阵.
+
+    :param matches: 比赛详情
+    :return: COUNT_FIELDS中各计数数组（边长MATRIX_SIZE，int64）
+    """
+    import numpy as np
+
+    lineups: List[List[int]] = []
+    radiant_wins: List[bool] = []
+    for match in matches:
+        lineup = _lineup(match)
+        if lineup is not None:
+            lineups.append(lineup)
+            radiant_wins.append(match["radiant_win"])
+
+    size = MATRIX_SIZE
+    cells = size * size
+    if not lineups:
+        return {
+            field: np.zeros(
+                size if field.startswith("hero_") else (size, size), np.int64
+            )
+            for field in COUNT_FIELDS
+        }
+
+    # (比赛, 阵营, 位置)；阵营0为天辉，1为夜魇
+    ours = np.asarray(lineups, dtype=np.int64).reshape(-1, 2, TEAM_SIZE)
+    theirs = ours[:, ::-1]
+    radiant_win = np.asarray(radiant_wins, dtype=bool)
+    won = np.stack([radiant_win, ~radiant_win], axis=1)
+    shape = ours.shape + (TEAM_SIZE,)
+
+    # 己方每个英雄与对方每个英雄组成一个对位
+    against = (ours[..., :, None] * size + theirs[..., None, :]).ravel()
+    against_won = np.broadcast_to(won[..., None, None], shape).ravel()
+    # 己方两两组合（不含自己）
+    others = ~np.eye(TEAM_SIZE, dtype=bool)
+    together = ours[..., :, None] * size + ours[..., None, :]
+    together_won = np.broadcast_to(won[..., None, None], shape)
+    pair_mask = np.broadcast_to(others, shape)
+    heroes = ours.ravel()
+    hero_won = np.broadcast_to(won[..., None], ours.shape).ravel()
+
+    return {
+        "hero_games": np.bincount(heroes, minlength=size),
+        "hero_wins": np.bincount(heroes[hero_won], minlength=size),
+        "against_games": np.bincount(against, minlength=cells).reshape(size, size),
+        "against_wins": np.bincount(against[against_won], minlength=cells).reshape(
+            size, size
+        ),
+        "with_games": np.bincount(together[pair_mask], minlength=cells).reshape(
+            size, size
+        ),
+        "with_wins": np.bincount(
+            together[pair_mask & together_won], minlength=cells
+        ).reshape(size, size),
+    }
+
+
+def rank_matchups(
+    games: "np.ndarray", wins: "np.ndarray", min_games: int, top: int
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """按胜率为每个英雄排出最好和最差的对位（或配合）.
+
+    :param games: 场次矩阵
+    :param wins: 胜场矩阵
+    :param min_games: 参与排名的最少场次
+    :param top: 每个英雄保留的数量
+    :return: (最好, 最差)，形状为(英雄数, top)的hero_id数组，不足时为-1
+    """
+    import numpy as np
+
+    valid = games >= max(min_games, 1)
+    rate = np.divide(wins, games, out=np.zeros(games.shape), where=valid)
+    top = min(top, games.shape[1])
+    ranked = []
+    for key in (np.where(valid, -rate, np.inf), np.where(valid, rate, np.inf)):
+        order = np.argsort(key, axis=1, kind="stable")[:, :top]
+        ranked.append(
+            np.where(np.take_along_axis(valid, order, axis=1), order, -1).astype(
+                np.int16
+            )
+        )
+    return ranked[0], ranked[1]
+
+
+def save_matchups(
+    path: str,
+    counts: Dict[str, "np.ndarray"],
+    match_count: int,
+    min_games: int,
+    top: int,
+) -> None:
+    """排名并原子写入矩阵文件（先写临时文件再替换）.
+
+    :param path: 输出文件路径
+    :param counts: count_matchups的（合并后）结果
+    :param match_count: 统计的比赛数
+    :param min_games: 参与排名的最少场次
+    :param top: 每个英雄保留的对位数
+    """
+    import numpy as np
+
+    used = np.flatnonzero(counts["hero_games"])
+    size = int(used[-1]) + 1 if used.size else 1
+    arrays = {
+        field: (
+            counts[field][:size]
+            if field.startswith("hero_")
+            else counts[field][:size, :size]
+        )
+        for field in COUNT_FIELDS
+    }
+    # 场次不会超过比赛数，按范围选择最小的整数类型
+    dtype = np.uint32 if match_count >= 2**16 else np.uint16
+    arrays = {field: array.astype(dtype) for field, array in arrays.items()}
+    for kind in ("against", "with"):
+        best, worst = rank_matchups(
+            arrays[f"{kind}_games"], arrays[f"{kind}_wins"], min_games, top
+        )
+        arrays[f"best_{kind}"] = best
+        arrays[f"worst_{kind}"] = worst
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    contents: Dict[str, Any] = {
+        "match_count": np.int64(match_count),
+        "min_games": np.int64(min_games),
+        **arrays,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **contents)
+    os.replace(tmp_path, path)
+
+
+class HeroMatchups:
+    """载入内存的英雄对位和配合矩阵（只读）.
+
+    查询一个英雄就是按hero_id取出预先排好序的一行，再按下标读取场次和胜场，
+    与比赛数量无关。
+    """
+
+    def __init__(self, arrays: Dict[str, "np.ndarray"]):
+        """初始化.
+
+        :param arrays: 矩阵文件中的数组
+        """
+        self.match_count = int(arrays["match_count"])
+        self.min_games = int(arrays["min_games"])
+        self._arrays = {field: arrays[field] for field in COUNT_FIELDS + RANK_FIELDS}
+        self.size = len(self._arrays["hero_games"])
+
+    @classmethod
+    def load(cls, path: str) -> Optional["HeroMatchups"]:
+        """读取矩阵文件.
+
+        :param path: 文件路径
+        :return: 矩阵，文件不存在、numpy未安装或无法解析时返回None
+        """
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            import numpy as np
+        except ImportError:
+            logger.warning("英雄对位矩阵 %s 需要安装numpy才能载入", path)
+            return None
+        try:
+            with np.load(path) as data:
+                return cls({name: data[name] for name in data.files})
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("英雄对位矩阵 %s 无法读取: %s", path, e)
+            return None
+
+    def __contains__(self, hero_id: object) -> bool:
+        return (
+            isinstance(hero_id, int)
+            and 0 < hero_id < self.size
+            and bool(self._arrays["hero_games"][hero_id])
+        )
+
+    def _records(
+        self,
+        kind: str,
+        hero_id: int,
+        order: "np.ndarray",
+        limit: int,
+        heroes: Optional[HeroTable],
+    ) -> List[Dict[str, Any]]:
+        """把排好序的一行转换为对位记录."""
+        games = self._arrays[f"{kind}_games"][hero_id]
+        wins = self._arrays[f"{kind}_wins"][hero_id]
+        records = []
+        for other in order[:limit].tolist():
+            if other < 0:
+                break
+            other_games = int(games[other])
+            other_wins = int(wins[other])
+            records.append(
+                {
+                    "hero_id": other,
+                    "hero_name": heroes.name(other) if heroes is not None else None,
+                    "games": other_games,
+                    "wins": other_wins,
+                    "losses": other_games - other_wins,
+                    "win_rate": round(other_wins / other_games * 100, 2),
+                }
+            )
+        return records
+
+    def matchups(
+        self, hero_id: int, limit: int = 5, heroes: Optional[HeroTable] = None
+    ) -> Dict[str, Any]:
+        """英雄最好和最差的对位及配合.
+
+        :param hero_id: 英雄ID（调用方先用 ``in`` 判断是否有数据）
+        :param limit: 每个列表返回的英雄数
+        :param heroes: 英雄表，用于填充英雄名称
+        :return: 英雄总战绩和best_against、worst_against、best_with、worst_with
+        """
+        games = int(self._arrays["hero_games"][hero_id])
+        wins = int(self._arrays["hero_wins"][hero_id])
+        result: Dict[str, Any] = {
+            "hero_id": hero_id,
+            "hero_name": heroes.name(hero_id) if heroes is not None else None,
+            "games": games,
+            "wins": wins,
+            "win_rate": round(wins / games * 100, 2) if games else 0.0,
+        }
+        for field in RANK_FIELDS:
+            kind = field.split("_", 1)[1]
+            result[field] = self._records(
+                kind, hero_id, self._arrays[field][hero_id], limit, heroes
+            )
+        return result
@@ -0,0 +1,160 @@
+"""玩家昵称解析服务."""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.core import metrics
+from src.core.config import settings
+from src.services.cache import SingleFlight
+from src.services.opendota import OpenDotaClient
+from src.services.ratelimit import Priority
+from src.services.shared import SharedCache, SharedStateBackend
+
+logger = logging.getLogger(__name__)
+
+# 负缓存标记：查询过但没有找到昵称
+_NOT_FOUND = ""
+
+
+class NameResolver:
+    """玩家昵称解析器.
+
+    并发查询OpenDota和Steam获取昵称，结果（包括查不到的情况）按account_id
+    缓存，跨请求复用；比赛详情中已经带出的昵称也会写入缓存。
+    """
+
+    def __init__(
+        self,
+        client: OpenDotaClient,
+        ttl: float = settings.NAME_CACHE_TTL,
+        negative_ttl: float = settings.NAME_NEGATIVE_CACHE_TTL,
+        max_items: int = settings.NAME_CACHE_MAX_ITEMS,
+        concurrency: int = settings.NAME_RESOLVE_CONCURRENCY,
+        timeout: float = settings.NAME_RESOLVE_TIMEOUT,
+        shared_state: Optional[SharedStateBackend] = None,
+    ):
+        """初始化解析器.
+
+        :param client: OpenDota客户端
+        :param ttl: 昵称缓存有效期（秒）
+        :param negative_ttl: 查不到昵称时的缓存有效期（秒）
+        :param max_items: 最多缓存的玩家数
+        :param concurrency: 单次解析的并发查询数
+        :param timeout: 单次解析的总时限（秒），超时未完成的查询结果留给后续请求
+        :param shared_state: 跨进程共享状态后端，提供时昵称缓存在所有进程间共享
+        """
+        self.client = client
+        self.negative_ttl = negative_ttl
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache: SharedCache[int, str] = SharedCache(
+            "names", ttl=ttl, max_items=max_items, backend=shared_state
+        )
+        self._inflight: SingleFlight[int, Optional[str]] = SingleFlight()
+
+    async def remember(self, names: Dict[int, str]) -> None:
+        """写入已知昵称（例如从比赛详情中获取的昵称）.
+
+        :param names: account_id到昵称的映射
+        """
+        await self.cache.set_many(
+            {account_id: name for account_id, name in names.items() if name}
+        )
+
+    async def resolve(self, account_ids: Iterable[int]) -> Dict[int, str]:
+        """批量解析昵称.
+
+        :param account_ids: 需要解析的账号ID
+        :return: 解析成功的account_id到昵称的映射，查不到或超时的账号不包含在内
+        """
+        names: Dict[int, str] = {}
+        pending = []
+        unique_ids = set(account_ids)
+        cached_names = await self.cache.get_many(unique_ids)
+        for account_id in unique_ids:
+            cached = cached_names.get(account_id)
+            if cached is None:
+                pending.append(account_id)
+            elif cached != _NOT_FOUND:
+                names[account_id] = cached
+        metrics.record_cache("names", True, len(unique_ids) - len(pending))
+        metrics.record_cache("names", False, len(pending))
+        if not pending:
+            return names
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(account_id: int) -> Tuple[int, Optional[str]]:
+            async with semaphore:
+                name = await self._inflight.run(
+                    account_id, lambda: self._lookup(account_id)
+                )
+            return account_id, name
+
+        tasks = [asyncio.ensure_future(lookup(account_id)) for account_id in pending]
+        done, not_done = await asyncio.wait(tasks, timeout=self.timeout)
+        for task in not_done:
+            # 底层查询被shield保护，会在后台完成并写入缓存
+            task.cancel()
+        if not_done:
+            logger.warning("⏱️ %s 个队友昵称在 %s 秒内未解析完成", len(not_done), self.timeout)
+
+        for task in done:
+            if task.cancelled() or task.exception() is not None:
+                continue
+            account_id, name = task.result()
+            if name:
+                names[account_id] = name
+        return names
+
+    async def _lookup(self, account_id: int) -> Optional[str]:
+        """依次从OpenDota和Steam查询单个玩家昵称并写入缓存.
+
+        :param account_id: Steam账号ID
+        :return: 玩家昵称，查不到时返回None
+        """
+        name = None
+        failed = False
+        try:
+            player_info = await self.client.get_player_info(
+                account_id, priority=Priority.BACKGROUND
+            )
+            name = extract_profile_name(player_info)
+        except Exception as e:
+            failed = True
+            logger.warning("❌ 从OpenDota获取玩家 %s 信息失败: %s", account_id, e)
+
+        if not name:
+            try:
+                name = await self.client.get_player_name_from_steam(account_id)
+            except Exception as e:
+                logger.debug("从Steam获取玩家 %s 昵称失败: %s", account_id, e)
+
+        if name:
+            await self.cache.set(account_id, name)
+        elif not failed:
+            # 只有OpenDota确认玩家不存在（404）或没有昵称时才缓存否定结果，
+            # 429、5xx和网络错误等临时失败下次重新查询
+            await self.cache.set(account_id, _NOT_FOUND, ttl=self.negative_ttl)
+        return name
+
+
+def extract_profile_name(player_info: Optional[Dict[str, Any]]) -> Optional[str]:
+    """从OpenDota玩家信息中提取昵称.
+
+    OpenDota返回的昵称通常在profile.personaname，少数情况下在profile.name
+    或根级别。
+
+    :param player_info: /players/{account_id}接口返回的数据
+    :return: 玩家昵称，没有时返回None
+    """
+    if not player_info:
+        return None
+    name = None
+    profile = player_info.get("profile")
+    if profile:
+        name = profile.get("personaname") or profile.get("name")
+    if not name:
+        name = player_info.get("personaname") or player_info.get("name")
+    return name or None
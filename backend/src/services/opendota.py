@@ -1,37 +1,730 @@
 """OpenDota API客户端."""
 
+import asyncio
+import functools
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import httpx
 
+from src.core import metrics, serialization
 from src.core.config import settings
+from src.services.breaker import CircuitBreaker, is_failure
+from src.services.cache import SingleFlight, TTLCache
+from src.services.projection import parse_match_details
+from src.services.ratelimit import Priority, UpstreamScheduler
+from src.services.shared import SharedCache, SharedRateLimit, SharedStateBackend
+from src.services.teammates import TeammateIndex
+from src.services.transport import create_http_client
 
 logger = logging.getLogger(__name__)
 
+# 比赛缓存格式版本：2起只保存精简记录（见projection模块），旧版本的完整详情会被清除
+MATCH_STORE_FORMAT = 2
+
+# 计算对冲延迟所需的最少延迟样本数和保留的样本数
+_HEDGE_MIN_SAMPLES = 20
+_LATENCY_SAMPLES = 200
+
+
+class _Validated(NamedTuple):
+    """条件请求的校验值和上次解析好的响应."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    data: Any
+    size: int  # 上次下载的字节数（304时计为节省）
+    parse_seconds: float  # 上次解析耗时（304时计为节省）
+
+
+# 分页获取比赛历史时投影的字段（分析只需要这些）
+PLAYER_MATCH_FIELDS = (
+    "match_id",
+    "player_slot",
+    "radiant_win",
+    "kills",
+    "deaths",
+    "assists",
+    "last_hits",
+    "hero_damage",
+    "hero_id",
+    "duration",
+    "gold_per_min",
+    "start_time",
+)
+
+
+class MatchStore:
+    """比赛详情存储：内存LRU + SQLite磁盘缓存.
+
+    比赛结束后详情不会再变化，因此按match_id写入一次后即可永久复用。
+    保存的是精简后的比赛记录，磁盘中为zlib压缩的JSON，总大小超过上限时按
+    最近访问时间淘汰。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = settings.MATCH_CACHE_PATH,
+        memory_items: int = settings.MATCH_CACHE_MEMORY_ITEMS,
+        max_bytes: int = settings.MATCH_CACHE_MAX_BYTES,
+    ):
+        """初始化存储.
+
+        :param path: SQLite文件路径，为空时只使用内存缓存
+        :param memory_items: 内存LRU最多保留的比赛数
+        :param max_bytes: 磁盘缓存容量上限（压缩后字节数）
+        """
+        self.path = path or None
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._total_bytes = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """打开（必要时创建）SQLite数据库."""
+        if self.path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS match_details ("
+                " match_id INTEGER PRIMARY KEY,"
+                " payload BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_match_details_accessed"
+                " ON match_details (accessed_at)"
+            )
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version != MATCH_STORE_FORMAT:
+                cursor = db.execute("DELETE FROM match_details")
+                db.execute(f"PRAGMA user_version = {MATCH_STORE_FORMAT}")
+                db.commit()
+                if cursor.rowcount:
+                    logger.info(
+                        "🧹 比赛缓存格式从 %s 升级到 %s，清除 %s 条旧记录",
+                        version,
+                        MATCH_STORE_FORMAT,
+                        cursor.rowcount,
+                    )
+            row = db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM match_details"
+            ).fetchone()
+            self._total_bytes = row[0]
+            self._db = db
+        return self._db
+
+    def _remember(self, match_id: int, data: Dict[str, Any]) -> None:
+        """写入内存LRU并淘汰最久未使用的条目."""
+        self._memory[match_id] = data
+        self._memory.move_to_end(match_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read(self, match_id: int) -> Optional[Dict[str, Any]]:
+        """从磁盘读取比赛详情（在线程池中执行）."""
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT payload FROM match_details WHERE match_id = ?", (match_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE match_details SET accessed_at = ? WHERE match_id = ?",
+                (time.time(), match_id),
+            )
+            db.commit()
+        return cast(Dict[str, Any], serialization.loads(zlib.decompress(row[0])))
+
+    def _write(self, match_id: int, data: Dict[str, Any]) -> None:
+        """写入磁盘并按容量上限淘汰（在线程池中执行）."""
+        payload = zlib.compress(serialization.dumps(data))
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO match_details"
+                " (match_id, payload, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (match_id, payload, len(payload), time.time()),
+            )
+            if cursor.rowcount:
+                self._total_bytes += len(payload)
+            if self._total_bytes > self.max_bytes:
+                self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """淘汰最久未访问的比赛，直到容量降到上限的90%."""
+        target = int(self.max_bytes * 0.9)
+        rows = db.execute(
+            "SELECT match_id, size FROM match_details ORDER BY accessed_at"
+        )
+        evicted = []
+        for match_id, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((match_id,))
+            self._total_bytes -= size
+        db.executemany("DELETE FROM match_details WHERE match_id = ?", evicted)
+        logger.info(
+            "🧹 比赛缓存淘汰 %s 条，当前约 %s 字节", len(evicted), self._total_bytes
+        )
+
+    async def get(self, match_id: int) -> Optional[Dict[str, Any]]:
+        """读取比赛详情.
+
+        :param match_id: 比赛ID
+        :return: 比赛详情，未缓存时返回None
+        """
+        data = self._memory.get(match_id)
+        if data is not None:
+            self._memory.move_to_end(match_id)
+            return data
+        if self.path is None:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read, match_id)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning("读取比赛 %s 磁盘缓存失败: %s", match_id, e)
+            return None
+        if data is not None:
+            self._remember(match_id, data)
+        return data
+
+    async def put(self, match_id: int, data: Dict[str, Any]) -> None:
+        """写入比赛详情（同一match_id只写一次）.
+
+        :param match_id: 比赛ID
+        :param data: 比赛详情
+        """
+        self._remember(match_id, data)
+        if self.path is None:
+            return
+        try:
+            await asyncio.to_thread(self._write, match_id, data)
+        except sqlite3.Error as e:
+            logger.warning("写入比赛 %s 磁盘缓存失败: %s", match_id, e)
+
+    def scan(
+        self, after_match_id: int = 0, batch_size: int = 500
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """按match_id顺序读取一批磁盘中的比赛详情（在线程池中调用）.
+
+        :param after_match_id: 只读取比该ID大的比赛
+        :param batch_size: 每批最多读取的比赛数
+        :return: (比赛ID, 比赛详情)列表，读完时为空
+        """
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return []
+            rows = db.execute(
+                "SELECT match_id, payload FROM match_details WHERE match_id > ?"
+                " ORDER BY match_id LIMIT ?",
+                (after_match_id, batch_size),
+            ).fetchall()
+        return [
+            (match_id, serialization.loads(zlib.decompress(payload)))
+            for match_id, payload in rows
+        ]
+
+    def partition(self, batch_size: int) -> List[int]:
+        """把磁盘中的比赛按match_id划分为每批batch_size场（在线程池或批处理中调用）.
+
+        :param batch_size: 每批的比赛数
+        :return: 每批的起点，依次作为scan的after_match_id即可读完所有比赛
+        """
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return []
+            match_ids = [
+                row[0]
+                for row in db.execute(
+                    "SELECT match_id FROM match_details ORDER BY match_id"
+                )
+            ]
+        return [0] + match_ids[batch_size - 1 : -1 : batch_size]
+
+    def _recent(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """读取最近访问的比赛详情，最久未访问的在前（在线程池中执行）."""
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return []
+            rows = db.execute(
+                "SELECT match_id, payload FROM match_details"
+                " ORDER BY accessed_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (match_id, serialization.loads(zlib.decompress(payload)))
+            for match_id, payload in reversed(rows)
+        ]
+
+    async def preload(self, limit: int = settings.MATCH_CACHE_PRELOAD_ITEMS) -> int:
+        """把磁盘中最近访问的比赛详情载入内存LRU（冷启动后恢复热点数据）.
+
+        :param limit: 最多载入的比赛数（不超过内存LRU容量）
+        :return: 载入的比赛数
+        """
+        limit = min(limit, self.memory_items)
+        if self.path is None or limit <= 0:
+            return 0
+        try:
+            rows = await asyncio.to_thread(self._recent, limit)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning("预载比赛缓存失败: %s", e)
+            return 0
+        for match_id, data in rows:
+            # 已经被请求载入的比赛保持原有位置
+            if match_id not in self._memory:
+                self._remember(match_id, data)
+        if rows:
+            logger.info("📦 预载 %s 场最近访问的比赛详情", len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        """关闭磁盘数据库."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
 
 class OpenDotaClient:
     """OpenDota API客户端."""
 
-    def __init__(self, base_url: str = settings.OPENDOTA_API_BASE_URL):
+    def __init__(
+        self,
+        base_url: str = settings.OPENDOTA_API_BASE_URL,
+        match_store: Optional[MatchStore] = None,
+        scheduler: Optional[UpstreamScheduler] = None,
+        shared_state: Optional[SharedStateBackend] = None,
+        teammate_index: Optional[TeammateIndex] = None,
+    ):
         """初始化客户端.
 
         :param base_url: API基础URL
+        :param match_store: 比赛详情存储，默认按配置创建
+        :param scheduler: 限流调度器，默认按配置创建
+        :param shared_state: 跨进程共享状态后端，提供时最近比赛缓存和上游请求
+            预算在所有进程间共享
+        :param teammate_index: 队友倒排索引，新获取的比赛详情会写入索引
         """
         self.base_url = base_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # OpenDota和Steam各用一个连接池，Steam慢或不可用时不占用OpenDota的连接
+        self.client = create_http_client(
+            "OpenDota",
+            http2=settings.OPENDOTA_HTTP2,
+            max_connections=settings.OPENDOTA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENDOTA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENDOTA_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.OPENDOTA_CONNECT_TIMEOUT,
+            read_timeout=settings.OPENDOTA_READ_TIMEOUT,
+            compression=settings.UPSTREAM_COMPRESSION,
+        )
+        # Steam连接池在第一次查询昵称时才创建（见steam_client）
+        self._steam_client: Optional[httpx.AsyncClient] = None
+        # 按接口覆盖的读取超时
+        self._timeouts = {
+            endpoint: httpx.Timeout(read, connect=settings.OPENDOTA_CONNECT_TIMEOUT)
+            for endpoint, read in settings.OPENDOTA_READ_TIMEOUTS.items()
+        }
+        self.match_store = match_store if match_store is not None else MatchStore()
+        self.teammate_index = teammate_index
+        self.scheduler = scheduler or UpstreamScheduler(
+            requests_per_minute=settings.OPENDOTA_RATE_LIMIT_PER_MINUTE,
+            burst=settings.OPENDOTA_RATE_LIMIT_BURST,
+            max_concurrency=settings.OPENDOTA_MAX_CONCURRENCY,
+        )
+        # 同一场比赛的并发查询共享一次上游请求
+        self._match_inflight: SingleFlight[int, Dict[str, Any]] = SingleFlight()
+        # 最近比赛列表短期缓存（后台预取写入，分析请求直接复用）
+        self.recent_cache: SharedCache[Tuple[int, int], List[Dict[str, Any]]] = (
+            SharedCache(
+                "recent_matches",
+                ttl=settings.RECENT_MATCHES_CACHE_TTL,
+                max_items=settings.PREFETCH_TRACKED_ACCOUNTS,
+                backend=shared_state,
+            )
+        )
+        # 所有进程合计的请求预算（进程内调度器仍负责优先级和并发）
+        self.shared_budget = (
+            SharedRateLimit(
+                shared_state,
+                "opendota",
+                requests_per_minute=settings.OPENDOTA_RATE_LIMIT_PER_MINUTE,
+                burst=settings.OPENDOTA_RATE_LIMIT_BURST,
+            )
+            if shared_state is not None
+            else None
+        )
+        self._recent_inflight: SingleFlight[Tuple[int, int], List[Dict[str, Any]]] = (
+            SingleFlight()
+        )
+        # 条件请求的校验值（按完整URL），上游返回304时复用已解析的响应
+        self._validators: TTLCache[str, _Validated] = TTLCache(
+            ttl=settings.CONDITIONAL_CACHE_TTL,
+            max_items=settings.CONDITIONAL_CACHE_MAX_ITEMS,
+        )
+        # 每个OpenDota接口一个熔断器
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # 最近成功请求的耗时，用于计算对冲请求的等待时间
+        self._latencies: Dict[str, Deque[float]] = {}
+        metrics.UPSTREAM_TOKENS.set_function(lambda: self.scheduler.tokens)
+        metrics.UPSTREAM_IN_FLIGHT.set_function(lambda: self.scheduler.in_flight)
+
+    @property
+    def steam_client(self) -> httpx.AsyncClient:
+        """Steam社区连接池（第一次使用时创建）."""
+        if self._steam_client is None:
+            from src.services import steam
+
+            self._steam_client = steam.create_steam_client()
+        return self._steam_client
 
     async def close(self) -> None:
-        """关闭HTTP客户端."""
+        """关闭HTTP客户端和比赛缓存."""
         await self.client.aclose()
+        if self._steam_client is not None:
+            await self._steam_client.aclose()
+        self.match_store.close()
+
+    async def warm_up(
+        self, connections: int = settings.OPENDOTA_WARM_CONNECTIONS
+    ) -> None:
+        """预先建立到OpenDota的连接（TCP和TLS握手），第一个请求不再承担建连耗时.
+
+        请求OpenDota的健康检查接口（指标中记为warmup接口），失败时忽略。
+
+        :param connections: 预热的连接数
+        """
+        if connections <= 0:
+            return
+        started = time.perf_counter()
+        url = f"{self.base_url}/health"
+        results = await asyncio.gather(
+            *(
+                self._get(url, priority=Priority.BACKGROUND, endpoint="warmup")
+                for _ in range(connections)
+            ),
+            return_exceptions=True,
+        )
+        warmed = sum(not isinstance(r, BaseException) for r in results)
+        logger.info(
+            "🔥 预热OpenDota连接 %s/%s 个，耗时 %.3f秒",
+            warmed,
+            connections,
+            time.perf_counter() - started,
+        )
+
+    async def _get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        endpoint: str = "other",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """经限流调度器请求OpenDota，收到429时按Retry-After等待后重试.
+
+        :param url: 请求地址
+        :param params: 查询参数
+        :param priority: 请求优先级
+        :param endpoint: 接口名称（用于指标）
+        :param headers: 额外的请求头
+        :return: 最后一次请求的响应
+        :raises httpx.RequestError: 当网络请求失败时
+        """
+        max_retries = settings.OPENDOTA_429_MAX_RETRIES
+        breaker = self._breaker(endpoint)
+        for attempt in range(max_retries + 1):
+            if breaker is not None:
+                # 熔断时直接失败，不占用限流额度和连接
+                breaker.before_request()
+            queued_at = time.perf_counter()
+            try:
+                async with self.scheduler.slot(priority):
+                    # 在优先级名额内取共享令牌，后台请求不会抢在交互请求之前
+                    if self.shared_budget is not None:
+                        await self.shared_budget.acquire()
+                    started = time.perf_counter()
+                    metrics.UPSTREAM_QUEUE_SECONDS.observe(
+                        started - queued_at, priority=priority.name.lower()
+                    )
+                    response = await self._timed_get(
+                        endpoint, url, params=params, headers=headers
+                    )
+            except httpx.RequestError:
+                if breaker is not None:
+                    breaker.record(False)
+                raise
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if breaker is not None:
+                breaker.record(not is_failure(response))
+            self.scheduler.observe(response.status_code, response.headers)
+            if response.status_code == 429:
+                metrics.UPSTREAM_RATE_LIMITED.inc(endpoint=endpoint)
+            if response.status_code != 429 or attempt == max_retries:
+                return response
+            metrics.UPSTREAM_RETRIES.inc(endpoint=endpoint)
+            logger.warning(
+                "⚠️ OpenDota限流（%s），第 %s/%s 次重试", url, attempt + 1, max_retries
+            )
+        return response
+
+    async def _conditional_get(
+        self,
+        url: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Any:
+        """请求并解析JSON，上次响应带有ETag或Last-Modified时发出条件请求.
+
+        上游返回304时不下载也不解析响应体，直接复用上次解析好的对象，并把
+        节省的字节数和解析时间记入指标。
+
+        :param url: 请求地址
+        :param endpoint: 接口名称（用于指标）
+        :param params: 查询参数
+        :param priority: 请求优先级
+        :return: 解析后的JSON
+        :raises httpx.HTTPError: 当请求失败或状态码不是200/304时
+        """
+        key = str(httpx.URL(url, params=params))
+        validated = self._validators.get(key)
+        headers = {}
+        if validated is not None:
+            if validated.etag:
+                headers["If-None-Match"] = validated.etag
+            if validated.last_modified:
+                headers["If-Modified-Since"] = validated.last_modified
+        response = await self._get(
+            url,
+            params=params,
+            priority=priority,
+            endpoint=endpoint,
+            headers=headers or None,
+        )
+        if response.status_code == 304 and validated is not None:
+            metrics.UPSTREAM_NOT_MODIFIED.inc(endpoint=endpoint)
+            metrics.UPSTREAM_SAVED_BYTES.inc(validated.size, endpoint=endpoint)
+            metrics.UPSTREAM_SAVED_PARSE_SECONDS.inc(
+                validated.parse_seconds, endpoint=endpoint
+            )
+            # 刷新保留时间
+            self._validators.set(key, validated)
+            return validated.data
+        response.raise_for_status()
+        started = time.perf_counter()
+        data = serialization.loads(response.content)
+        parse_seconds = time.perf_counter() - started
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validators.set(
+                key,
+                _Validated(
+                    etag,
+                    last_modified,
+                    data,
+                    # 压缩传输时为压缩后的字节数
+                    response.num_bytes_downloaded or len(response.content),
+                    parse_seconds,
+                ),
+            )
+        else:
+            self._validators.pop(key)
+        return data
+
+    def _breaker(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """获取接口的熔断器，未启用熔断时返回None."""
+        if not settings.OPENDOTA_BREAKER_ENABLED:
+            return None
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                endpoint,
+                window=settings.OPENDOTA_BREAKER_WINDOW,
+                min_requests=settings.OPENDOTA_BREAKER_MIN_REQUESTS,
+                failure_ratio=settings.OPENDOTA_BREAKER_FAILURE_RATIO,
+                open_seconds=settings.OPENDOTA_BREAKER_OPEN_SECONDS,
+            )
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def _hedge_delay(self, endpoint: str) -> Optional[float]:
+        """对冲请求的等待时间（近期成功请求耗时的分位数），样本不足时返回None."""
+        samples = self._latencies.get(endpoint)
+        if not samples or len(samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        index = int(len(ordered) * settings.MATCH_DETAILS_HEDGE_PERCENTILE / 100)
+        return max(
+            settings.MATCH_DETAILS_HEDGE_MIN_DELAY,
+            ordered[min(index, len(ordered) - 1)],
+        )
+
+    async def _hedged_get(
+        self, url: str, priority: Priority, endpoint: str
+    ) -> httpx.Response:
+        """请求超过近期分位延迟仍未返回时再发一个相同请求，使用先成功的响应.
+
+        只在令牌桶有空闲令牌时发出对冲请求，不与其他请求争抢额度；
+        另一个请求随即取消。
+
+        :param url: 请求地址
+        :param priority: 请求优先级
+        :param endpoint: 接口名称（用于指标和延迟统计）
+        :return: 响应
+        :raises httpx.RequestError: 当所有请求都失败时
+        """
+        delay = self._hedge_delay(endpoint)
+        if delay is None:
+            return await self._get(url, priority=priority, endpoint=endpoint)
+
+        primary = asyncio.ensure_future(
+            self._get(url, priority=priority, endpoint=endpoint)
+        )
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self.scheduler.tokens < 1:
+                return await primary
+            metrics.UPSTREAM_HEDGES.inc(endpoint=endpoint, outcome="launched")
+            hedge = asyncio.ensure_future(
+                self._get(url, priority=priority, endpoint=endpoint)
+            )
+            tasks.add(hedge)
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [
+                    task
+                    for task in done
+                    if task.exception() is None and not is_failure(task.result())
+                ]
+                if succeeded:
+                    if succeeded[0] is hedge:
+                        metrics.UPSTREAM_HEDGES.inc(endpoint=endpoint, outcome="won")
+                    return succeeded[0].result()
+                if not pending:
+                    # 两个请求都失败时按主请求的结果处理
+                    return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _timed_get(
+        self, endpoint: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """发出GET请求并记录次数、状态和耗时.
+
+        "steam"接口使用Steam的连接池，其余接口使用OpenDota的连接池和按接口
+        配置的读取超时。
+
+        :param endpoint: 接口名称（用于指标）
+        :param url: 请求地址
+        :return: 响应
+        :raises httpx.RequestError: 当网络请求失败时
+        """
+        if endpoint == "steam":
+            client = self.steam_client
+        else:
+            client = self.client
+            if endpoint in self._timeouts:
+                kwargs.setdefault("timeout", self._timeouts[endpoint])
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.get(url, **kwargs)
+            status = str(response.status_code)
+            if response.status_code == 200:
+                self._latencies.setdefault(
+                    endpoint, deque(maxlen=_LATENCY_SAMPLES)
+                ).append(time.perf_counter() - started)
+            return response
+        except asyncio.CancelledError:
+            # 被取消的对冲请求等
+            status = "cancelled"
+            raise
+        finally:
+            metrics.UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=status)
+            metrics.UPSTREAM_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, endpoint=endpoint
+            )
 
     async def get_player_recent_matches(
-        self, account_id: int, limit: int = 20
+        self,
+        account_id: int,
+        limit: int = 20,
+        priority: Priority = Priority.INTERACTIVE,
+        refresh: bool = False,
     ) -> List[Dict[str, Any]]:
-        """获取玩家最近比赛.
+        """获取玩家最近比赛（短期缓存）.
 
         :param account_id: Steam账号ID
         :param limit: 返回比赛数量限制
+        :param priority: 请求优先级，后台预取使用BACKGROUND
+        :param refresh: 忽略缓存重新请求
+        :return: 比赛列表
+        :raises httpx.HTTPError: 当API请求失败时
+        """
+        key = (account_id, limit)
+        if not refresh:
+            cached = await self.recent_cache.get(key)
+            metrics.record_cache("recent_matches", cached is not None)
+            if cached is not None:
+                return cached
+
+        return await self._recent_inflight.run(
+            key, lambda: self._fetch_recent_matches(account_id, limit, priority)
+        )
+
+    async def _fetch_recent_matches(
+        self, account_id: int, limit: int, priority: Priority
+    ) -> List[Dict[str, Any]]:
+        """从OpenDota请求玩家最近比赛并写入缓存.
+
+        :param account_id: Steam账号ID
+        :param limit: 返回比赛数量限制
+        :param priority: 请求优先级
         :return: 比赛列表
         :raises httpx.HTTPError: 当API请求失败时
         """
@@ -39,117 +732,233 @@ class OpenDotaClient:
         params = {"limit": limit}
 
         try:
-            response = await self.client.get(url, params=params)
+            matches = await self._conditional_get(
+                url, "recentMatches", params=params, priority=priority
+            )
+        except httpx.HTTPStatusError as e:
+            logger.error("获取玩家最近比赛失败: %s", e.response.status_code)
+            raise
+        except httpx.RequestError as e:
+            logger.error("请求失败: %s", e)
+            raise
+        if settings.RECENT_MATCHES_CACHE_TTL > 0:
+            await self.recent_cache.set((account_id, limit), matches)
+        return cast(List[Dict[str, Any]], matches)
+
+    async def get_player_matches(
+        self,
+        account_id: int,
+        limit: int,
+        offset: int = 0,
+        days: Optional[int] = None,
+        project: Tuple[str, ...] = PLAYER_MATCH_FIELDS,
+    ) -> List[Dict[str, Any]]:
+        """分页获取玩家比赛历史（只返回投影的字段）.
+
+        :param account_id: Steam账号ID
+        :param limit: 本页比赛数量
+        :param offset: 跳过的比赛数量
+        :param days: 只返回最近多少天内的比赛
+        :param project: 需要返回的字段
+        :return: 比赛列表（按时间倒序）
+        :raises httpx.HTTPError: 当API请求失败时
+        """
+        url = f"{self.base_url}/players/{account_id}/matches"
+        params: Dict[str, Any] = {
+            "limit": limit,
+            "offset": offset,
+            "project": list(project),
+        }
+        if days is not None:
+            params["date"] = days
+
+        try:
+            response = await self._get(url, params=params, endpoint="matches")
             response.raise_for_status()
-            return response.json()
+            return cast(List[Dict[str, Any]], serialization.loads(response.content))
         except httpx.HTTPStatusError as e:
-            logger.error(f"获取玩家最近比赛失败: {e.response.status_code}")
+            logger.error("获取玩家比赛历史失败: %s", e.response.status_code)
             raise
         except httpx.RequestError as e:
-            logger.error(f"请求失败: {e}")
+            logger.error("请求失败: %s", e)
             raise
 
-    async def get_match_details(self, match_id: int) -> Dict[str, Any]:
-        """获取比赛详情.
+    async def iter_player_match_pages(
+        self,
+        account_id: int,
+        limit: int,
+        days: Optional[int] = None,
+        page_size: int = settings.MATCH_PAGE_SIZE,
+        concurrency: int = settings.MATCH_PAGE_CONCURRENCY,
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """并发分页获取玩家比赛历史，按完成顺序逐页返回.
+
+        先单独请求第一页，第一页不满说明没有更多比赛，不再请求后续页。
+
+        :param account_id: Steam账号ID
+        :param limit: 总比赛数量上限
+        :param days: 只返回最近多少天内的比赛
+        :param page_size: 每页比赛数量
+        :param concurrency: 同时请求的页数
+        :return: (页偏移量, 该页比赛列表) 的异步迭代器，页可能乱序到达
+        :raises httpx.HTTPError: 当API请求失败时
+        """
+        first_size = min(page_size, limit)
+        first_page = await self.get_player_matches(
+            account_id, limit=first_size, offset=0, days=days
+        )
+        yield 0, first_page
+        if len(first_page) < first_size:
+            return
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_page(offset: int) -> Tuple[int, List[Dict[str, Any]]]:
+            async with semaphore:
+                page = await self.get_player_matches(
+                    account_id,
+                    limit=min(page_size, limit - offset),
+                    offset=offset,
+                    days=days,
+                )
+            return offset, page
+
+        tasks = [
+            asyncio.ensure_future(fetch_page(offset))
+            for offset in range(page_size, limit, page_size)
+        ]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                yield await next_page
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get_match_details(
+        self, match_id: int, priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """获取比赛详情（优先读取缓存）.
 
         :param match_id: 比赛ID
+        :param priority: 请求优先级，后台预取使用BACKGROUND
         :return: 比赛详情
         :raises httpx.HTTPError: 当API请求失败时
         """
+        cached = await self.match_store.get(match_id)
+        metrics.record_cache("match_details", cached is not None)
+        if cached is not None:
+            return cached
+
+        return await self._match_inflight.run(
+            match_id, lambda: self._fetch_and_store_match(match_id, priority)
+        )
+
+    async def _fetch_and_store_match(
+        self, match_id: int, priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """请求比赛详情并写入缓存.
+
+        :param match_id: 比赛ID
+        :param priority: 请求优先级
+        :return: 比赛详情
+        """
+        data = await self._fetch_match_details(match_id, priority)
+        # 只缓存已结束且包含玩家数据的比赛
+        if "radiant_win" in data and data.get("players"):
+            await self.match_store.put(match_id, data)
+            if self.teammate_index is not None:
+                await self.teammate_index.add_matches([data])
+        return data
+
+    async def _fetch_match_details(
+        self, match_id: int, priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """从OpenDota请求比赛详情并投影为精简记录.
+
+        :param match_id: 比赛ID
+        :param priority: 请求优先级
+        :return: 精简的比赛详情
+        :raises httpx.HTTPError: 当API请求失败时
+        """
         url = f"{self.base_url}/matches/{match_id}"
 
         try:
-            response = await self.client.get(url)
+            if settings.MATCH_DETAILS_HEDGE and priority is Priority.INTERACTIVE:
+                response = await self._hedged_get(url, priority, "match_details")
+            else:
+                response = await self._get(
+                    url, priority=priority, endpoint="match_details"
+                )
             response.raise_for_status()
-            return response.json()
+            # 解析在线程池中执行，避免大文档阻塞事件循环
+            return await asyncio.to_thread(parse_match_details, response.content)
         except httpx.HTTPStatusError as e:
-            logger.error(f"获取比赛详情失败: {e.response.status_code}")
+            logger.error("获取比赛详情失败: %s", e.response.status_code)
             raise
         except httpx.RequestError as e:
-            logger.error(f"请求失败: {e}")
+            logger.error("请求失败: %s", e)
+            raise
+        except ValueError as e:
+            logger.error("解析比赛 %s 详情失败: %s", match_id, e)
             raise
 
-    async def get_player_info(self, account_id: int) -> Optional[Dict[str, Any]]:
+    async def get_player_info(
+        self, account_id: int, priority: Priority = Priority.INTERACTIVE
+    ) -> Optional[Dict[str, Any]]:
         """获取玩家信息.
 
         :param account_id: Steam账号ID
-        :return: 玩家信息，如果不存在返回None
+        :param priority: 请求优先级，昵称补全等后台查询使用BACKGROUND
+        :return: 玩家信息，如果不存在（404）返回None
+        :raises httpx.HTTPStatusError: 当上游返回404以外的错误状态码（如429、5xx）时
         """
         url = f"{self.base_url}/players/{account_id}"
 
         try:
-            response = await self.client.get(url)
-            if response.status_code == 404:
-                logger.warning(f"玩家 {account_id} 不存在（404）")
-                return None
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"✅ 获取玩家 {account_id} 信息成功")
-            logger.info(f"玩家 {account_id} 数据键: {list(data.keys())}")
+            data = await self._conditional_get(url, "players", priority=priority)
+            logger.debug("✅ 获取玩家 %s 信息成功", account_id)
             if "profile" in data:
-                logger.info(f"玩家 {account_id} profile数据: {data['profile']}")
-            logger.debug(f"玩家 {account_id} 完整数据: {data}")
-            return data
+                logger.debug("玩家 %s profile数据: %s", account_id, data["profile"])
+            logger.debug("玩家 %s 完整数据: %s", account_id, data)
+            return cast(Dict[str, Any], data)
         except httpx.HTTPStatusError as e:
-            logger.warning(f"获取玩家 {account_id} 信息失败: HTTP {e.response.status_code}")
-            return None
+            if e.response.status_code == 404:
+                logger.warning("玩家 %s 不存在（404）", account_id)
+                return None
+            logger.warning(
+                "获取玩家 %s 信息失败: HTTP %s", account_id, e.response.status_code
+            )
+            raise
         except httpx.RequestError as e:
-            logger.error(f"请求玩家 {account_id} 信息失败: {e}")
+            logger.error("请求玩家 %s 信息失败: %s", account_id, e)
             raise
 
+    async def get_hero_constants(self) -> Dict[str, Any]:
+        """获取英雄常量.
+
+        :return: ``/constants/heroes`` 的响应（以hero_id字符串为键）
+        :raises httpx.HTTPError: 当请求失败时
+        """
+        url = f"{self.base_url}/constants/heroes"
+        response = await self._get(
+            url, priority=Priority.BACKGROUND, endpoint="constants"
+        )
+        response.raise_for_status()
+        return cast(Dict[str, Any], serialization.loads(response.content))
+
     async def get_player_name_from_steam(self, account_id: int) -> Optional[str]:
-        """从Steam Web API获取玩家昵称（不需要API Key）.
+        """从Steam社区获取玩家昵称（不需要API Key）.
 
         :param account_id: Steam账号ID（32位）
         :return: 玩家昵称，如果获取失败返回None
         """
+        # 只有OpenDota查不到昵称时才会用到，按需导入
+        from src.services import steam
+
         try:
-            # 将32位Steam ID转换为64位
-            steam_id_64 = account_id + 76561197960265728
-            
-            # Steam Web API（不需要API Key，但可能有限制）
-            # 使用Steam社区API
-            url = f"https://steamcommunity.com/profiles/{steam_id_64}/?xml=1"
-            
-            # 方法1：尝试从Steam社区页面获取（HTML解析）
-            try:
-                url_html = f"https://steamcommunity.com/profiles/{steam_id_64}"
-                response = await self.client.get(url_html, timeout=5.0, follow_redirects=True)
-                if response.status_code == 200:
-                    import re
-                    content = response.text
-                    # 查找页面中的personaname（通常在JSON数据中）
-                    match = re.search(r'"personaname":"([^"]+)"', content)
-                    if match:
-                        name = match.group(1).strip()
-                        if name and name != "null" and len(name) > 0:
-                            logger.debug(f"从Steam社区页面获取到玩家 {account_id} 昵称: {name}")
-                            return name
-            except Exception as e:
-                logger.debug(f"从Steam社区页面获取昵称失败: {e}")
-            
-            # 方法2：尝试Steam XML API
-            try:
-                response = await self.client.get(url, timeout=5.0)
-                if response.status_code == 200:
-                    # 解析XML获取昵称
-                    import re
-                    content = response.text
-                    # 查找steamID标签中的内容
-                    match = re.search(r'<steamID><!\[CDATA\[(.*?)\]\]></steamID>', content)
-                    if match:
-                        name = match.group(1).strip()
-                        if name and name != "null" and len(name) > 0:
-                            logger.debug(f"从Steam XML API获取到玩家 {account_id} 昵称: {name}")
-                            return name
-            except Exception as e:
-                logger.debug(f"从Steam XML API获取昵称失败: {e}")
-            
-            # 备用方案：使用Steam Web API（需要API Key，但先尝试不用）
-            # 如果上面的方法失败，可以尝试其他方式
-            return None
-            
+            return await steam.fetch_player_name(
+                functools.partial(self._timed_get, "steam"), account_id
+            )
         except Exception as e:
-            logger.debug(f"从Steam获取玩家 {account_id} 昵称失败: {e}")
+            logger.debug("从Steam获取玩家 %s 昵称失败: %s", account_id, e)
             return None
-
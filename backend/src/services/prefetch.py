@@ -0,0 +1,204 @@
+"""后台预取服务."""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.services.opendota import OpenDotaClient
+from src.services.ratelimit import Priority
+
+logger = logging.getLogger(__name__)
+
+# 热度低于该值的玩家不再跟踪（约为半衰期的3倍没有被查询）
+_MIN_SCORE = 0.1
+
+
+class PrefetchWorker:
+    """后台预取worker.
+
+    记录被查询的玩家并按热度（查询次数随时间指数衰减）排序，定期在空闲额度内
+    为最热的玩家预热最近比赛列表和比赛详情，使之后的分析请求直接命中缓存。
+
+    预取请求使用BACKGROUND优先级，只在令牌桶中剩余令牌超过为交互请求保留的
+    部分时发出，且每轮的请求数不超过按quota_share折算的预算。
+    """
+
+    def __init__(
+        self,
+        client: OpenDotaClient,
+        interval: float = settings.PREFETCH_INTERVAL,
+        concurrency: int = settings.PREFETCH_CONCURRENCY,
+        quota_share: float = settings.PREFETCH_QUOTA_SHARE,
+        max_accounts: int = settings.PREFETCH_MAX_ACCOUNTS,
+        tracked_accounts: int = settings.PREFETCH_TRACKED_ACCOUNTS,
+        half_life: float = settings.PREFETCH_HALF_LIFE,
+        match_limit: int = settings.TEAMMATE_MATCH_LIMIT,
+    ):
+        """初始化worker.
+
+        :param client: OpenDota客户端
+        :param interval: 每轮预取的间隔（秒）
+        :param concurrency: 同时预取的玩家数
+        :param quota_share: 预取最多使用的请求预算比例（0~1）
+        :param max_accounts: 每轮最多预取的玩家数
+        :param tracked_accounts: 最多跟踪的玩家数
+        :param half_life: 查询热度的半衰期（秒）
+        :param match_limit: 每个玩家预取详情的最近比赛数
+        """
+        self.client = client
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.quota_share = min(max(quota_share, 0.0), 1.0)
+        self.max_accounts = max_accounts
+        self.tracked_accounts = tracked_accounts
+        self.half_life = half_life
+        self.match_limit = match_limit
+        # account_id -> (热度, 更新时间)
+        self._scores: Dict[int, Tuple[float, float]] = {}
+        self._budget = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        """计算衰减后的热度."""
+        return score * math.pow(0.5, (now - updated_at) / self.half_life)
+
+    def track(self, account_id: int) -> None:
+        """记录一次玩家查询.
+
+        :param account_id: 被查询的玩家账号ID
+        """
+        now = time.monotonic()
+        score, updated_at = self._scores.get(account_id, (0.0, now))
+        self._scores[account_id] = (self._decayed(score, updated_at, now) + 1, now)
+        if len(self._scores) > self.tracked_accounts * 1.1:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """只保留热度最高的tracked_accounts个玩家."""
+        ranked = self._ranked(now)[: self.tracked_accounts]
+        self._scores = {
+            account_id: self._scores[account_id] for account_id, _ in ranked
+        }
+
+    def _ranked(self, now: float) -> List[Tuple[int, float]]:
+        """按当前热度从高到低排序的玩家."""
+        scored = [
+            (account_id, self._decayed(score, updated_at, now))
+            for account_id, (score, updated_at) in self._scores.items()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def candidates(self) -> List[int]:
+        """本轮需要预取的玩家（热度从高到低），同时清理已经冷却的玩家.
+
+        :return: 玩家账号ID列表
+        """
+        ranked = self._ranked(time.monotonic())
+        for account_id, score in ranked:
+            if score < _MIN_SCORE:
+                del self._scores[account_id]
+        return [
+            account_id for account_id, score in ranked[: self.max_accounts]
+            if score >= _MIN_SCORE
+        ]
+
+    def start(self) -> None:
+        """启动后台预取循环."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                "🔥 后台预取已启动（间隔 %s 秒，并发 %s，额度占比 %.0f%%）",
+                self.interval,
+                self.concurrency,
+                self.quota_share * 100,
+            )
+
+    async def stop(self) -> None:
+        """停止后台预取循环."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """定期执行一轮预取，单轮出错不影响后续轮次."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("⚠️ 后台预取失败: %s", e, exc_info=True)
+
+    async def run_once(self) -> int:
+        """执行一轮预取.
+
+        :return: 本轮发出的上游请求数
+        """
+        account_ids = self.candidates()
+        if not account_ids or self.quota_share <= 0:
+            return 0
+
+        scheduler = self.client.scheduler
+        # 每轮预算：间隔内的请求预算按比例折算
+        self._budget = max(
+            1, int(scheduler.rate * self.interval * self.quota_share)
+        )
+        budget = self._budget
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(account_id: int) -> None:
+            async with semaphore:
+                try:
+                    await self._warm(account_id)
+                except Exception as e:
+                    logger.debug("预取玩家 %s 失败: %s", account_id, e)
+
+        await asyncio.gather(*[warm(account_id) for account_id in account_ids])
+        used = budget - self._budget
+        if used:
+            logger.info("🔥 后台预取 %s 个玩家，发出 %s 个请求", len(account_ids), used)
+        return used
+
+    async def _take_quota(self) -> bool:
+        """等待空闲额度并占用一个预取请求名额.
+
+        令牌数低于为交互请求保留的部分时等待补充；本轮预算用完时返回False。
+        """
+        scheduler = self.client.scheduler
+        # 令牌数不会超过capacity，保留部分至多capacity-1，否则quota_share很小时永远等不到
+        reserve = min(
+            scheduler.capacity * (1 - self.quota_share), scheduler.capacity - 1
+        )
+        while self._budget > 0:
+            deficit = reserve + 1 - scheduler.tokens
+            if deficit <= 0:
+                self._budget -= 1
+                return True
+            await asyncio.sleep(deficit / scheduler.rate)
+        return False
+
+    async def _warm(self, account_id: int) -> None:
+        """预热单个玩家的最近比赛列表和比赛详情.
+
+        :param account_id: 玩家账号ID
+        """
+        if not await self._take_quota():
+            return
+        matches = await self.client.get_player_recent_matches(
+            account_id, priority=Priority.BACKGROUND, refresh=True
+        )
+        for match in matches[: self.match_limit]:
+            match_id = match.get("match_id")
+            if not match_id or await self.client.match_store.get(match_id) is not None:
+                continue
+            if not await self._take_quota():
+                return
+            await self.client.get_match_details(match_id, priority=Priority.BACKGROUND)
@@ -0,0 +1,102 @@
+"""比赛详情精简投影."""
+
+import io
+from typing import Any, Dict, List, Optional
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - 可选依赖
+    ijson = None
+
+from src.core import serialization
+from src.services.analysis import match_player_name
+
+# 精简记录保留的比赛字段
+MATCH_FIELDS = ("match_id", "radiant_win", "start_time", "duration")
+# 精简记录保留的玩家字段（昵称统一保存在personaname中）
+PLAYER_FIELDS = ("account_id", "player_slot", "hero_id", "personaname")
+# 提取昵称时读取的玩家字段
+_PLAYER_NAME_FIELDS = ("personaname", "name", "player_name")
+_PLAYER_SOURCE_FIELDS = frozenset(PLAYER_FIELDS + _PLAYER_NAME_FIELDS)
+_SCALAR_EVENTS = frozenset(("null", "boolean", "integer", "double", "number", "string"))
+# 流式解析的读缓冲区：越小峰值内存越低，但解析越慢
+_PARSE_BUFFER_SIZE = 4096
+
+
+def compact_match_details(data: Dict[str, Any]) -> Dict[str, Any]:
+    """把完整的比赛详情投影为精简记录.
+
+    OpenDota的比赛详情包含每个玩家的出装、时间线、聊天等大量数据，分析只需要
+    比赛结果和每个玩家的账号、阵营、英雄和昵称。
+
+    :param data: /matches/{match_id}接口返回的数据
+    :return: 精简的比赛记录
+    """
+    compact = {field: data[field] for field in MATCH_FIELDS if field in data}
+    if "players" in data:
+        compact["players"] = [
+            _compact_player(player) for player in data.get("players") or []
+        ]
+    return compact
+
+
+def _compact_player(player: Dict[str, Any]) -> Dict[str, Any]:
+    """投影单个玩家."""
+    return {
+        "account_id": player.get("account_id"),
+        "player_slot": player.get("player_slot", 0),
+        "hero_id": player.get("hero_id"),
+        "personaname": match_player_name(player),
+    }
+
+
+def parse_match_details(raw: bytes) -> Dict[str, Any]:
+    """解析比赛详情响应并直接生成精简记录.
+
+    安装了ijson时流式解析，只构造需要的字段，完整文档不会被加载成Python对象，
+    峰值内存约为完整解析的十分之一，但CPU耗时更高（调用方应在线程池中执行）；
+    否则完整解析（使用配置的JSON实现）后再投影。
+
+    :param raw: 响应体
+    :return: 精简的比赛记录
+    :raises ValueError: 当响应不是合法的JSON对象时
+    """
+    if ijson is None:
+        data = serialization.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("比赛详情不是JSON对象")
+        return compact_match_details(data)
+
+    compact: Dict[str, Any] = {}
+    players: List[Dict[str, Any]] = []
+    # 与完整解析一致：文档中有players字段（包括null）时精简记录中才有players
+    seen_players = False
+    player: Optional[Dict[str, Any]] = None
+    try:
+        events = ijson.parse(
+            io.BytesIO(raw), use_float=True, buf_size=_PARSE_BUFFER_SIZE
+        )
+        for prefix, event, value in events:
+            if not prefix and (event == "start_array" or event in _SCALAR_EVENTS):
+                raise ValueError("比赛详情不是JSON对象")
+            if player is not None:
+                if prefix == "players.item" and event == "end_map":
+                    players.append(_compact_player(player))
+                    player = None
+                elif event in _SCALAR_EVENTS and prefix.startswith("players.item."):
+                    field = prefix[len("players.item.") :]
+                    if field in _PLAYER_SOURCE_FIELDS:
+                        player[field] = value
+            elif prefix == "players" and (
+                event == "start_array" or event in _SCALAR_EVENTS
+            ):
+                seen_players = True
+            elif prefix == "players.item" and event == "start_map":
+                player = {}
+            elif event in _SCALAR_EVENTS and prefix in MATCH_FIELDS:
+                compact[prefix] = value
+    except ijson.JSONError as e:
+        raise ValueError(f"比赛详情不是合法的JSON: {e}") from e
+    if seen_players:
+        compact["players"] = players
+    return compact
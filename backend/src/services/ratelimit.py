@@ -0,0 +1,197 @@
+"""上游API限流调度器."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import AsyncIterator, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 429响应没有Retry-After时的默认暂停时间（秒）
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class Priority(IntEnum):
+    """请求优先级，数值越小越先调度."""
+
+    INTERACTIVE = 0  # 用户正在等待结果的分析请求
+    BACKGROUND = 1  # 昵称补全等可以延后的请求
+
+
+class UpstreamScheduler:
+    """进程级令牌桶调度器.
+
+    所有上游请求共享同一个每分钟请求预算和并发上限；等待中的请求按
+    优先级、再按到达顺序获得令牌。收到429或剩余额度为0时整体暂停。
+    """
+
+    def __init__(
+        self, requests_per_minute: int, burst: int, max_concurrency: int
+    ):
+        """初始化调度器.
+
+        :param requests_per_minute: 每分钟请求预算
+        :param burst: 令牌桶容量（允许的突发请求数）
+        :param max_concurrency: 同时进行的请求上限
+        """
+        self.rate = max(1, requests_per_minute) / 60.0
+        self.capacity = float(max(1, burst))
+        self.max_concurrency = max(1, max_concurrency)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def tokens(self) -> float:
+        """当前可用令牌数."""
+        self._refill(time.monotonic())
+        return self._tokens
+
+    @property
+    def in_flight(self) -> int:
+        """正在进行的请求数."""
+        return self._in_flight
+
+    def _refill(self, now: float) -> None:
+        """按流逝时间补充令牌."""
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def _schedule(self, delay: float) -> None:
+        """在delay秒后重新调度等待队列."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """把令牌依次分配给队首的等待者."""
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                # 等待者已被取消
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                return  # release()时会再次调度
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                return
+            if self._tokens < 1:
+                self._schedule((1 - self._tokens) / self.rate)
+                return
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """等待获得一个请求名额.
+
+        :param priority: 请求优先级
+        """
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已分配名额但调用方在恢复前被取消，需要归还并发名额
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """归还并发名额."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: Priority = Priority.INTERACTIVE
+    ) -> AsyncIterator[None]:
+        """在请求期间占用一个名额.
+
+        :param priority: 请求优先级
+        """
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def pause(self, seconds: float) -> None:
+        """暂停发放令牌.
+
+        :param seconds: 暂停时长（秒）
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """根据上游响应的限流信息调整调度.
+
+        :param status_code: HTTP状态码
+        :param headers: 响应头
+        """
+        remaining = _parse_int(headers.get("x-rate-limit-remaining-minute"))
+        if remaining is not None:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, float(remaining))
+            if remaining <= 0:
+                # OpenDota按自然分钟计数，等到下一分钟再发请求
+                self.pause(60 - time.time() % 60)
+
+        if status_code == 429:
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            delay = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+            self._tokens = min(self._tokens, 0.0)
+            self.pause(delay)
+            logger.warning("⏳ 上游返回429，暂停 %.1f 秒", delay)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    """解析整数响应头."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期）.
+
+    :param value: 响应头的值
+    :return: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,457 @@
+"""跨进程共享状态.
+
+多个uvicorn worker（或多台机器）通过共享后端复用缓存命中并协调上游请求
+预算：
+
+- ``local``：不共享，每个进程各自缓存和限流（单worker部署）
+- ``sqlite``：同一台机器上的多个worker共享一个WAL模式的SQLite文件
+- ``redis``：多台机器共享一个Redis兼容服务（需要安装redis）
+
+每个进程仍保留内存中的一级缓存，共享后端作为二级缓存，只在一级缓存未命中
+时查询。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple
+
+from src.core import metrics, serialization
+from src.core.config import settings
+from src.services.cache import K, V, TTLCache
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # pragma: no cover - 可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# (值, 剩余有效期（秒）)
+Entry = Tuple[bytes, float]
+
+
+class SharedStateBackend(ABC):
+    """共享状态后端接口."""
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, Entry]:
+        """批量读取未过期的条目.
+
+        :param keys: 键列表
+        :return: 命中的键到(值, 剩余有效期)的映射
+        """
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        """批量写入条目.
+
+        :param items: 键到值的映射
+        :param ttl: 有效期（秒）
+        """
+
+    @abstractmethod
+    async def take_token(self, name: str, rate: float, capacity: float) -> float:
+        """从共享令牌桶中取一个令牌.
+
+        :param name: 令牌桶名称
+        :param rate: 每秒补充的令牌数
+        :param capacity: 令牌桶容量
+        :return: 0表示已取得令牌，否则为需要等待的秒数
+        """
+
+    async def close(self) -> None:
+        """关闭连接."""
+
+
+class SQLiteStateBackend(SharedStateBackend):
+    """同一台机器上多个进程共享的SQLite后端（WAL模式）."""
+
+    # 每写入多少次清理一次过期条目
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str = settings.SHARED_STATE_PATH):
+        """初始化后端.
+
+        :param path: SQLite文件路径
+        """
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开（必要时创建）SQLite数据库."""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # isolation_level=None：自行用BEGIN IMMEDIATE控制令牌桶的事务
+            db = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS shared_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _get_many(self, keys: List[str]) -> Dict[str, Entry]:
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._db_lock:
+            rows = self._connect().execute(
+                f"SELECT key, value, expires_at FROM shared_cache"
+                f" WHERE key IN ({placeholders}) AND expires_at > ?",
+                (*keys, now),
+            ).fetchall()
+        return {key: (value, expires_at - now) for key, value, expires_at in rows}
+
+    def _set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._db_lock:
+            db = self._connect()
+            # BEGIN IMMEDIATE：锁竞争在事务开始时暴露，失败时回滚，避免连接卡在半截事务里
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT OR REPLACE INTO shared_cache (key, value, expires_at)"
+                    " VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in items.items()],
+                )
+                self._writes += len(items)
+                if self._writes >= self.PURGE_EVERY:
+                    self._writes = 0
+                    db.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def _take_token(self, name: str, rate: float, capacity: float) -> float:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            # BEGIN IMMEDIATE：读改写期间持有写锁，多个进程不会重复发放令牌
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE name = ?",
+                    (name,),
+                ).fetchone()
+                if row is None:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                db.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at)"
+                    " VALUES (?, ?, ?)",
+                    (name, tokens, now),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Entry]:
+        if not keys:
+            return {}
+        return await asyncio.to_thread(self._get_many, keys)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        if items:
+            await asyncio.to_thread(self._set_many, items, ttl)
+
+    async def take_token(self, name: str, rate: float, capacity: float) -> float:
+        return await asyncio.to_thread(self._take_token, name, rate, capacity)
+
+    async def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# 令牌桶脚本：用Redis服务器时间计算，多台机器的时钟偏差不影响结果
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisStateBackend(SharedStateBackend):
+    """多台机器共享的Redis兼容后端."""
+
+    def __init__(
+        self,
+        url: str = settings.SHARED_STATE_REDIS_URL,
+        prefix: str = settings.SHARED_STATE_PREFIX,
+    ):
+        """初始化后端.
+
+        :param url: Redis连接地址
+        :param prefix: 键前缀（多个应用共用一个Redis时区分）
+        """
+        if redis is None:
+            raise RuntimeError("使用redis共享后端需要安装redis（poetry install -E redis）")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._token_bucket = self._redis.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Entry]:
+        if not keys:
+            return {}
+        pipeline = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.get(self._key(key))
+            pipeline.pttl(self._key(key))
+        replies = await pipeline.execute()
+        entries = {}
+        for index, key in enumerate(keys):
+            value, ttl_ms = replies[2 * index], replies[2 * index + 1]
+            if value is not None and ttl_ms > 0:
+                entries[key] = (value, ttl_ms / 1000)
+        return entries
+
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        if not items or ttl <= 0:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(self._key(key), value, px=int(ttl * 1000))
+        await pipeline.execute()
+
+    async def take_token(self, name: str, rate: float, capacity: float) -> float:
+        wait = await self._token_bucket(
+            keys=[self._key(f"bucket:{name}")], args=[rate, capacity]
+        )
+        return float(wait)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_state_backend(
+    kind: str = settings.SHARED_STATE_BACKEND,
+) -> Optional[SharedStateBackend]:
+    """按配置创建共享状态后端.
+
+    :param kind: local、sqlite 或 redis
+    :return: 共享后端，local时返回None（不共享）
+    :raises ValueError: 当后端类型未知时
+    """
+    kind = kind.lower()
+    if kind == "local":
+        return None
+    if kind == "sqlite":
+        return SQLiteStateBackend()
+    if kind == "redis":
+        return RedisStateBackend()
+    raise ValueError(f"未知的共享状态后端: {kind}")
+
+
+def encode_json(value: object) -> bytes:
+    """默认的缓存值序列化."""
+    return serialization.dumps(value)
+
+
+class SharedCache(Generic[K, V]):
+    """两级缓存：进程内TTLCache + 可选的共享后端.
+
+    没有共享后端时等同于TTLCache。共享后端的读写出错时只记录日志，按未命中
+    处理，不影响请求。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_items: int = 1024,
+        encode: Callable[[V], bytes] = encode_json,
+        decode: Callable[[bytes], V] = serialization.loads,
+        backend: Optional[SharedStateBackend] = None,
+    ):
+        """初始化缓存.
+
+        :param name: 缓存名称（共享后端中的键前缀，也用于指标）
+        :param ttl: 默认过期时间（秒）
+        :param max_items: 进程内最多保留的条目数
+        :param encode: 值序列化函数
+        :param decode: 值反序列化函数
+        :param backend: 共享后端，为None时只使用进程内缓存
+        """
+        self.name = name
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self.backend = backend
+        self.local: TTLCache[K, V] = TTLCache(ttl=ttl, max_items=max_items)
+
+    def bind(self, backend: Optional[SharedStateBackend]) -> None:
+        """设置共享后端（模块级缓存在应用启动时绑定）."""
+        self.backend = backend
+
+    def _key(self, key: K) -> str:
+        return f"{self.name}:{json.dumps(key, separators=(',', ':'))}"
+
+    async def get(self, key: K) -> Optional[V]:
+        """读取缓存值.
+
+        :param key: 缓存键
+        :return: 缓存值，未命中时返回None
+        """
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """批量读取缓存值，进程内未命中的键一次性查询共享后端.
+
+        :param keys: 缓存键
+        :return: 命中的键到值的映射
+        """
+        backend = self.backend
+        found: Dict[K, V] = {}
+        missing: Dict[str, K] = {}
+        for key in keys:
+            value = self.local.get(key)
+            if value is not None:
+                found[key] = value
+            elif backend is not None:
+                missing[self._key(key)] = key
+        if backend is None or not missing:
+            return found
+
+        try:
+            entries = await backend.get_many(list(missing))
+        except Exception as e:
+            logger.warning("读取共享缓存 %s 失败: %s", self.name, e)
+            return found
+        metrics.record_cache(f"{self.name}_shared", True, len(entries))
+        metrics.record_cache(f"{self.name}_shared", False, len(missing) - len(entries))
+        for shared_key, (raw, ttl) in entries.items():
+            key = missing[shared_key]
+            try:
+                value = self.decode(raw)
+            except ValueError as e:
+                logger.warning("解析共享缓存 %s 失败: %s", shared_key, e)
+                continue
+            self.local.set(key, value, ttl=ttl)
+            found[key] = value
+        return found
+
+    async def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """写入缓存.
+
+        :param key: 缓存键
+        :param value: 缓存值
+        :param ttl: 本条目的过期时间（秒），默认使用缓存的ttl
+        """
+        await self.set_many({key: value}, ttl)
+
+    async def set_many(self, items: Dict[K, V], ttl: Optional[float] = None) -> None:
+        """批量写入缓存.
+
+        :param items: 键到值的映射
+        :param ttl: 过期时间（秒），默认使用缓存的ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        for key, value in items.items():
+            self.local.set(key, value, ttl=ttl)
+        if self.backend is None or not items:
+            return
+        try:
+            await self.backend.set_many(
+                {self._key(key): self.encode(value) for key, value in items.items()},
+                ttl,
+            )
+        except Exception as e:
+            logger.warning("写入共享缓存 %s 失败: %s", self.name, e)
+
+    def clear(self) -> None:
+        """清空进程内缓存."""
+        self.local.clear()
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+
+class SharedRateLimit:
+    """多个进程共享的上游请求预算.
+
+    每个进程的UpstreamScheduler仍然负责优先级排队和并发上限，请求取得调度
+    名额后再从共享令牌桶中取一个令牌（按优先级依次取得），所有进程合计不超过
+    配置的预算。
+    """
+
+    def __init__(
+        self,
+        backend: SharedStateBackend,
+        name: str,
+        requests_per_minute: int,
+        burst: int,
+    ):
+        """初始化共享预算.
+
+        :param backend: 共享后端
+        :param name: 令牌桶名称
+        :param requests_per_minute: 所有进程合计的每分钟请求预算
+        :param burst: 令牌桶容量
+        """
+        self.backend = backend
+        self.name = name
+        self.rate = max(1, requests_per_minute) / 60.0
+        self.capacity = float(max(1, burst))
+
+    async def acquire(self) -> None:
+        """等待取得一个共享令牌；共享后端不可用时直接放行（退化为进程内限流）."""
+        while True:
+            try:
+                wait = await self.backend.take_token(self.name, self.rate, self.capacity)
+            except Exception as e:
+                logger.warning("共享限流预算不可用，使用进程内限流: %s", e)
+                return
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
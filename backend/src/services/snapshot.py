@@ -0,0 +1,192 @@
+"""进程内缓存的磁盘快照."""
+
+import asyncio
+import gzip
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from src.core import serialization
+from src.core.config import settings
+from src.services.shared import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# 文件头（格式变化时修改版本号，旧快照会被忽略）
+SNAPSHOT_MAGIC = b"DOTACACHE\x01"
+# 快照损坏时读取可能抛出的异常（压缩数据截断或损坏时是zlib.error/struct.error）
+_READ_ERRORS = (OSError, EOFError, ValueError, TypeError, zlib.error, struct.error)
+# 每条记录的长度前缀：元数据长度、值长度
+_RECORD_HEADER = struct.Struct("<II")
+
+# (缓存名称, 键, 编码后的值, 过期时间戳)
+SnapshotEntry = Tuple[str, Any, bytes, float]
+
+
+def _plain(key: Any) -> Any:
+    """把缓存键中的元组（包括NamedTuple）转换为列表，以便写成JSON."""
+    if isinstance(key, tuple):
+        return [_plain(item) for item in key]
+    return key
+
+
+def _hashable(key: Any) -> Any:
+    """把JSON解析出的列表还原为元组（与原来的元组或NamedTuple键相等）."""
+    if isinstance(key, list):
+        return tuple(_hashable(item) for item in key)
+    return key
+
+
+class CacheSnapshot:
+    """把进程内缓存写入磁盘快照，重启后载回.
+
+    覆盖分析结果、昵称和最近比赛列表等只保存在内存中的缓存（比赛详情本身
+    已经持久化在MatchStore中）。快照是gzip压缩的记录流，每条记录是
+    (缓存名称, 键, 过期时间戳) 的JSON元数据加上按缓存的encode序列化的值；
+    读取时逐条流式解码，不需要把整个文件读进内存。过期时间保存为墙上时钟
+    时间戳，停机期间经过的时间会从剩余有效期中扣除，已过期的条目不会恢复。
+    """
+
+    def __init__(
+        self,
+        caches: Sequence[SharedCache],
+        path: str = settings.CACHE_SNAPSHOT_PATH,
+        interval: float = settings.CACHE_SNAPSHOT_INTERVAL,
+    ):
+        """初始化快照.
+
+        :param caches: 需要保存的缓存（按缓存名称对应快照中的记录）
+        :param path: 快照文件路径，为空时不读写快照
+        :param interval: 定期保存的间隔（秒），为0时只在关闭时保存
+        """
+        self.caches: Dict[str, SharedCache] = {cache.name: cache for cache in caches}
+        self.path = path
+        self.enabled = bool(path)
+        self.interval = interval
+        self._write_lock = threading.Lock()
+
+    def _entries(self) -> List[Tuple[SharedCache, List[Tuple[Any, Any, float]]]]:
+        """取出所有缓存当前未过期的条目（在事件循环中执行，只复制引用）."""
+        return [(cache, cache.local.items()) for cache in self.caches.values()]
+
+    def _write(
+        self, snapshot: List[Tuple[SharedCache, List[Tuple[Any, Any, float]]]]
+    ) -> Tuple[int, int]:
+        """编码并原子写入快照（在线程池中执行）.
+
+        :return: (写入的条目数, 文件字节数)
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 多个worker可能同时保存，各自写临时文件再替换
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        now = time.time()
+        count = 0
+        with self._write_lock:
+            with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+                f.write(SNAPSHOT_MAGIC)
+                for cache, items in snapshot:
+                    for key, value, ttl in items:
+                        meta = serialization.dumps(
+                            [cache.name, _plain(key), now + ttl]
+                        )
+                        raw = cache.encode(value)
+                        f.write(_RECORD_HEADER.pack(len(meta), len(raw)))
+                        f.write(meta)
+                        f.write(raw)
+                        count += 1
+            os.replace(tmp_path, self.path)
+        return count, os.path.getsize(self.path)
+
+    @staticmethod
+    def _records(f: gzip.GzipFile) -> Iterator[SnapshotEntry]:
+        """逐条读取快照记录."""
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError("快照格式不匹配")
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) != _RECORD_HEADER.size:
+                raise ValueError("快照记录不完整")
+            meta_size, raw_size = _RECORD_HEADER.unpack(header)
+            meta = f.read(meta_size)
+            raw = f.read(raw_size)
+            if len(meta) != meta_size or len(raw) != raw_size:
+                raise ValueError("快照记录不完整")
+            name, key, expires_at = serialization.loads(meta)
+            yield name, _hashable(key), raw, expires_at
+
+    def _read(self) -> List[Tuple[SharedCache, Any, Any, float]]:
+        """读取并解码快照中仍有效的条目（在线程池中执行）.
+
+        :return: (缓存, 键, 值, 剩余有效期秒数)列表，按写入顺序
+        """
+        now = time.time()
+        entries = []
+        with gzip.GzipFile(self.path, "rb") as f:
+            for name, key, raw, expires_at in self._records(f):
+                cache = self.caches.get(name)
+                if cache is None or expires_at <= now:
+                    continue
+                entries.append((cache, key, cache.decode(raw), expires_at - now))
+        return entries
+
+    async def load(self) -> int:
+        """把快照中未过期的条目载回进程内缓存.
+
+        :return: 恢复的条目数
+        """
+        if not self.enabled:
+            return 0
+        started = time.perf_counter()
+        try:
+            entries = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return 0
+        except _READ_ERRORS as e:
+            logger.warning("缓存快照 %s 无法读取: %s", self.path, e)
+            return 0
+        for cache, key, value, ttl in entries:
+            cache.local.set(key, value, ttl=ttl)
+        if entries:
+            logger.info(
+                "♻️ 从快照恢复 %s 条缓存（耗时 %.3f秒）",
+                len(entries),
+                time.perf_counter() - started,
+            )
+        return len(entries)
+
+    async def save(self) -> int:
+        """把进程内缓存写入快照.
+
+        :return: 写入的条目数
+        """
+        if not self.enabled:
+            return 0
+        started = time.perf_counter()
+        try:
+            count, size = await asyncio.to_thread(self._write, self._entries())
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("写入缓存快照 %s 失败: %s", self.path, e)
+            return 0
+        logger.info(
+            "💾 缓存快照已保存 %s 条（%s 字节，耗时 %.3f秒）",
+            count,
+            size,
+            time.perf_counter() - started,
+        )
+        return count
+
+    async def run(self) -> None:
+        """定期保存快照，直到任务被取消."""
+        if not self.enabled or self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
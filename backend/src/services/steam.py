@@ -0,0 +1,83 @@
+"""Steam社区昵称查询.
+
+OpenDota查不到昵称时的备用方案。只在第一次用到时由OpenDotaClient导入，
+本模块、正则表达式的编译和Steam连接池都不计入启动时间。
+"""
+
+import logging
+import re
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from src.core.config import settings
+from src.services.transport import create_http_client
+
+logger = logging.getLogger(__name__)
+
+# 32位账号ID转换为64位Steam ID时加上的偏移量
+STEAM_ID_64_OFFSET = 76561197960265728
+
+# 社区页面中的personaname（通常在页面内嵌的JSON数据中）
+_PAGE_NAME_PATTERN = re.compile(r'"personaname":"([^"]+)"')
+# XML资料中的steamID标签
+_XML_NAME_PATTERN = re.compile(r"<steamID><!\[CDATA\[(.*?)\]\]></steamID>")
+
+# 发出Steam请求的函数：get(url, **kwargs) -> 响应
+SteamGet = Callable[..., Awaitable[httpx.Response]]
+
+
+def create_steam_client() -> httpx.AsyncClient:
+    """创建Steam社区的连接池."""
+    return create_http_client(
+        "Steam",
+        http2=settings.STEAM_HTTP2,
+        max_connections=settings.STEAM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.STEAM_MAX_CONNECTIONS,
+        keepalive_expiry=settings.STEAM_KEEPALIVE_EXPIRY,
+        connect_timeout=settings.STEAM_CONNECT_TIMEOUT,
+        read_timeout=settings.STEAM_READ_TIMEOUT,
+        compression=settings.UPSTREAM_COMPRESSION,
+    )
+
+
+def _extract(pattern: "re.Pattern[str]", content: str) -> Optional[str]:
+    """用正则提取昵称，无效时返回None."""
+    match = pattern.search(content)
+    if not match:
+        return None
+    name = match.group(1).strip()
+    if not name or name == "null":
+        return None
+    return name
+
+
+async def fetch_player_name(get: SteamGet, account_id: int) -> Optional[str]:
+    """从Steam社区获取玩家昵称（不需要API Key）.
+
+    先尝试社区资料页面，再尝试XML资料。
+
+    :param get: 发出Steam请求的函数（由OpenDotaClient提供，记录指标）
+    :param account_id: Steam账号ID（32位）
+    :return: 玩家昵称，如果获取失败返回None
+    """
+    profile_url = (
+        f"{settings.STEAM_COMMUNITY_BASE_URL}/profiles/"
+        f"{account_id + STEAM_ID_64_OFFSET}"
+    )
+    sources: Any = (
+        ("社区页面", profile_url, {"follow_redirects": True}, _PAGE_NAME_PATTERN),
+        ("XML资料", f"{profile_url}/?xml=1", {}, _XML_NAME_PATTERN),
+    )
+    for source, url, kwargs, pattern in sources:
+        try:
+            response = await get(url, **kwargs)
+            if response.status_code != 200:
+                continue
+            name = _extract(pattern, response.text)
+            if name:
+                logger.debug("从Steam%s获取到玩家 %s 昵称: %s", source, account_id, name)
+                return name
+        except Exception as e:
+            logger.debug("从Steam%s获取昵称失败: %s", source, e)
+    return None
@@ -0,0 +1,242 @@
+"""队友倒排索引."""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OpenDota中隐藏了账号的玩家
+ANONYMOUS_ACCOUNT_ID = 4294967295
+
+# 按比赛ID顺序读取一批已缓存比赛详情的函数（见MatchStore.scan）
+MatchScanner = Callable[[int, int], List[Tuple[int, Dict[str, Any]]]]
+
+
+def _record(games: int, wins: int) -> Dict[str, Any]:
+    """组装战绩."""
+    return {
+        "games": games,
+        "wins": wins,
+        "losses": games - wins,
+        "win_rate": round(wins / games * 100, 2) if games else 0.0,
+    }
+
+
+class TeammateIndex:
+    """account_id -> (比赛ID, 阵营, 胜负) 的持久化倒排索引.
+
+    由所有缓存过的比赛详情构建，新比赛详情到达时增量写入。"最佳战友"、
+    "最常一起排的人"和两人之间的交手记录都是对索引的查询，不需要重新获取或
+    逐场扫描比赛详情。
+    """
+
+    def __init__(self, path: Optional[str] = settings.TEAMMATE_INDEX_PATH):
+        """初始化索引.
+
+        :param path: SQLite文件路径，为空时索引只保存在内存中
+        """
+        self.path = path or ":memory:"
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开（必要时创建）SQLite数据库."""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS match_players ("
+                " account_id INTEGER NOT NULL,"
+                " match_id INTEGER NOT NULL,"
+                " is_radiant INTEGER NOT NULL,"
+                " win INTEGER NOT NULL,"
+                " PRIMARY KEY (account_id, match_id)) WITHOUT ROWID"
+            )
+            # 按比赛查同场玩家（覆盖索引，联表时不回表）
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_match_players_match"
+                " ON match_players (match_id, is_radiant, account_id, win)"
+            )
+            # 已索引的比赛（包括没有公开账号玩家的比赛），回填时跳过
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS indexed_matches ("
+                " match_id INTEGER PRIMARY KEY)"
+            )
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _rows(match_id: int, match: Dict[str, Any]) -> List[Tuple[int, int, int, int]]:
+        """把一场比赛详情转换为索引行."""
+        radiant_win = bool(match.get("radiant_win", False))
+        rows = []
+        for player in match.get("players") or []:
+            account_id = player.get("account_id")
+            if not account_id or account_id == ANONYMOUS_ACCOUNT_ID:
+                continue
+            is_radiant = player.get("player_slot", 0) < 128
+            rows.append(
+                (
+                    int(account_id),
+                    match_id,
+                    int(is_radiant),
+                    int(is_radiant == radiant_win),
+                )
+            )
+        return rows
+
+    def _add(self, matches: Iterable[Dict[str, Any]]) -> int:
+        """写入比赛（已索引的比赛跳过），返回新索引的比赛数."""
+        added = 0
+        with self._db_lock:
+            db = self._connect()
+            for match in matches:
+                match_id = match.get("match_id")
+                if not match_id or "radiant_win" not in match:
+                    continue
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO indexed_matches (match_id) VALUES (?)",
+                    (match_id,),
+                )
+                if not cursor.rowcount:
+                    continue
+                db.executemany(
+                    "INSERT OR IGNORE INTO match_players"
+                    " (account_id, match_id, is_radiant, win) VALUES (?, ?, ?, ?)",
+                    self._rows(match_id, match),
+                )
+                added += 1
+            db.commit()
+        return added
+
+    def _backfill(self, scan: MatchScanner, batch_size: int) -> int:
+        """从比赛缓存回填索引（在线程池中执行）."""
+        total = 0
+        after = 0
+        while True:
+            batch = scan(after, batch_size)
+            if not batch:
+                return total
+            total += self._add(match for _, match in batch)
+            after = batch[-1][0]
+
+    def _teammates(
+        self, account_id: int, min_games: int
+    ) -> List[Tuple[int, int, int, int]]:
+        with self._db_lock:
+            return (
+                self._connect()
+                .execute(
+                    "SELECT o.account_id, COUNT(*), SUM(o.win), MAX(o.match_id)"
+                    " FROM match_players p"
+                    " JOIN match_players o"
+                    "  ON o.match_id = p.match_id AND o.is_radiant = p.is_radiant"
+                    " WHERE p.account_id = ? AND o.account_id != p.account_id"
+                    " GROUP BY o.account_id HAVING COUNT(*) >= ?",
+                    (account_id, min_games),
+                )
+                .fetchall()
+            )
+
+    def _head_to_head(self, account_id: int, other_id: int) -> Dict[str, Any]:
+        with self._db_lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT p.is_radiant = o.is_radiant, COUNT(*), SUM(p.win)"
+                    " FROM match_players p"
+                    " JOIN match_players o ON o.match_id = p.match_id"
+                    " WHERE p.account_id = ? AND o.account_id = ?"
+                    " GROUP BY p.is_radiant = o.is_radiant",
+                    (account_id, other_id),
+                )
+                .fetchall()
+            )
+        counts = {bool(together): (games, wins) for together, games, wins in rows}
+        return {
+            "together": _record(*counts.get(True, (0, 0))),
+            "against": _record(*counts.get(False, (0, 0))),
+        }
+
+    def _match_count(self, account_id: int) -> int:
+        with self._db_lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT COUNT(*) FROM match_players WHERE account_id = ?",
+                    (account_id,),
+                )
+                .fetchone()
+            )
+        return int(row[0])
+
+    async def add_matches(self, matches: List[Dict[str, Any]]) -> None:
+        """增量写入新获取的比赛详情.
+
+        :param matches: 比赛详情（完整或精简记录）
+        """
+        try:
+            await asyncio.to_thread(self._add, matches)
+        except sqlite3.Error as e:
+            logger.warning("写入队友索引失败: %s", e)
+
+    async def backfill(self, scan: MatchScanner, batch_size: int = 500) -> int:
+        """把比赛缓存中尚未索引的比赛写入索引.
+
+        :param scan: 按比赛ID顺序分批读取缓存比赛的函数
+        :param batch_size: 每批读取的比赛数
+        :return: 新索引的比赛数
+        """
+        added = await asyncio.to_thread(self._backfill, scan, batch_size)
+        if added:
+            logger.info("📇 队友索引回填 %s 场比赛", added)
+        return added
+
+    async def teammates(
+        self, account_id: int, min_games: int = 2
+    ) -> List[Dict[str, Any]]:
+        """玩家在所有已索引比赛中的同队队友战绩.
+
+        :param account_id: 玩家账号ID
+        :param min_games: 最少同队场次
+        :return: 队友战绩列表（按同队场次降序，同场次时最近同队的在前）
+        """
+        rows = await asyncio.to_thread(self._teammates, account_id, min_games)
+        rows.sort(key=lambda row: (-row[1], -row[3]))
+        return [
+            {"account_id": teammate_id, **_record(games, wins)}
+            for teammate_id, games, wins, _ in rows
+        ]
+
+    async def head_to_head(self, account_id: int, other_id: int) -> Dict[str, Any]:
+        """两名玩家之间的战绩（从account_id的角度）.
+
+        :param account_id: 玩家账号ID
+        :param other_id: 另一名玩家账号ID
+        :return: {"together": 同队战绩, "against": 对阵战绩}
+        """
+        return await asyncio.to_thread(self._head_to_head, account_id, other_id)
+
+    async def match_count(self, account_id: int) -> int:
+        """玩家已索引的比赛数.
+
+        :param account_id: 玩家账号ID
+        """
+        return await asyncio.to_thread(self._match_count, account_id)
+
+    def close(self) -> None:
+        """关闭数据库."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
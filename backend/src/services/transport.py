@@ -0,0 +1,53 @@
+"""上游HTTP连接池."""
+
+import logging
+
+import httpx
+
+try:
+    import h2
+except ImportError:  # pragma: no cover - 可选依赖
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+def create_http_client(
+    name: str,
+    http2: bool,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    connect_timeout: float,
+    read_timeout: float,
+    compression: bool = True,
+) -> httpx.AsyncClient:
+    """为一个上游主机创建独立的连接池.
+
+    HTTP/2需要安装h2，未安装时回退到HTTP/1.1 keep-alive。HTTP/2下并发请求
+    复用同一个连接，max_connections主要约束HTTP/1.1回退时的连接数。
+
+    :param name: 上游名称（用于日志）
+    :param http2: 是否启用HTTP/2
+    :param max_connections: 连接池最大连接数
+    :param max_keepalive_connections: 保持空闲的连接数
+    :param keepalive_expiry: 空闲连接保留时间（秒）
+    :param connect_timeout: 建立连接超时（秒）
+    :param read_timeout: 默认读取超时（秒）
+    :param compression: 是否接受压缩的响应，关闭时要求上游返回原始内容
+    :return: HTTP客户端
+    """
+    if http2 and h2 is None:
+        logger.info("未安装h2，%s 连接使用HTTP/1.1", name)
+        http2 = False
+    headers = {} if compression else {"Accept-Encoding": "identity"}
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        headers=headers,
+    )
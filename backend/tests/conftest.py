@@ -0,0 +1,43 @@
+"""测试共用的夹具."""
+
+import asyncio
+from typing import Any, Callable, Coroutine, Iterator, Union
+
+import httpx
+import pytest
+
+from src.services.opendota import MatchStore, OpenDotaClient
+from src.services.ratelimit import UpstreamScheduler
+
+# MockTransport的处理函数（同步或异步）
+Handler = Union[
+    Callable[[httpx.Request], httpx.Response],
+    Callable[[httpx.Request], Coroutine[Any, Any, httpx.Response]],
+]
+ClientFactory = Callable[[Handler], OpenDotaClient]
+
+BASE_URL = "https://opendota.test/api"
+
+
+@pytest.fixture
+def make_client() -> Iterator[ClientFactory]:
+    """创建请求发往MockTransport的OpenDotaClient（只用内存比赛缓存）."""
+    clients = []
+
+    def factory(handler: Handler) -> OpenDotaClient:
+        client = OpenDotaClient(
+            base_url=BASE_URL,
+            match_store=MatchStore(path="", memory_items=16),
+            scheduler=UpstreamScheduler(
+                requests_per_minute=6000, burst=100, max_concurrency=10
+            ),
+        )
+        transport = httpx.MockTransport(handler)
+        client.client = httpx.AsyncClient(transport=transport)
+        client._steam_client = httpx.AsyncClient(transport=transport)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        asyncio.run(client.close())
@@ -0,0 +1,127 @@
+"""增量聚合与完整重算的一致性."""
+
+import asyncio
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.services.aggregates import PlayerAggregate, PlayerAggregateStore
+from src.services.analysis import AnalysisService, MatchAggregator
+
+ACCOUNT_ID = 1001
+TEAMMATE_IDS = [2001, 2002, 2003, 2004, 2005, 2006]
+
+
+def _matches(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """生成按时间倒序排列的比赛列表（比赛ID越大越新）."""
+    rng = random.Random(seed)
+    matches = []
+    for match_id in range(5000 + count, 5000, -1):
+        matches.append(
+            {
+                "match_id": match_id,
+                "player_slot": rng.choice([0, 1, 128, 130]),
+                "radiant_win": rng.random() < 0.5,
+                "kills": rng.randint(0, 20),
+                "deaths": rng.randint(0, 15),
+                "assists": rng.randint(0, 25),
+                "last_hits": rng.randint(0, 400),
+                "hero_damage": rng.randint(0, 40000),
+                "hero_id": rng.choice([1, 2, 5, 8, 14]),
+                "duration": rng.randint(1200, 3600),
+                "gold_per_min": rng.randint(250, 800),
+            }
+        )
+    return matches
+
+
+def _details(match: Dict[str, Any]) -> Dict[str, Any]:
+    """比赛详情：玩家和两名队友在同一阵营."""
+    slot = match["player_slot"]
+    teammates = TEAMMATE_IDS[match["match_id"] % 3 :: 3][:2]
+    players = [{"account_id": ACCOUNT_ID, "player_slot": slot}]
+    players += [{"account_id": t, "player_slot": slot} for t in teammates]
+    return {
+        "match_id": match["match_id"],
+        "radiant_win": match["radiant_win"],
+        "players": players,
+    }
+
+
+def _summary(aggregator: MatchAggregator) -> Dict[str, Any]:
+    return {
+        "count": aggregator.count,
+        "wins": aggregator.wins,
+        "comment": aggregator.generate_comment(),
+        "statistics": aggregator.calculate_statistics(),
+        "heroes": aggregator.calculate_hero_stats(),
+        "curve": aggregator.calculate_win_rate_curve(),
+        "match_ids": aggregator.match_ids(1000),
+    }
+
+
+def test_incremental_fold_matches_full_recompute() -> None:
+    limit = 30
+    matches = _matches(100)
+    # 最早的一个窗口作为初始状态，再按时间顺序分批折叠更新的比赛
+    aggregate = PlayerAggregate(ACCOUNT_ID, limit)
+    aggregate.matches.add(matches[-limit:])
+    newer = matches[:-limit]
+    for end in range(len(newer), 0, -7):
+        aggregate.fold_matches(newer[max(0, end - 7) : end])
+
+    full = MatchAggregator()
+    full.add(matches[:limit])
+    assert _summary(aggregate.matches) == _summary(full)
+    assert aggregate.last_match_id == matches[0]["match_id"]
+    # 与逐场计算的结果也一致
+    assert full.calculate_statistics() == AnalysisService.calculate_statistics(
+        matches[:limit]
+    )
+
+
+def test_replaying_matches_does_not_double_count() -> None:
+    matches = _matches(40)
+    aggregate = PlayerAggregate(ACCOUNT_ID, 50)
+    aggregate.matches.add(matches[20:])
+    aggregate.fold_matches(matches[:20])
+    expected = aggregate.to_state()
+
+    aggregate.fold_matches(matches[:20])
+    aggregate.fold_matches(matches[5:10])
+    assert aggregate.to_state() == expected
+    assert aggregate.matches.count == 40
+
+
+def test_replaying_details_does_not_double_count() -> None:
+    matches = _matches(20)
+    aggregate = PlayerAggregate(ACCOUNT_ID, 20)
+    aggregate.matches.add(matches)
+    details = [_details(m) for m in matches]
+
+    aggregate.add_details(details)
+    expected = aggregate.teammates.results()
+    aggregate.add_details(details[:10])
+    assert aggregate.teammates.results() == expected
+    assert aggregate.missing_details(20) == []
+    assert expected[:2] == AnalysisService.analyze_teammates(details, ACCOUNT_ID)[:2]
+
+
+def test_store_round_trip(tmp_path: Path) -> None:
+    matches = _matches(25)
+    aggregate = PlayerAggregate(ACCOUNT_ID, 25)
+    aggregate.matches.add(matches)
+    aggregate.add_details([_details(m) for m in matches[:10]])
+
+    async def round_trip() -> Dict[str, Any]:
+        store = PlayerAggregateStore(path=str(tmp_path / "aggregates.db"))
+        await store.save(aggregate)
+        store.close()
+        # 新的存储实例没有内存缓存，从磁盘读取
+        reopened = PlayerAggregateStore(path=str(tmp_path / "aggregates.db"))
+        loaded = await reopened.load(ACCOUNT_ID, 25)
+        reopened.close()
+        assert loaded is not None
+        return loaded.to_state()
+
+    assert asyncio.run(round_trip()) == aggregate.to_state()
@@ -0,0 +1,148 @@
+"""熔断器状态转换和对冲请求的取消."""
+
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+from typing import List
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.services import breaker as breaker_module
+from src.services.breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from src.services.ratelimit import Priority
+from tests.conftest import BASE_URL, ClientFactory
+
+
+class FakeClock:
+    """手动推进的单调时钟."""
+
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(breaker_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(
+        "test", window=4, min_requests=4, failure_ratio=0.5, open_seconds=30
+    )
+    for success in (True, True, False):
+        breaker.before_request()
+        breaker.record(success)
+    assert breaker.state is CircuitState.CLOSED
+    breaker.before_request()
+    breaker.record(False)
+    assert breaker.state is CircuitState.OPEN
+    return breaker
+
+
+def test_opens_when_failure_ratio_is_reached(clock: FakeClock) -> None:
+    breaker = _open_breaker()
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_half_open_allows_a_single_probe(clock: FakeClock) -> None:
+    breaker = _open_breaker()
+    clock.advance(30)
+    breaker.before_request()
+    assert breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record(True)
+    assert breaker.state is CircuitState.CLOSED
+    breaker.before_request()
+
+
+def test_failed_probe_reopens(clock: FakeClock) -> None:
+    breaker = _open_breaker()
+    clock.advance(30)
+    breaker.before_request()
+    breaker.record(False)
+    assert breaker.state is CircuitState.OPEN
+
+    # 重新计时
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    clock.advance(1)
+    breaker.before_request()
+    assert breaker.state is CircuitState.HALF_OPEN
+
+
+def test_released_probe_can_be_retried(clock: FakeClock) -> None:
+    breaker = _open_breaker()
+    clock.advance(30)
+    breaker.before_request()
+    breaker.release()
+    breaker.before_request()
+    assert breaker.state is CircuitState.HALF_OPEN
+
+
+def test_hedge_wins_and_primary_is_cancelled(
+    make_client: ClientFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "MATCH_DETAILS_HEDGE_MIN_DELAY", 0.01)
+    calls: List[str] = []
+    cancelled: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        name = "primary" if not calls else "hedge"
+        calls.append(name)
+        if name == "primary":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+        return httpx.Response(200, json={"from": name})
+
+    client = make_client(handler)
+    client._latencies["matches"] = deque([0.001] * 20)
+
+    async def run() -> httpx.Response:
+        response = await client._hedged_get(
+            f"{BASE_URL}/matches/1", Priority.INTERACTIVE, "matches"
+        )
+        await asyncio.sleep(0)
+        return response
+
+    response = asyncio.run(run())
+    assert response.json() == {"from": "hedge"}
+    assert calls == ["primary", "hedge"]
+    assert cancelled == ["primary"]
+    assert client.scheduler.in_flight == 0
+
+
+def test_no_hedge_when_primary_is_fast(
+    make_client: ClientFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "MATCH_DETAILS_HEDGE_MIN_DELAY", 1.0)
+    calls: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={})
+
+    client = make_client(handler)
+    client._latencies["matches"] = deque([0.001] * 20)
+    response = asyncio.run(
+        client._hedged_get(f"{BASE_URL}/matches/1", Priority.INTERACTIVE, "matches")
+    )
+    assert response.status_code == 200
+    assert len(calls) == 1
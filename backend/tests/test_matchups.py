@@ -0,0 +1,138 @@
+"""英雄对位和配合矩阵."""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.matchups import build  # noqa: E402
+from src.services.matchups import (  # noqa: E402
+    HeroMatchups,
+    count_matchups,
+    save_matchups,
+)
+from src.services.opendota import MatchStore  # noqa: E402
+
+HERO = 1
+
+
+def _match(
+    match_id: int, radiant: List[int], dire: List[int], radiant_win: bool
+) -> Dict[str, Any]:
+    players = [{"hero_id": h, "player_slot": slot} for slot, h in enumerate(radiant)]
+    players += [
+        {"hero_id": h, "player_slot": 128 + slot} for slot, h in enumerate(dire)
+    ]
+    return {"match_id": match_id, "radiant_win": radiant_win, "players": players}
+
+
+def _matches() -> List[Dict[str, Any]]:
+    """英雄1始终在天辉.
+
+    - 对阵6、与2同队：3场3胜
+    - 对阵12、与25同队：3场1胜
+    - 对阵13、与21同队：3场2胜
+    - 对阵20、与29同队：1场1胜（少于最少场次）
+    """
+    groups = [
+        ([2, 3, 4, 5], [6, 40, 41, 42, 43], [True, True, True]),
+        ([25, 26, 27, 28], [12, 44, 45, 46, 47], [True, False, False]),
+        ([21, 22, 23, 24], [13, 48, 49, 50, 51], [True, True, False]),
+        ([29, 30, 31, 32], [20, 52, 53, 54, 55], [True]),
+    ]
+    matches: List[Dict[str, Any]] = []
+    for teammates, opponents, results in groups:
+        for radiant_win in results:
+            matches.append(
+                _match(len(matches) + 1, [HERO] + teammates, opponents, radiant_win)
+            )
+    # 阵容不完整的比赛不计入
+    matches.append(_match(100, [HERO, 2, 3], [6, 40], True))
+    return matches
+
+
+def _load(tmp_path: Path, min_games: int) -> HeroMatchups:
+    path = str(tmp_path / f"matchups_{min_games}.npz")
+    matches = _matches()
+    save_matchups(path, count_matchups(matches), len(matches), min_games, top=10)
+    matchups = HeroMatchups.load(path)
+    assert matchups is not None
+    return matchups
+
+
+def _ids(records: List[Dict[str, Any]]) -> List[int]:
+    return [record["hero_id"] for record in records]
+
+
+def test_counts() -> None:
+    counts = count_matchups(_matches())
+    assert counts["hero_games"][HERO] == 10
+    assert counts["hero_wins"][HERO] == 7
+    assert counts["against_games"][HERO, 12] == 3
+    assert counts["against_wins"][HERO, 12] == 1
+    assert counts["against_wins"][12, HERO] == 2
+    assert counts["with_games"][HERO, 25] == counts["with_games"][25, HERO] == 3
+    assert counts["with_games"][HERO, HERO] == 0
+
+
+def test_matchups_ranking(tmp_path: Path) -> None:
+    matchups = _load(tmp_path, min_games=3)
+    assert matchups.match_count == 11
+    assert HERO in matchups and 99 not in matchups
+
+    result = matchups.matchups(HERO, limit=10)
+    assert (result["games"], result["wins"], result["win_rate"]) == (10, 7, 70.0)
+
+    best_against = result["best_against"]
+    # 同胜率时按hero_id排列
+    assert _ids(best_against) == [6, 40, 41, 42, 43, 13, 48, 49, 50, 51]
+    assert best_against[0] == {
+        "hero_id": 6,
+        "hero_name": None,
+        "games": 3,
+        "wins": 3,
+        "losses": 0,
+        "win_rate": 100.0,
+    }
+    assert _ids(result["worst_against"])[:6] == [12, 44, 45, 46, 47, 13]
+    assert result["worst_against"][0]["win_rate"] == 33.33
+
+    # 配合（同队）
+    assert _ids(result["best_with"]) == [2, 3, 4, 5, 21, 22, 23, 24, 25, 26]
+    assert _ids(result["worst_with"])[:5] == [25, 26, 27, 28, 21]
+
+
+def test_min_games_cutoff(tmp_path: Path) -> None:
+    # min_games即批处理任务的--min-games（默认HERO_MATCHUPS_MIN_GAMES）
+    strict = _load(tmp_path, min_games=3).matchups(HERO, limit=20)
+    for field in ("best_against", "worst_against", "best_with", "worst_with"):
+        assert all(record["games"] >= 3 for record in strict[field])
+    assert 20 not in _ids(strict["best_against"])
+    assert 29 not in _ids(strict["best_with"])
+
+    loose = _load(tmp_path, min_games=1).matchups(HERO, limit=20)
+    assert 20 in _ids(loose["best_against"])
+    assert 29 in _ids(loose["best_with"])
+
+
+def test_build_from_match_cache(tmp_path: Path) -> None:
+    cache_path = str(tmp_path / "matches.db")
+    store = MatchStore(cache_path, memory_items=0)
+    for match in _matches():
+        asyncio.run(store.put(match["match_id"], match))
+    store.close()
+
+    output = str(tmp_path / "built.npz")
+    assert build(cache_path, output, 2, 4, min_games=3, top=10) == 11
+    built = HeroMatchups.load(output)
+    assert built is not None
+    expected = _load(tmp_path, min_games=3)
+    assert built.matchups(HERO, limit=10) == expected.matchups(HERO, limit=10)
+
+
+def test_build_requires_match_cache_path(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        build("", str(tmp_path / "out.npz"), 1, 10, min_games=1, top=5)
@@ -0,0 +1,39 @@
+"""NameResolver的昵称缓存（包括否定结果）."""
+
+import asyncio
+
+import httpx
+
+from src.services.names import _NOT_FOUND, NameResolver
+from tests.conftest import ClientFactory
+
+
+def _resolve_once(make_client: ClientFactory, status_code: int) -> NameResolver:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "opendota.test":
+            return httpx.Response(status_code, headers={"Retry-After": "0"}, json={})
+        return httpx.Response(404)
+
+    resolver = NameResolver(make_client(handler), negative_ttl=3600)
+    assert asyncio.run(resolver.resolve([42])) == {}
+    return resolver
+
+
+def test_missing_player_is_cached_as_not_found(make_client: ClientFactory) -> None:
+    resolver = _resolve_once(make_client, 404)
+    assert resolver.cache.local.get(42) == _NOT_FOUND
+
+
+def test_upstream_failures_are_not_cached(make_client: ClientFactory) -> None:
+    for status_code in (429, 500, 503):
+        resolver = _resolve_once(make_client, status_code)
+        assert resolver.cache.local.get(42) is None
+
+
+def test_resolved_name_is_cached(make_client: ClientFactory) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"profile": {"personaname": "Miracle-"}})
+
+    resolver = NameResolver(make_client(handler))
+    assert asyncio.run(resolver.resolve([42])) == {42: "Miracle-"}
+    assert resolver.cache.local.get(42) == "Miracle-"
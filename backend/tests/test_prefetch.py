@@ -0,0 +1,25 @@
+"""后台预取在空闲额度内发出请求."""
+
+import asyncio
+
+import httpx
+
+from src.services.prefetch import PrefetchWorker
+from src.services.ratelimit import UpstreamScheduler
+from tests.conftest import ClientFactory
+
+
+def test_small_quota_share_does_not_stall(make_client: ClientFactory) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[])
+
+    client = make_client(handler)
+    # quota_share < 1/burst：保留部分按比例计算会超过令牌桶上限
+    client.scheduler = UpstreamScheduler(
+        requests_per_minute=6000, burst=10, max_concurrency=10
+    )
+    worker = PrefetchWorker(client, interval=60, quota_share=0.05)
+    worker.track(42)
+
+    used = asyncio.run(asyncio.wait_for(worker.run_once(), timeout=5))
+    assert used == 1
@@ -0,0 +1,57 @@
+"""比赛详情的流式解析与完整解析结果一致."""
+
+import json
+from typing import Any
+
+import pytest
+
+from src.services import projection
+from src.services.projection import compact_match_details, parse_match_details
+
+DOCUMENTS: Any = [
+    {
+        "match_id": 1,
+        "radiant_win": True,
+        "start_time": 1700000000,
+        "duration": 2400,
+        "chat": [{"key": "gg"}],
+        "players": [
+            {
+                "account_id": 11,
+                "player_slot": 0,
+                "hero_id": 5,
+                "personaname": "a",
+                "purchase_log": [{"key": "tango", "time": 0}],
+                "kills": 3,
+            },
+            {"account_id": None, "player_slot": 128, "hero_id": 8, "name": "b"},
+            {"player_slot": 129, "hero_id": 14},
+        ],
+    },
+    {"match_id": 2, "radiant_win": False, "players": []},
+    {"match_id": 3, "radiant_win": False, "players": None},
+    {"match_id": 4, "duration": 1800.5},
+]
+
+pytestmark = pytest.mark.skipif(projection.ijson is None, reason="需要ijson")
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_streaming_matches_full_parse(
+    document: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    raw = json.dumps(document).encode()
+    streamed = parse_match_details(raw)
+    monkeypatch.setattr(projection, "ijson", None)
+    assert streamed == parse_match_details(raw) == compact_match_details(document)
+
+
+@pytest.mark.parametrize("raw", [b"[1, 2]", b'"match"', b"null", b'{"match_id": 1'])
+def test_invalid_documents_raise_value_error(
+    raw: bytes, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with pytest.raises(ValueError):
+        parse_match_details(raw)
+    monkeypatch.setattr(projection, "ijson", None)
+    with pytest.raises(ValueError):
+        parse_match_details(raw)
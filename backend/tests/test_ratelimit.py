@@ -0,0 +1,111 @@
+"""UpstreamScheduler的优先级调度和429退避."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.services.ratelimit import (
+    DEFAULT_RETRY_AFTER,
+    Priority,
+    UpstreamScheduler,
+    parse_retry_after,
+)
+
+
+def test_interactive_waiters_are_served_before_background() -> None:
+    asyncio.run(_interactive_before_background())
+
+
+async def _interactive_before_background() -> None:
+    scheduler = UpstreamScheduler(requests_per_minute=6000, burst=10, max_concurrency=1)
+    order = []
+
+    async def request(name: str, priority: Priority) -> None:
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    await scheduler.acquire()
+    # 先到达的后台请求排在后到达的交互请求之后
+    tasks = [
+        asyncio.create_task(request("background-1", Priority.BACKGROUND)),
+        asyncio.create_task(request("background-2", Priority.BACKGROUND)),
+        asyncio.create_task(request("interactive-1", Priority.INTERACTIVE)),
+        asyncio.create_task(request("interactive-2", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert order == []
+    scheduler.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive-1", "interactive-2", "background-1", "background-2"]
+    assert scheduler.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_hold_a_slot() -> None:
+    asyncio.run(_cancelled_waiter())
+
+
+async def _cancelled_waiter() -> None:
+    scheduler = UpstreamScheduler(requests_per_minute=6000, burst=10, max_concurrency=1)
+    await scheduler.acquire()
+    waiter = asyncio.create_task(scheduler.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release()
+
+    await asyncio.wait_for(scheduler.acquire(), timeout=1)
+    assert scheduler.in_flight == 1
+
+
+def test_429_pauses_for_retry_after() -> None:
+    asyncio.run(_pause_for_retry_after())
+
+
+async def _pause_for_retry_after() -> None:
+    scheduler = UpstreamScheduler(requests_per_minute=6000, burst=10, max_concurrency=4)
+    scheduler.observe(429, {"retry-after": "0.2"})
+    assert scheduler.tokens < 1
+
+    started = time.monotonic()
+    async with scheduler.slot():
+        elapsed = time.monotonic() - started
+    assert elapsed >= 0.19
+
+
+def test_429_without_retry_after_uses_default_pause(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    scheduler = UpstreamScheduler(requests_per_minute=60, burst=5, max_concurrency=4)
+    scheduler.observe(429, {})
+
+    assert scheduler._paused_until == now + DEFAULT_RETRY_AFTER
+    # 暂停不会缩短已有的更长暂停
+    scheduler.observe(429, {"retry-after": "1"})
+    assert scheduler._paused_until == now + DEFAULT_RETRY_AFTER
+
+
+def test_remaining_quota_caps_tokens() -> None:
+    scheduler = UpstreamScheduler(requests_per_minute=60, burst=5, max_concurrency=4)
+    scheduler.observe(200, {"x-rate-limit-remaining-minute": "2"})
+    assert scheduler.tokens < 3
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("3", 3.0), ("-1", 0.0), ("soon", None), (None, None), ("", None)],
+)
+def test_parse_retry_after_seconds(value: str, expected: float) -> None:
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date() -> None:
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert seconds is not None and 28 <= seconds <= 30
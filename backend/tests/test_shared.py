@@ -0,0 +1,110 @@
+"""共享状态：两级缓存和按优先级取得的共享请求预算."""
+
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from src.services.opendota import MatchStore, OpenDotaClient
+from src.services.ratelimit import Priority, UpstreamScheduler
+from src.services.shared import (
+    Entry,
+    SharedCache,
+    SharedStateBackend,
+    SQLiteStateBackend,
+)
+from tests.conftest import BASE_URL
+
+
+class MemoryBackend(SharedStateBackend):
+    """记录令牌请求顺序的内存后端."""
+
+    def __init__(self) -> None:
+        self.entries: Dict[str, bytes] = {}
+        self.token_takers: List[str] = []
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Entry]:
+        return {key: (self.entries[key], 60.0) for key in keys if key in self.entries}
+
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        self.entries.update(items)
+
+    async def take_token(self, name: str, rate: float, capacity: float) -> float:
+        task = asyncio.current_task()
+        self.token_takers.append(task.get_name() if task else "")
+        return 0.0
+
+
+def test_shared_cache_reads_through_backend() -> None:
+    backend = MemoryBackend()
+    writer: SharedCache[int, str] = SharedCache("names", ttl=60, backend=backend)
+    reader: SharedCache[int, str] = SharedCache("names", ttl=60, backend=backend)
+
+    async def run() -> Dict[int, str]:
+        await writer.set(1, "a")
+        return await reader.get_many([1, 2])
+
+    assert asyncio.run(run()) == {1: "a"}
+    assert reader.local.get(1) == "a"
+
+
+def test_shared_cache_without_backend_is_local() -> None:
+    cache: SharedCache[int, str] = SharedCache("names", ttl=60)
+    asyncio.run(cache.set(1, "a"))
+    assert asyncio.run(cache.get_many([1, 2])) == {1: "a"}
+
+
+def test_shared_tokens_are_taken_in_priority_order() -> None:
+    backend = MemoryBackend()
+
+    async def run() -> None:
+        client = OpenDotaClient(
+            base_url=BASE_URL,
+            match_store=MatchStore(path="", memory_items=16),
+            scheduler=UpstreamScheduler(
+                requests_per_minute=6000, burst=100, max_concurrency=1
+            ),
+            shared_state=backend,
+        )
+        client.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200))
+        )
+        # 占住唯一的并发名额，让两个请求排队
+        await client.scheduler.acquire()
+        background = asyncio.create_task(
+            client._get(f"{BASE_URL}/a", priority=Priority.BACKGROUND),
+            name="background",
+        )
+        interactive = asyncio.create_task(
+            client._get(f"{BASE_URL}/b", priority=Priority.INTERACTIVE),
+            name="interactive",
+        )
+        await asyncio.sleep(0.01)
+        assert backend.token_takers == []
+        client.scheduler.release()
+        await asyncio.gather(background, interactive)
+        await client.close()
+
+    asyncio.run(run())
+    assert backend.token_takers == ["interactive", "background"]
+
+
+def test_sqlite_backend_recovers_after_failed_write(tmp_path: Path) -> None:
+    backend = SQLiteStateBackend(str(tmp_path / "shared.db"))
+    bad: Dict[str, Any] = {"a": b"1", "b": object()}
+
+    async def run() -> Dict[str, Entry]:
+        with pytest.raises(sqlite3.Error):
+            await backend.set_many(bad, ttl=60)
+        # 失败的写入已回滚，连接可以开始新的事务
+        await backend.set_many({"c": b"3"}, ttl=60)
+        entries = await backend.get_many(["a", "c"])
+        await backend.close()
+        return entries
+
+    entries = asyncio.run(run())
+    assert list(entries) == ["c"]
+    assert entries["c"][0] == b"3"
@@ -0,0 +1,76 @@
+"""缓存快照的保存和恢复."""
+
+import asyncio
+from pathlib import Path
+from typing import Any, NamedTuple, Tuple
+
+from src.services.shared import SharedCache
+from src.services.snapshot import CacheSnapshot
+
+
+class Window(NamedTuple):
+    limit: int
+    days: Any
+
+
+def _caches() -> Tuple[SharedCache[Any, Any], SharedCache[Any, Any]]:
+    return (
+        SharedCache("analysis", ttl=600),
+        SharedCache("names", ttl=600),
+    )
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    path = str(tmp_path / "snapshots" / "cache.gz")
+    analysis, names = _caches()
+    analysis.local.set((42, Window(20, None)), {"comment": "ok"})
+    names.local.set(7, "Miracle-")
+    names.local.set(8, "expired", ttl=-1)
+
+    restored_analysis, restored_names = _caches()
+
+    async def run() -> Tuple[int, int]:
+        saved = await CacheSnapshot([analysis, names], path=path).save()
+        loaded = await CacheSnapshot(
+            [restored_analysis, restored_names], path=path
+        ).load()
+        return saved, loaded
+
+    assert asyncio.run(run()) == (2, 2)
+    # 元组（NamedTuple）键恢复后与原来的键相等
+    assert restored_analysis.local.get((42, Window(20, None))) == {"comment": "ok"}
+    assert restored_names.local.get(7) == "Miracle-"
+    assert restored_names.local.get(8) is None
+
+
+def test_disabled_without_path() -> None:
+    analysis, names = _caches()
+    analysis.local.set(1, {"a": 1})
+    snapshot = CacheSnapshot([analysis, names], path="")
+    assert not snapshot.enabled
+    assert asyncio.run(snapshot.save()) == 0
+    assert asyncio.run(snapshot.load()) == 0
+
+
+def test_missing_or_corrupt_snapshot_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "cache.gz"
+    snapshot = CacheSnapshot(_caches(), path=str(path))
+    assert asyncio.run(snapshot.load()) == 0
+
+    path.write_bytes(b"not a snapshot")
+    assert asyncio.run(snapshot.load()) == 0
+
+    # gzip文件头正常但压缩数据损坏（zlib.error）
+    path.write_bytes(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff" + b"\xff" * 32)
+    assert asyncio.run(snapshot.load()) == 0
+
+
+def test_unknown_caches_are_skipped(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache.gz")
+    analysis, names = _caches()
+    names.local.set(7, "Miracle-")
+    asyncio.run(CacheSnapshot([analysis, names], path=path).save())
+
+    restored: SharedCache[Any, Any] = SharedCache("analysis", ttl=600)
+    assert asyncio.run(CacheSnapshot([restored], path=path).load()) == 0
+    assert len(restored) == 0